@@ -0,0 +1,104 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Measures the cost of changing the camera's resolution, framerate, sensor
+# mode, and clock mode, comparing setting each property in turn (each of
+# which reconfigures the camera) against a single call to configure(). The
+# number of reconfigurations is counted by wrapping _configure_camera.
+#
+# This requires a camera module.
+#
+# Usage: python benchmarks/bench_configure.py [repeat]
+
+import sys
+import time
+
+import picamera
+
+
+SETTINGS = [
+    dict(resolution=(1920, 1080), framerate=30, sensor_mode=1, clock_mode='raw'),
+    dict(resolution=(640, 480), framerate=60, sensor_mode=7, clock_mode='reset'),
+    ]
+
+
+def counting(func):
+    # A plain function (rather than a callable object) so it still binds as a
+    # method when assigned to the class
+    def wrapper(*args, **kwargs):
+        wrapper.count += 1
+        return func(*args, **kwargs)
+    wrapper.count = 0
+    return wrapper
+
+
+def separate(camera, settings):
+    camera.resolution = settings['resolution']
+    camera.framerate = settings['framerate']
+    camera.sensor_mode = settings['sensor_mode']
+    camera.clock_mode = settings['clock_mode']
+
+def batch(camera, settings):
+    camera.configure(**settings)
+
+
+def main(args):
+    repeat = int(args[0]) if args else 10
+    original = picamera.PiCamera._configure_camera
+    counter = counting(original)
+    picamera.PiCamera._configure_camera = counter
+    try:
+        with picamera.PiCamera() as camera:
+            for name, func in (('separate', separate), ('configure', batch)):
+                counter.count = 0
+                start = time.time()
+                for i in range(repeat):
+                    for settings in SETTINGS:
+                        func(camera, settings)
+                elapsed = time.time() - start
+                changes = repeat * len(SETTINGS)
+                print('%s: %.1f reconfigures, %.1fms per change' % (
+                    name, counter.count / changes, elapsed * 1000 / changes))
+    finally:
+        picamera.PiCamera._configure_camera = original
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
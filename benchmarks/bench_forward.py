@@ -0,0 +1,112 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Compares the cost of feeding camera frames to a Python component through
+# an MMALPythonConnection which copies each frame into the component's input
+# buffers against one which forwards frames by reference (zero_copy=True).
+# The simulated MMAL backend is used by default so that the rate is not
+# limited by the sensor; pass "hw" to use a camera module instead.
+#
+# Usage: python benchmarks/bench_forward.py [seconds] [hw]
+
+import sys
+import time
+
+from picamera import mmal, mmalsim, mmalobj as mo
+
+
+_cpu_time = getattr(time, 'process_time', None) or time.clock
+
+
+class Counter(mo.MMALPythonComponent):
+    __slots__ = ('count',)
+
+    def __init__(self):
+        super(Counter, self).__init__(name='py.counter', outputs=0)
+        self.count = 0
+
+    def _handle_frame(self, port, buf):
+        self.count += 1
+        return False
+
+
+def run(seconds, zero_copy):
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (1280, 720)
+        port.framerate = 90
+        port.commit()
+        counter = Counter()
+        try:
+            counter.connect(port, zero_copy=zero_copy)
+            counter.connection.enable()
+            counter.enable()
+            camera.enable()
+            start = time.time()
+            cpu = _cpu_time()
+            time.sleep(seconds)
+            cpu = _cpu_time() - cpu
+            elapsed = time.time() - start
+            camera.disable()
+            counter.disable()
+            counter.connection.disable()
+            count = counter.count
+        finally:
+            counter.close()
+    print('%s: %.0f frames/s, %.0fus CPU per frame' % (
+        'zero-copy' if zero_copy else 'copy',
+        count / elapsed, cpu * 1000000 / max(1, count)))
+
+
+def main(args):
+    seconds = float(args[0]) if args else 5
+    if 'hw' not in args[1:]:
+        mmalsim.install(speed=100)
+    try:
+        for zero_copy in (False, True):
+            run(seconds, zero_copy)
+    finally:
+        if 'hw' not in args[1:]:
+            mmalsim.uninstall()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
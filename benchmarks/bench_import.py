@@ -0,0 +1,80 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Measures the time taken to import picamera in a fresh interpreter: the bare
+# package (which defers all submodule imports), the pure-Python streams, and
+# the whole package as imported by versions prior to 1.14. The latter
+# requires the camera's libraries and colorzero; other measurements do not.
+#
+# Usage: python benchmarks/bench_import.py [repeat]
+
+import sys
+import subprocess
+import timeit
+
+
+SCRIPTS = (
+    ('bare',    'import picamera'),
+    ('streams', 'import picamera; picamera.TeeIO'),
+    ('eager',   'import picamera; [getattr(picamera, name) '
+                'for name in picamera._MODULES]'),
+    )
+
+
+def run(script):
+    subprocess.check_call([sys.executable, '-c', script])
+
+
+def main(args):
+    repeat = int(args[0]) if args else 20
+    baseline = min(timeit.repeat(
+        lambda: run('pass'), number=repeat, repeat=3)) / repeat
+    for name, script in SCRIPTS:
+        try:
+            elapsed = min(timeit.repeat(
+                lambda: run(script), number=repeat, repeat=3)) / repeat
+        except subprocess.CalledProcessError:
+            print('%s: failed (missing libraries?)' % name)
+        else:
+            print('%s: %.1fms' % (name, (elapsed - baseline) * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Measures the cost of reading camera parameters through MMALPortParams, as a
+# control loop logging exposure telemetry at frame rate would, comparing
+# individual reads against a single get_many() call. Pass "sim" to run against
+# the simulated MMAL backend instead of a camera module (the figures then
+# include the simulator's overhead instead of the firmware's).
+#
+# Usage: python benchmarks/bench_params.py [repeat] [sim]
+
+import sys
+import time
+
+from picamera import mmal, mmalsim
+
+
+KEYS = [
+    mmal.MMAL_PARAMETER_ISO,
+    mmal.MMAL_PARAMETER_EXPOSURE_COMP,
+    mmal.MMAL_PARAMETER_SHUTTER_SPEED,
+    mmal.MMAL_PARAMETER_BRIGHTNESS,
+    mmal.MMAL_PARAMETER_CAMERA_SETTINGS,
+    ]
+
+
+def separate(params):
+    return [params[key] for key in KEYS]
+
+def batch(params):
+    return params.get_many(KEYS)
+
+
+def main(args):
+    repeat = int(args[0]) if args else 10000
+    if 'sim' in args[1:]:
+        mmalsim.install()
+    try:
+        from picamera import PiCamera
+        with PiCamera() as camera:
+            params = camera._camera.control.params
+            for name, func in (('separate', separate), ('get_many', batch)):
+                start = time.time()
+                for i in range(repeat):
+                    func(params)
+                elapsed = time.time() - start
+                print('%s: %.1fus per parameter' % (
+                    name, elapsed * 1000000 / (repeat * len(KEYS))))
+    finally:
+        if 'sim' in args[1:]:
+            mmalsim.uninstall()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Measures the throughput of picamera's recording pipelines on the simulated
+# MMAL backend (picamera.mmalsim), so it runs on any machine. For each format
+# the camera is driven at SPEED times its nominal 30fps and the achieved
+# framerate, the frames dropped by the camera, and the CPU time consumed per
+# frame are reported. With a high enough speed, the figures indicate the
+# overhead of the Python layers (callbacks, buffer handling, and output
+# writes) rather than the simulated firmware.
+#
+# Usage: python benchmarks/bench_pipeline.py [seconds] [speed]
+
+import io
+import sys
+import time
+
+from picamera import mmalsim
+
+
+_cpu_time = getattr(time, 'process_time', None) or time.clock
+
+FORMATS = [
+    ('h264', (1920, 1080), {}),
+    ('h264', (1280, 720), {'motion_output': io.BytesIO()}),
+    ('mjpeg', (1280, 720), {}),
+    ('yuv', (640, 480), {}),
+    ('rgb', (640, 480), {}),
+    ]
+
+
+def main(args):
+    seconds = float(args[0]) if args else 5
+    speed = float(args[1]) if len(args) > 1 else 4
+    sim = mmalsim.install(speed=speed)
+    try:
+        from picamera import PiCamera
+        with PiCamera(framerate=30) as camera:
+            for format, resolution, options in FORMATS:
+                camera.resolution = resolution
+                output = io.BytesIO()
+                before = {s.name: s for s in sim.stats()}
+                start = time.time()
+                cpu = _cpu_time()
+                camera.start_recording(output, format, **options)
+                camera.wait_recording(seconds)
+                camera.stop_recording()
+                cpu = _cpu_time() - cpu
+                elapsed = time.time() - start
+                after = {s.name: s for s in sim.stats()}
+                video = 'vc.ril.camera:out:1'
+                frames = after[video].frames - before[video].frames
+                dropped = after[video].dropped - before[video].dropped
+                print(
+                    '%-5s %4dx%-4d: %6.1ffps (of %.0f), %d dropped, '
+                    '%.2fms CPU/frame, %.1fMB written' % (
+                        format, resolution[0], resolution[1],
+                        frames / elapsed, 30 * speed, dropped,
+                        cpu * 1000 / max(1, frames),
+                        output.tell() / 1000000))
+    finally:
+        mmalsim.uninstall()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,142 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Measures the rate at which MMALPythonSource replays a recorded I420 file
+# into a Python component (which discards it), reading from the file itself (which is memory
+# mapped), from an in-memory stream (via readinto), and from a stream which
+# only provides read(). The frame size is deliberately not a multiple of the
+# buffer size so that partial-frame reads are exercised. The simulated MMAL
+# backend is used by default; pass "hw" to use the real MMAL library.
+#
+# Usage: python benchmarks/bench_source.py [frames] [hw]
+
+import io
+import os
+import sys
+import time
+import tempfile
+from threading import Event
+
+from picamera import mmal, mmalsim, mmalobj as mo
+
+
+_cpu_time = getattr(time, 'process_time', None) or time.clock
+
+FRAMESIZE = (1280, 720)
+
+
+class Sink(mo.MMALPythonComponent):
+    __slots__ = ('done',)
+
+    def __init__(self):
+        super(Sink, self).__init__(name='py.sink', outputs=0)
+        self.done = Event()
+
+    def _handle_frame(self, port, buf):
+        if buf.flags & mmal.MMAL_BUFFER_HEADER_FLAG_EOS:
+            self.done.set()
+            return True
+        return False
+
+
+class ReadOnly(object):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, n=-1):
+        return self._stream.read(n)
+
+
+def run(name, input, frames):
+    source = mo.MMALPythonSource(input)
+    target = Sink()
+    try:
+        port = source.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = FRAMESIZE
+        port.commit()
+        # Split each frame across several buffers, the last one partial
+        port.buffer_size = port.buffer_size // 3 + 4096
+        target.connect(source)
+        target.connection.enable()
+        target.enable()
+        start = time.time()
+        cpu = _cpu_time()
+        source.enable()
+        source.wait()
+        target.done.wait()
+        cpu = _cpu_time() - cpu
+        elapsed = time.time() - start
+        source.disable()
+        target.disable()
+        target.connection.disable()
+    finally:
+        target.close()
+        source.close()
+    size = frames * FRAMESIZE[0] * FRAMESIZE[1] * 3 // 2
+    print('%s: %.0f frames/s, %.0fMB/s, %.0fus CPU per frame' % (
+        name, frames / elapsed, size / elapsed / 1048576,
+        cpu * 1000000 / frames))
+
+
+def main(args):
+    frames = int(args[0]) if args else 30
+    if 'hw' not in args[1:]:
+        mmalsim.install()
+    fd, filename = tempfile.mkstemp(suffix='.yuv')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            frame = bytes(bytearray(range(256))) * (
+                FRAMESIZE[0] * FRAMESIZE[1] * 3 // 2 // 256)
+            for i in range(frames):
+                f.write(frame)
+        with io.open(filename, 'rb') as f:
+            data = f.read()
+        run('file', filename, frames)
+        run('readinto', io.BytesIO(data), frames)
+        run('read', ReadOnly(io.BytesIO(data)), frames)
+    finally:
+        os.unlink(filename)
+        if 'hw' not in args[1:]:
+            mmalsim.uninstall()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
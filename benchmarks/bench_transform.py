@@ -0,0 +1,119 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+# Measures the throughput of a numpy-heavy PiArrayTransform fed with 720p
+# RGB frames, first transforming each frame on the component's own thread,
+# then with a ThreadPoolExecutor transforming several frames at once. The
+# component's stats show how heavily loaded it was. The simulated MMAL backend
+# is used by default so that the rate is not limited by the sensor; pass "hw"
+# to use a camera module instead.
+#
+# Usage: python benchmarks/bench_transform.py [seconds] [workers] [hw]
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from picamera import mmal, mmalsim, mmalobj as mo
+from picamera.array import PiArrayTransform
+
+
+class Blend(PiArrayTransform):
+    __slots__ = ()
+
+    def transform(self, source, target):
+        with source as source_array, target as target_array:
+            np.multiply(source_array, 0.5, out=target_array, casting='unsafe')
+            np.add(target_array, 64, out=target_array)
+
+
+def run(seconds, executor, workers):
+    frames = [0]
+    def callback(port, buf):
+        frames[0] += 1
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_RGB24
+        port.framesize = (1280, 720)
+        port.framerate = 90
+        port.commit()
+        transform = Blend(formats='rgb', executor=executor, depth=workers)
+        try:
+            transform.connect(port)
+            transform.outputs[0].commit()
+            transform.outputs[0].buffer_count = workers + 1
+            transform.outputs[0].enable(callback)
+            transform.connection.enable()
+            transform.enable()
+            camera.enable()
+            time.sleep(seconds)
+            camera.disable()
+            transform.disable()
+            stats = transform.stats
+            transform.connection.disable()
+            transform.outputs[0].disable()
+        finally:
+            transform.close()
+    print('%s: %.1f frames/s output, %.1fms per frame, %.0f%% load' % (
+        'executor' if executor else 'serial',
+        frames[0] / stats.elapsed, stats.latency * 1000, stats.load * 100))
+
+
+def main(args):
+    seconds = float(args[0]) if args else 5
+    workers = int(args[1]) if args[1:] else 4
+    if 'hw' not in args[2:]:
+        mmalsim.install(speed=20)
+    try:
+        run(seconds, None, 1)
+        executor = ThreadPoolExecutor(workers)
+        try:
+            run(seconds, executor, workers)
+        finally:
+            executor.shutdown()
+    finally:
+        if 'hw' not in args[2:]:
+            mmalsim.uninstall()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,12 @@
+import picamera
+
+with picamera.PiCamera() as camera:
+    camera.resolution = (1024, 768)
+    camera.framerate = 30
+    plan = picamera.PiRecordingPlan(camera, [
+        dict(output='highres.h264'),
+        dict(output='lowres.h264', resize=(320, 240)),
+        ])
+    print(plan.report())
+    with plan:
+        plan.wait(30)
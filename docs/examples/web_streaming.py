@@ -1,8 +1,6 @@
-import io
 import picamera
 import logging
 import socketserver
-from threading import Condition
 from http import server
 
 PAGE="""\
@@ -17,23 +15,6 @@ PAGE="""\
 </html>
 """
 
-class StreamingOutput(object):
-    def __init__(self):
-        self.frame = None
-        self.buffer = io.BytesIO()
-        self.condition = Condition()
-
-    def write(self, buf):
-        if buf.startswith(b'\xff\xd8'):
-            # New frame, copy the existing buffer's content and notify all
-            # clients it's available
-            self.buffer.truncate()
-            with self.condition:
-                self.frame = self.buffer.getvalue()
-                self.condition.notify_all()
-            self.buffer.seek(0)
-        return self.buffer.write(buf)
-
 class StreamingHandler(server.BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == '/':
@@ -55,10 +36,11 @@ class StreamingHandler(server.BaseHTTPRequestHandler):
             self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=FRAME')
             self.end_headers()
             try:
+                seq = 0
                 while True:
-                    with output.condition:
-                        output.condition.wait()
-                        frame = output.frame
+                    # Each client tracks the sequence number of the last
+                    # frame it sent; slow clients simply skip frames
+                    seq, frame = output.wait_frame(seq)
                     self.wfile.write(b'--FRAME\r\n')
                     self.send_header('Content-Type', 'image/jpeg')
                     self.send_header('Content-Length', len(frame))
@@ -78,7 +60,7 @@ class StreamingServer(socketserver.ThreadingMixIn, server.HTTPServer):
     daemon_threads = True
 
 with picamera.PiCamera(resolution='640x480', framerate=24) as camera:
-    output = StreamingOutput()
+    output = picamera.PiCameraMJPEGIO(camera)
     camera.start_recording(output, format='mjpeg')
     try:
         address = ('', 8000)
@@ -53,6 +53,9 @@ package:
 * :mod:`picamera.encoders`
 * :mod:`picamera.frames`
 * :mod:`picamera.streams`
+* :mod:`picamera.h264`
+* :mod:`picamera.hls`
+* :mod:`picamera.planner`
 * :mod:`picamera.renderers`
 * :mod:`picamera.color`
 * :mod:`picamera.exc`
@@ -69,46 +72,155 @@ from __future__ import (
 # Make Py2's str equivalent to Py3's
 str = type('')
 
-from picamera.exc import (
-    PiCameraWarning,
-    PiCameraDeprecated,
-    PiCameraFallback,
-    PiCameraAlphaStripping,
-    PiCameraResizerEncoding,
-    PiCameraError,
-    PiCameraRuntimeError,
-    PiCameraClosed,
-    PiCameraNotRecording,
-    PiCameraAlreadyRecording,
-    PiCameraValueError,
-    PiCameraMMALError,
-    PiCameraPortDisabled,
-    mmal_check,
-    )
-from picamera.mmalobj import PiResolution, PiFramerateRange, PiSensorMode
-from picamera.camera import PiCamera
-from picamera.display import PiDisplay
-from picamera.frames import PiVideoFrame, PiVideoFrameType
-from picamera.encoders import (
-    PiEncoder,
-    PiVideoEncoder,
-    PiImageEncoder,
-    PiRawMixin,
-    PiCookedVideoEncoder,
-    PiRawVideoEncoder,
-    PiOneImageEncoder,
-    PiMultiImageEncoder,
-    PiRawImageMixin,
-    PiCookedOneImageEncoder,
-    PiRawOneImageEncoder,
-    PiCookedMultiImageEncoder,
-    PiRawMultiImageEncoder,
-    )
-from picamera.renderers import (
-    PiRenderer,
-    PiOverlayRenderer,
-    PiPreviewRenderer,
-    PiNullSink,
-    )
-from picamera.streams import PiCameraCircularIO, CircularIO, BufferIO
-from picamera.color import Color, Red, Green, Blue, Hue, Lightness, Saturation
+import sys
+from importlib import import_module
+
+# The names exported by the package, keyed by the submodule defining them.
+# Submodules are only imported when one of their names is first accessed
+# (see __getattr__ below) which keeps "import picamera" cheap, and permits
+# use of the pure-Python parts of the package without the camera's
+# libraries
+_EXPORTS = {
+    'picamera.exc': (
+        'PiCameraWarning',
+        'PiCameraDeprecated',
+        'PiCameraFallback',
+        'PiCameraAlphaStripping',
+        'PiCameraResizerEncoding',
+        'PiCameraError',
+        'PiCameraRuntimeError',
+        'PiCameraClosed',
+        'PiCameraNotRecording',
+        'PiCameraAlreadyRecording',
+        'PiCameraValueError',
+        'PiCameraMMALError',
+        'PiCameraPortDisabled',
+        'mmal_check',
+        ),
+    'picamera.mmalobj': (
+        'PiResolution',
+        'PiFramerateRange',
+        'PiSensorMode',
+        ),
+    'picamera.camera': (
+        'PiCamera',
+        ),
+    'picamera.display': (
+        'PiDisplay',
+        ),
+    'picamera.frames': (
+        'PiVideoFrame',
+        'PiVideoFrameType',
+        ),
+    'picamera.encoders': (
+        'PiEncoder',
+        'PiVideoEncoder',
+        'PiVideoSplitSchedule',
+        'PiBitrateController',
+        'PiImageEncoder',
+        'PiRawMixin',
+        'PiCookedVideoEncoder',
+        'PiRawVideoEncoder',
+        'PiOneImageEncoder',
+        'PiMultiImageEncoder',
+        'PiRawImageMixin',
+        'PiCookedOneImageEncoder',
+        'PiRawOneImageEncoder',
+        'PiCookedMultiImageEncoder',
+        'PiRawMultiImageEncoder',
+        'PiEncoderPool',
+        'PiOutputRotation',
+        ),
+    'picamera.renderers': (
+        'PiRenderer',
+        'PiOverlayRenderer',
+        'PiPreviewRenderer',
+        'PiNullSink',
+        ),
+    'picamera.streams': (
+        'PiCameraCircularIO',
+        'PiCameraMJPEGIO',
+        'CircularIO',
+        'BufferIO',
+        'TeeIO',
+        'TeeSink',
+        ),
+    'picamera.h264': (
+        'H264NALType',
+        'H264NALUnit',
+        'H264Parser',
+        'H264TeeIO',
+        ),
+    'picamera.hls': (
+        'PiCameraHLSIO',
+        ),
+    'picamera.planner': (
+        'PiRecordingPlan',
+        'PiPlannedRecording',
+        ),
+    'picamera.color': (
+        'Color',
+        'Red',
+        'Green',
+        'Blue',
+        'Hue',
+        'Lightness',
+        'Saturation',
+        ),
+    }
+
+_MODULES = {
+    name: module
+    for module, names in _EXPORTS.items()
+    for name in names
+    }
+
+# The package's submodules; previous versions imported most of these up
+# front, so code may expect e.g. picamera.mmalobj to be available after a
+# plain "import picamera"
+_SUBMODULES = frozenset((
+    'array',
+    'bcm_host',
+    'camera',
+    'color',
+    'display',
+    'encoders',
+    'exc',
+    'frames',
+    'h264',
+    'hls',
+    'lazy',
+    'mmal',
+    'mmalobj',
+    'mmalsim',
+    'planner',
+    'renderers',
+    'server',
+    'streams',
+    ))
+
+__all__ = sorted(_MODULES)
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        # Importing a submodule binds it as an attribute of the package
+        return import_module('picamera.' + name)
+    try:
+        module = _MODULES[name]
+    except KeyError:
+        raise AttributeError(
+            'module %r has no attribute %r' % (__name__, name))
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ (PEP 562) is unavailable, so import everything
+    # up front as previous versions did
+    for _name in _MODULES:
+        __getattr__(_name)
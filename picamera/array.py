@@ -45,6 +45,9 @@ except NameError:
 import io
 import ctypes as ct
 import warnings
+from time import time
+from threading import Condition, Lock
+from collections import deque
 
 import numpy as np
 from numpy.lib.stride_tricks import as_strided
@@ -628,6 +631,14 @@ class PiAnalysisOutput(io.IOBase):
     This class extends :class:`io.IOBase` with a stub :meth:`analyze` method
     which will be called for each frame output. In this base implementation the
     method simply raises :exc:`NotImplementedError`.
+
+    .. versionchanged:: 1.14
+        Unencoded recordings now write exactly one complete frame per call to
+        :meth:`write`, even when the frame spans several MMAL buffers. Such
+        frames are assembled in buffers which are recycled a few frames
+        later, so the array passed to :meth:`analyze` may be backed by a
+        recycled buffer; copy it if you need to retain it after
+        :meth:`analyze` returns.
     """
 
     def __init__(self, camera, size=None):
@@ -803,6 +814,105 @@ class PiMotionAnalysis(PiAnalysisOutput):
         return result
 
 
+class PiMotionRing(object):
+    """
+    A pre-allocated ring of motion vector arrays, each paired with the
+    :class:`~picamera.PiVideoFrame` of the picture it was estimated from.
+
+    Instances are callables intended to be passed to
+    :meth:`~picamera.PiCamera.add_motion_subscriber` (the recording must be
+    started with the *motion_vectors* option, or a *motion_output*). Unlike
+    :class:`PiMotionAnalysis` no second output object is required, and the
+    motion data is copied from the encoder's buffer directly into the ring,
+    which holds the most recent *frames* arrays.
+
+    The *camera* and optional *size* parameters are used to determine the
+    dimensions of the motion data, as with :class:`PiMotionAnalysis`. The
+    :attr:`array` attribute is the underlying ring (of shape ``(frames,
+    rows, cols)``), but as it is overwritten while recording, consumers
+    should use :meth:`wait` or :meth:`snapshot` which return copies.
+
+    .. versionadded:: 1.14
+    """
+
+    def __init__(self, camera, frames=30, size=None):
+        if frames < 1:
+            raise PiCameraValueError('frames must be 1 or greater')
+        width, height = size or camera.resolution
+        self.cols = ((width + 15) // 16) + 1
+        self.rows = (height + 15) // 16
+        self.array = np.zeros(
+            (frames, self.rows, self.cols), dtype=motion_dtype)
+        self.frames = [None] * frames
+        self._bytes = self.array.view(np.uint8).reshape((frames, -1))
+        self._seq = 0
+        self._cond = Condition()
+
+    def __len__(self):
+        with self._cond:
+            return min(self._seq, len(self.frames))
+
+    def __call__(self, frame, buf):
+        size = self._bytes.shape[1]
+        if buf.length != size:
+            raise PiCameraValueError(
+                'motion data is %d bytes; expected %d for a %dx%d array' % (
+                    buf.length, size, self.cols, self.rows))
+        with self._cond:
+            slot = self._seq % len(self.frames)
+            with buf as data:
+                self._bytes[slot] = np.frombuffer(
+                    data, dtype=np.uint8, count=size, offset=buf.offset)
+            self.frames[slot] = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    @property
+    def seq(self):
+        """
+        The number of motion arrays received so far.
+        """
+        with self._cond:
+            return self._seq
+
+    def wait(self, seq=0, timeout=None):
+        """
+        Wait for a motion array with a sequence number greater than *seq* and
+        return a tuple of ``(seq, frame, array)`` for the most recent array,
+        where *array* is a copy of the motion data and *frame* is the
+        corresponding :class:`~picamera.PiVideoFrame`.
+
+        If *timeout* is specified it gives the maximum number of seconds to
+        wait. If *timeout* elapses before a new array is available the tuple
+        ``(seq, None, None)`` is returned, where *seq* is the value passed in.
+        """
+        if timeout is not None:
+            deadline = time() + timeout
+        with self._cond:
+            while self._seq <= seq:
+                if timeout is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        return seq, None, None
+                    self._cond.wait(remaining)
+            slot = (self._seq - 1) % len(self.frames)
+            return self._seq, self.frames[slot], self.array[slot].copy()
+
+    def snapshot(self):
+        """
+        Returns a tuple of ``(frames, array)`` containing copies of all
+        frames and motion arrays currently held in the ring, oldest first.
+        """
+        with self._cond:
+            count = min(self._seq, len(self.frames))
+            start = self._seq - count
+            slots = [(start + i) % len(self.frames) for i in range(count)]
+            # Fancy indexing implicitly copies the selected arrays
+            return [self.frames[slot] for slot in slots], self.array[slots]
+
+
 class MMALArrayBuffer(mo.MMALBuffer):
     __slots__ = ('_shape',)
 
@@ -841,11 +951,36 @@ class PiArrayTransform(mo.MMALPythonComponent):
     Override the :meth:`transform` method to modify buffers sent to the
     component, then place it in your MMAL pipeline as you would a normal
     encoder.
+
+    By default, :meth:`transform` is called on the component's own thread so
+    each frame must be finished before work on the next can begin. If
+    *executor* is specified (typically a
+    :class:`~concurrent.futures.ThreadPoolExecutor`) :meth:`transform` is
+    submitted to it instead, and up to *depth* (default 2) frames will be
+    transformed at once. Frames are still sent to the output port in the
+    order they arrived. This is worthwhile when :meth:`transform` spends
+    most of its time in numpy operations, which release the GIL.
+
+    Each frame in flight holds a buffer from the input port and one from the
+    output port. The input port's buffer count is raised to accommodate
+    *depth* frames automatically, but the port connected to the output may
+    require more buffers too, or frames will be dropped.
+
+    .. versionchanged:: 1.14
+        The *executor* and *depth* parameters were added
     """
-    __slots__ = ()
+    __slots__ = ('_executor', '_depth', '_pending', '_lock')
 
-    def __init__(self, formats=('rgb', 'bgr', 'rgba', 'bgra')):
+    def __init__(
+            self, formats=('rgb', 'bgr', 'rgba', 'bgra'), executor=None,
+            depth=2):
         super(PiArrayTransform, self).__init__()
+        if depth < 1:
+            raise PiCameraValueError('depth must be 1 or greater')
+        self._executor = executor
+        self._depth = depth
+        self._pending = deque()
+        self._lock = Lock()
         if isinstance(formats, bytes):
             formats = formats.decode('ascii')
         if isinstance(formats, str):
@@ -866,22 +1001,102 @@ class PiArrayTransform(mo.MMALPythonComponent):
         self.inputs[0].supported_formats = formats
         self.outputs[0].supported_formats = formats
 
-    def _callback(self, port, source_buf):
+    def disable(self):
+        try:
+            super(PiArrayTransform, self).disable()
+        finally:
+            # Frames still in flight may fail after the base class has checked
+            # for errors; report those too, but only once
+            self._flush()
+            error, self._error = self._error, None
+        if error:
+            raise error
+
+    def _commit_port(self, port):
+        super(PiArrayTransform, self)._commit_port(port)
+        if self._executor is not None and port.type == mmal.MMAL_PORT_TYPE_INPUT:
+            # One buffer for each frame in flight, plus one to receive the
+            # next frame
+            port.buffer_count = max(port.buffer_count, self._depth + 1)
+
+    def _handle_frame(self, port, source_buf):
         try:
             target_buf = self.outputs[0].get_buffer(False)
         except PiCameraPortDisabled:
             return False
         if target_buf:
             target_buf.copy_meta(source_buf)
-            result = self.transform(
-                MMALArrayBuffer(port, source_buf._buf),
-                MMALArrayBuffer(self.outputs[0], target_buf._buf))
-            try:
-                self.outputs[0].send_buffer(target_buf)
-            except PiCameraPortDisabled:
-                return False
+            source = MMALArrayBuffer(port, source_buf._buf)
+            target = MMALArrayBuffer(self.outputs[0], target_buf._buf)
+            if self._executor is None:
+                self.transform(source, target)
+                self._send(target_buf)
+            else:
+                # The source buffer is released by _thread_run when we
+                # return; keep it until the transform has finished
+                source_buf.acquire()
+                future = self._executor.submit(self.transform, source, target)
+                with self._lock:
+                    self._pending.append((future, source_buf, target_buf))
+                    oldest = (
+                        self._pending[0][0]
+                        if len(self._pending) >= self._depth else None)
+                future.add_done_callback(self._complete)
+                if oldest is not None:
+                    # Don't accept another frame until one of those in
+                    # flight is finished
+                    self._wait(oldest)
+                    self._complete()
         return False
 
+    def _handle_format_changed(self, port, buf):
+        self._flush()
+        return super(PiArrayTransform, self)._handle_format_changed(port, buf)
+
+    def _handle_end_of_stream(self, port, buf):
+        self._flush()
+        return super(PiArrayTransform, self)._handle_end_of_stream(port, buf)
+
+    def _send(self, target_buf):
+        try:
+            self.outputs[0].send_buffer(target_buf)
+        except PiCameraPortDisabled:
+            pass
+
+    def _wait(self, future):
+        try:
+            future.exception()
+        except Exception:
+            # Cancelled; _complete deals with it
+            pass
+
+    def _complete(self, future=None):
+        # Called as each transform finishes (in whatever thread it ran on);
+        # send every finished frame at the head of the queue onward so that
+        # frames leave in the order they arrived
+        with self._lock:
+            while self._pending and self._pending[0][0].done():
+                future, source_buf, target_buf = self._pending.popleft()
+                source_buf.release()
+                try:
+                    future.result()
+                except Exception as e:
+                    target_buf.release()
+                    if self._error is None:
+                        self._error = e
+                    self._enabled = False
+                    if self._queue is not None:
+                        self._queue.wake()
+                else:
+                    self._send(target_buf)
+
+    def _flush(self):
+        with self._lock:
+            pending = [future for future, source_buf, target_buf in self._pending]
+        for future in pending:
+            self._wait(future)
+        self._complete()
+
     def transform(self, source, target):
         """
         This method will be called for every frame passing through the
@@ -904,5 +1119,9 @@ class PiArrayTransform(mo.MMALPythonComponent):
         The target buffer's meta-data starts out as a copy of the source
         buffer's meta-data, but the target buffer's data starts out
         uninitialized.
+
+        If an *executor* was given to the constructor, this method will be
+        called from the executor's workers, and may be running for several
+        frames at once.
         """
         return False
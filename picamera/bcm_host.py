@@ -44,7 +44,10 @@ str = type('')
 import ctypes as ct
 import warnings
 
-_lib = ct.CDLL('libbcm_host.so')
+from .lazy import LazyLibrary
+
+# The library is loaded, and each function bound, on first call
+_lib = LazyLibrary('libbcm_host.so', globals())
 
 # bcm_host.h #################################################################
 
@@ -68,6 +68,7 @@ from .encoders import (
     PiRawMultiImageEncoder,
     PiCookedOneImageEncoder,
     PiCookedMultiImageEncoder,
+    PiEncoderPool,
     )
 from .renderers import (
     PiPreviewRenderer,
@@ -209,6 +210,7 @@ class PiCamera(object):
     MAX_FRAMERATE = PiCameraMaxFramerate # modified by PiCamera.__init__
     DEFAULT_ANNOTATE_SIZE = 32
     CAPTURE_TIMEOUT = 60
+    ENCODER_POOL_SIZE = 2
 
     SENSOR_MODES = {
         'ov5647': {
@@ -361,11 +363,23 @@ class PiCamera(object):
     _ISP_BLOCKS_R     = {v: k for (k, v) in ISP_BLOCKS.items()}
     _COLORSPACES_R    = {v: k for (k, v) in COLORSPACES.items()}
 
+    # Properties whose setters reconfigure the camera (see configure)
+    _CONFIG_SETTINGS = frozenset((
+        'sensor_mode',
+        'resolution',
+        'framerate',
+        'framerate_range',
+        'clock_mode',
+        'isp_blocks',
+        'colorspace',
+        ))
+
     __slots__ = (
         '_used_led',
         '_led_pin',
         '_camera',
         '_camera_config',
+        '_config_changes',
         '_camera_exception',
         '_revision',
         '_preview',
@@ -377,6 +391,7 @@ class PiCamera(object):
         '_splitter_connection',
         '_encoders_lock',
         '_encoders',
+        '_encoder_pool',
         '_overlays',
         '_raw_format',
         '_image_effect_params',
@@ -387,6 +402,7 @@ class PiCamera(object):
         options = self._parse_options(args, kwargs)
         self._camera = None
         self._camera_config = None
+        self._config_changes = None
         self._camera_exception = None
         self._preview = None
         self._preview_alpha = 255
@@ -397,6 +413,7 @@ class PiCamera(object):
         self._splitter_connection = None
         self._encoders_lock = threading.Lock()
         self._encoders = {}
+        self._encoder_pool = PiEncoderPool(self.ENCODER_POOL_SIZE)
         self._overlays = []
         self._raw_format = 'yuv'
         self._image_effect_params = None
@@ -853,7 +870,13 @@ class PiCamera(object):
         resize the output to (presumably by including a resizer in the
         pipeline). Finally, *options* includes extra keyword arguments that
         should be passed verbatim to the encoder.
+
+        Any idle encoder retained by the camera's encoder pool on
+        *output_port* is closed before the new encoder is constructed. Custom
+        implementations of this method (and of :meth:`_get_images_encoder` and
+        :meth:`_get_video_encoder`) should do the same.
         """
+        self._encoder_pool.evict(output_port)
         encoder_class = (
                 PiRawOneImageEncoder if format in self.RAW_FORMATS else
                 PiCookedOneImageEncoder)
@@ -874,6 +897,7 @@ class PiCamera(object):
         All parameters are the same as in :meth:`_get_image_encoder`. Please
         refer to the documentation for that method for further information.
         """
+        self._encoder_pool.evict(output_port)
         encoder_class = (
                 PiRawMultiImageEncoder if format in self.RAW_FORMATS else
                 PiCookedMultiImageEncoder)
@@ -902,6 +926,7 @@ class PiCamera(object):
         pipeline). Finally, *options* includes extra keyword arguments that
         should be passed verbatim to the encoder.
         """
+        self._encoder_pool.evict(output_port)
         encoder_class = (
                 PiRawVideoEncoder if format in self.RAW_FORMATS else
                 PiCookedVideoEncoder)
@@ -927,6 +952,7 @@ class PiCamera(object):
         if self._preview:
             self._preview.close()
             self._preview = None
+        self._encoder_pool.clear()
         if self._splitter:
             self._splitter.close()
             self._splitter = None
@@ -943,6 +969,76 @@ class PiCamera(object):
     def __exit__(self, exc_type, exc_value, exc_tb):
         self.close()
 
+    def configure(self, **settings):
+        """
+        Set several properties of the camera at once, reconfiguring the camera
+        only once.
+
+        Each keyword argument names a writeable property of the camera. For
+        example::
+
+            camera.configure(resolution='1080p', framerate=30, sensor_mode=1)
+
+        Setting any of :attr:`resolution`, :attr:`framerate`,
+        :attr:`framerate_range`, :attr:`sensor_mode`, :attr:`clock_mode`,
+        :attr:`isp_blocks`, or :attr:`colorspace` disables the camera,
+        reconfigures its ports, and re-enables it, which can take hundreds of
+        milliseconds. This method validates each of those settings as the
+        properties would, but combines them into a single reconfiguration.
+        Any other properties specified (e.g. :attr:`iso` or
+        :attr:`framerate_delta`) are set afterwards.
+
+        If any setting is invalid, :exc:`PiCameraValueError` is raised and
+        none of the settings which require reconfiguration are applied. If
+        one of the other properties fails to be set, the camera is restored
+        to its prior configuration (and the other properties already set are
+        restored to their prior values) before the exception is raised. As
+        with the constructor, *framerate* and *framerate_range* cannot both be
+        specified. The camera must not be recording when settings requiring
+        reconfiguration are specified.
+
+        .. versionadded:: 1.14
+        """
+        self._check_camera_open()
+        for name in settings:
+            prop = getattr(type(self), name, None)
+            if not isinstance(prop, property) or prop.fset is None:
+                raise PiCameraValueError('Invalid camera setting %s' % name)
+        if 'framerate' in settings and 'framerate_range' in settings:
+            raise PiCameraValueError(
+                "Can't specify framerate and framerate_range")
+        self._config_changes = {}
+        try:
+            for name, value in settings.items():
+                if name in self._CONFIG_SETTINGS:
+                    setattr(self, name, value)
+            changes = self._config_changes
+        finally:
+            self._config_changes = None
+        old_config = self._get_config()
+        if changes:
+            self._reconfigure(**changes)
+        restore = []
+        try:
+            for name, value in settings.items():
+                if name not in self._CONFIG_SETTINGS:
+                    try:
+                        restore.append((name, getattr(self, name)))
+                    except PiCameraError:
+                        # Some properties (e.g. framerate_delta with a
+                        # framerate_range) can't be read back; these can't
+                        # be restored
+                        pass
+                    setattr(self, name, value)
+        except:
+            # Roll back everything applied so far so a failed configure
+            # doesn't leave the camera half-configured
+            for name, value in reversed(restore):
+                setattr(self, name, value)
+            if changes:
+                self._reconfigure(**old_config._asdict())
+            raise
+
     def start_preview(self, **options):
         """
         Displays the preview overlay.
@@ -1186,6 +1282,11 @@ class PiCamera(object):
           output. Otherwise, this can be a filename string, a file-like object,
           or a writeable buffer object (as with the *output* parameter).
 
+        * *motion_vectors* - When ``True``, the encoder produces motion
+          vector estimation data for callables added with
+          :meth:`add_motion_subscriber`, even if no *motion_output* is
+          specified. Defaults to ``False`` if not specified.
+
         All encoded formats accept the following additional options:
 
         * *bitrate* - The bitrate at which video will be encoded. Defaults to
@@ -1217,6 +1318,9 @@ class PiCamera(object):
         .. versionchanged:: 1.11
             Support for buffer outputs was added.
 
+        .. versionchanged:: 1.14
+            The *motion_vectors* parameter was added.
+
         .. _H.264 level: https://en.wikipedia.org/wiki/H.264/MPEG-4_AVC#Levels
         """
         if 'quantization' in options:
@@ -1293,6 +1397,205 @@ class PiCamera(object):
         else:
             return encoder.split(output, options.get('motion_output'))
 
+    def schedule_split_recording(
+            self, outputs, seconds=None, size=None, callback=None,
+            splitter_port=1):
+        """
+        Schedule future splits of the recording without blocking.
+
+        Unlike :meth:`split_recording`, which blocks until the next split point
+        has been reached, this method returns immediately. The recording
+        continues in the current output until the segment written to it is at
+        least *seconds* long, or at least *size* bytes in size (either or both
+        may be specified). At the next split point after that (an inline SPS
+        header for H264 recordings), the recording switches to the next item of
+        *outputs*, and so on until *outputs* is exhausted. Each item of
+        *outputs* is treated as in the :meth:`start_recording` method (it can
+        be a string, a file-like object, or a writeable buffer object).
+
+        For example, to record a series of (roughly) 10 second clips without
+        a loop calling :meth:`split_recording`::
+
+            import picamera
+
+            def segment_done(output, first_frame, last_frame):
+                print('%s holds frames %d to %d' % (
+                    output, first_frame.index, last_frame.index))
+
+            with picamera.PiCamera() as camera:
+                camera.start_recording('clip000.h264')
+                camera.schedule_split_recording(
+                    ('clip%03d.h264' % i for i in range(1, 100)),
+                    seconds=10, callback=segment_done)
+                camera.wait_recording(120)
+                camera.stop_recording()
+
+        Each output is opened before it is required, and each completed
+        segment is closed in a background thread. If *callback* is specified,
+        it is called from that thread with the output, and the first and last
+        :class:`PiVideoFrame` of each segment as it completes (including the
+        final segment when recording stops).
+
+        The *splitter_port* parameter specifies which port of the video
+        splitter the encoder you wish to split is attached to. This defaults to
+        ``1``.
+
+        As with :meth:`split_recording`, H264 recordings must have been started
+        with *inline_headers* set to ``True`` (the default). Split points are
+        only as frequent as the encoder's *intra_period*, so set this
+        appropriately for the *seconds* requested.
+
+        The method returns a :class:`PiVideoSplitSchedule` whose
+        :meth:`~PiVideoSplitSchedule.cancel` method can be used to abandon the
+        remaining splits.
+
+        .. versionadded:: 1.14
+        """
+        try:
+            with self._encoders_lock:
+                encoder = self._encoders[splitter_port]
+        except KeyError:
+            raise PiCameraNotRecording(
+                    'There is no recording in progress on '
+                    'port %d' % splitter_port)
+        else:
+            return encoder.schedule_split(outputs, seconds, size, callback)
+
+    def add_motion_subscriber(self, subscriber, splitter_port=1):
+        """
+        Deliver the recording's motion vector data to *subscriber*.
+
+        This is an alternative to the *motion_output* parameter of
+        :meth:`start_recording` which avoids the need for a second output
+        object. The recording must have been started with the *motion_vectors*
+        (or *motion_output*) option. For each frame, *subscriber* is called
+        with the :class:`PiVideoFrame` of the picture, and the
+        :class:`~mmalobj.MMALBuffer` containing its motion data, from the
+        encoder's background thread. The buffer is only valid for the duration
+        of the call.
+
+        The :class:`~picamera.array.PiMotionRing` class is a subscriber which
+        copies motion data into a pre-allocated ring of numpy arrays, pairing
+        each with its frame::
+
+            import picamera
+            import picamera.array
+
+            with picamera.PiCamera() as camera:
+                ring = picamera.array.PiMotionRing(camera, frames=30)
+                camera.start_recording('video.h264', motion_vectors=True)
+                camera.add_motion_subscriber(ring)
+                seq = 0
+                for i in range(300):
+                    seq, frame, motion = ring.wait(seq, timeout=1)
+                    if frame is not None:
+                        print(frame.timestamp, motion['sad'].max())
+                camera.stop_recording()
+
+        If *subscriber* raises an exception, a :exc:`PiCameraWarning` is
+        issued and the recording continues.
+
+        The *splitter_port* parameter specifies which port of the video
+        splitter the encoder is attached to. This defaults to ``1``.
+
+        .. versionadded:: 1.14
+        """
+        try:
+            with self._encoders_lock:
+                encoder = self._encoders[splitter_port]
+        except KeyError:
+            raise PiCameraNotRecording(
+                    'There is no recording in progress on '
+                    'port %d' % splitter_port)
+        else:
+            encoder.add_motion_subscriber(subscriber)
+
+    def remove_motion_subscriber(self, subscriber, splitter_port=1):
+        """
+        Stop delivering the recording's motion vector data to *subscriber*,
+        previously added with :meth:`add_motion_subscriber`.
+
+        .. versionadded:: 1.14
+        """
+        try:
+            with self._encoders_lock:
+                encoder = self._encoders[splitter_port]
+        except KeyError:
+            raise PiCameraNotRecording(
+                    'There is no recording in progress on '
+                    'port %d' % splitter_port)
+        else:
+            encoder.remove_motion_subscriber(subscriber)
+
+    def adapt_recording_bitrate(
+            self, min_bitrate=None, max_bitrate=None, bandwidth=None,
+            backlog=None, quality=None, interval=1, splitter_port=1):
+        """
+        Adapt the bitrate of the recording to the available bandwidth.
+
+        The *bitrate* of a recording is normally fixed when
+        :meth:`start_recording` is called. This method starts a background
+        controller which adjusts the encoder's bitrate while recording, between
+        *min_bitrate* and *max_bitrate*, every *interval* seconds. If
+        *max_bitrate* is not specified it defaults to the bitrate the recording
+        was started with; it cannot exceed the limit of the H.264 level
+        selected. If *min_bitrate* is not specified it defaults to a tenth of
+        *max_bitrate*.
+
+        The controller needs a measure of the available bandwidth. Either
+        provide *bandwidth*, a callable returning an estimate of the available
+        bandwidth in bits per second, or *backlog*, a callable returning the
+        amount of output queued but not yet sent. In the latter case the
+        bitrate is reduced while the backlog grows, and gradually increased
+        again once it has cleared. For example, to adapt the bitrate of a
+        recording to a network socket with Linux's ``TIOCOUTQ`` ioctl::
+
+            import fcntl
+            import socket
+            import struct
+            import termios
+            import picamera
+
+            def backlog():
+                return struct.unpack('i', fcntl.ioctl(
+                    sock.fileno(), termios.TIOCOUTQ, b'\\0' * 4))[0]
+
+            sock = socket.create_connection(('my_server', 8000))
+            with picamera.PiCamera() as camera:
+                camera.start_recording(sock.makefile('wb'), format='h264',
+                                       bitrate=4000000)
+                camera.adapt_recording_bitrate(
+                    min_bitrate=250000, backlog=backlog)
+                camera.wait_recording(60)
+                camera.stop_recording()
+
+        If *quality* is given as a ``(best, worst)`` tuple of quantization
+        parameters, the encoder's minimum quantization is also raised towards
+        *worst* when the bitrate cannot be reduced any further.
+
+        The *splitter_port* parameter specifies which port of the video
+        splitter the encoder you wish to control is attached to. This defaults
+        to ``1``.
+
+        The method returns a :class:`PiBitrateController` whose
+        :meth:`~PiBitrateController.stop` method can be used to stop adapting
+        the bitrate. The controller stops automatically when the recording
+        stops.
+
+        .. versionadded:: 1.14
+        """
+        try:
+            with self._encoders_lock:
+                encoder = self._encoders[splitter_port]
+        except KeyError:
+            raise PiCameraNotRecording(
+                    'There is no recording in progress on '
+                    'port %d' % splitter_port)
+        else:
+            return encoder.adapt_bitrate(
+                min_bitrate, max_bitrate, bandwidth, backlog, quality,
+                interval)
+
     def request_key_frame(self, splitter_port=1):
         """
         Request the encoder generate a key-frame as soon as possible.
@@ -1580,6 +1883,11 @@ class PiCamera(object):
         .. versionchanged:: 1.11
             Support for buffer outputs was added.
 
+        .. versionchanged:: 1.14
+            Encoders are now retained in a pool (of up to
+            :attr:`ENCODER_POOL_SIZE` encoders) between captures, so repeated
+            captures with identical parameters re-use the encoder pipeline.
+
         .. _definitions of quality: http://photo.net/learn/jpeg/#qual
         """
         if format == 'raw':
@@ -1596,10 +1904,19 @@ class PiCamera(object):
         with self._encoders_lock:
             camera_port, output_port = self._get_ports(use_video_port, splitter_port)
             format = self._get_image_format(output, format)
-            encoder = self._get_image_encoder(
-                    camera_port, output_port, format, resize, **options)
+            # Re-use an idle encoder constructed for an identical capture if
+            # one is available; this avoids the cost of constructing,
+            # connecting and committing the encoder pipeline again
+            key = self._encoder_pool.make_key(
+                    camera_port, output_port, format, resize, options)
+            encoder = self._encoder_pool.acquire(key)
+            if encoder is None:
+                encoder = self._get_image_encoder(
+                        camera_port, output_port, format, resize, **options)
+                self._encoder_pool.prepare(key, encoder)
             if use_video_port:
                 self._encoders[splitter_port] = encoder
+        released = False
         try:
             if bayer:
                 camera_port.params[mmal.MMAL_PARAMETER_ENABLE_RAW_CAPTURE] = True
@@ -1609,8 +1926,13 @@ class PiCamera(object):
             if not encoder.wait(self.CAPTURE_TIMEOUT):
                 raise PiCameraRuntimeError(
                     'Timed out waiting for capture to end')
+            # Only an encoder which completed its capture is returned to the
+            # pool; release() closes the encoder itself if it fails
+            released = True
+            self._encoder_pool.release(key, encoder)
         finally:
-            encoder.close()
+            if not released:
+                encoder.close()
             with self._encoders_lock:
                 if use_video_port:
                     del self._encoders[splitter_port]
@@ -1674,6 +1996,12 @@ class PiCamera(object):
         More complex effects can be obtained by using a generator function to
         provide the filenames or output objects.
 
+        When *use_video_port* is ``True`` and *outputs* is a list or tuple,
+        outputs are opened ahead of time and closed in the background to
+        permit higher capture rates; all outputs are closed by the time this
+        method returns. Generators are only advanced once the prior output has
+        been closed.
+
         .. versionchanged:: 1.0
             The *resize* parameter was added, and raw capture formats can now
             be specified directly
@@ -1683,6 +2011,10 @@ class PiCamera(object):
 
         .. versionchanged:: 1.11
             Support for buffer outputs was added.
+
+        .. versionchanged:: 1.14
+            Outputs given as a list or tuple are opened ahead of time when
+            *use_video_port* is ``True``.
         """
         if use_video_port:
             if burst:
@@ -2233,21 +2565,43 @@ class PiCamera(object):
             colorspace=self._camera.outputs[0].colorspace
         )
 
+    def _reconfigure(self, **changes):
+        """
+        An internal method which applies *changes* (fields of
+        :class:`PiCameraConfig`) to the current configuration with
+        :meth:`_configure_camera`, disabling the camera around the change.
+
+        This method is used by the setters of the properties listed in
+        :meth:`configure`. While :meth:`configure` is running, the changes are
+        merely accumulated so they can be applied together at the end.
+        """
+        if self._config_changes is not None:
+            self._config_changes.update(changes)
+            return
+        config = self._get_config()
+        self._disable_camera()
+        self._configure_camera(config, config._replace(**changes))
+        self._configure_splitter()
+        self._enable_camera()
+
     def _configure_camera(self, old, new):
         """
         An internal method for setting a new camera mode, framerate,
         resolution, clock_mode, and/or ISP blocks.
 
-        This method is used by the setters of the :attr:`resolution`,
-        :attr:`framerate`, :attr:`framerate_range`, :attr:`sensor_mode`, and
-        :attr:`isp_blocks` properties. It assumes the camera is currently
-        disabled.
+        This method is used by :meth:`_reconfigure` on behalf of the setters of
+        the :attr:`resolution`, :attr:`framerate`, :attr:`framerate_range`,
+        :attr:`sensor_mode`, and :attr:`isp_blocks` properties. It assumes the
+        camera is currently disabled.
 
         The *old* and *new* arguments are :class:`PiCameraConfig` structures.
         Both are required to ensure correct operation on older firmwares
         (specifically that we don't try to set the sensor mode when both old
         and new modes are 0 or automatic).
         """
+        # Idle pooled encoders were committed with the old port formats so
+        # they must be discarded before the camera is reconfigured
+        self._encoder_pool.clear()
         old_cc = mmal.MMAL_PARAMETER_CAMERA_CONFIG_T.from_buffer_copy(
             self._camera_config)
         old_ports = [
@@ -2355,11 +2709,7 @@ class PiCamera(object):
         value = mo.to_fraction(value, den_limit=256)
         if not (0 < value <= self.MAX_FRAMERATE):
             raise PiCameraValueError("Invalid framerate: %.2ffps" % value)
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(framerate=value))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(framerate=value)
     framerate = property(_get_framerate, _set_framerate, doc="""\
         Retrieves or sets the framerate at which video-port based image
         captures, video recordings, and previews will run.
@@ -2443,11 +2793,7 @@ class PiCamera(object):
                     "Invalid sensor mode: %d (valid range 0..7)" % value)
         except TypeError:
             raise PiCameraValueError("Invalid sensor mode: %s" % value)
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(sensor_mode=value))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(sensor_mode=value)
     sensor_mode = property(_get_sensor_mode, _set_sensor_mode, doc="""\
         Retrieves or sets the input mode of the camera's sensor.
 
@@ -2484,11 +2830,7 @@ class PiCamera(object):
             clock_mode = self.CLOCK_MODES[value]
         except KeyError:
             raise PiCameraValueError("Invalid clock mode %s" % value)
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(clock_mode=clock_mode))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(clock_mode=clock_mode)
     clock_mode = property(_get_clock_mode, _set_clock_mode, doc="""\
         Retrieves or sets the mode of the camera's clock.
 
@@ -2520,14 +2862,10 @@ class PiCamera(object):
         value = set(value)
         invalid = value - set(self.ISP_BLOCKS.keys())
         if invalid:
-            raise PiCameraValueerror("Invalid ISP block %s" % invalid.pop())
+            raise PiCameraValueError("Invalid ISP block %s" % invalid.pop())
         isp_blocks = reduce(and_, (~v for k, v in self.ISP_BLOCKS.items()
                                   if k not in value), 0xFFFFFFFF)
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(isp_blocks=isp_blocks))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(isp_blocks=isp_blocks)
     isp_blocks = property(_get_isp_blocks, _set_isp_blocks, doc="""\
         Retrieves or sets which ISP blocks are enabled for processing.
 
@@ -2565,11 +2903,7 @@ class PiCamera(object):
             colorspace = self.COLORSPACES[value]
         except KeyError:
             raise PiCameraValueError("Invalid colorspace %s" % value)
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(colorspace=colorspace))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(colorspace=colorspace)
     colorspace = property(_get_colorspace, _set_colorspace, doc="""\
         Retrieves or sets the `color space`_ that the camera uses for
         conversion between the `YUV`_ and RGB systems.
@@ -2612,11 +2946,7 @@ class PiCamera(object):
                 (0 < value.height <= self.MAX_RESOLUTION.height)):
             raise PiCameraValueError(
                     "Invalid resolution requested: %r" % (value,))
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(resolution=value))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(resolution=value)
     resolution = property(_get_resolution, _set_resolution, doc="""
         Retrieves or sets the resolution at which image captures, video
         recordings, and previews will be captured.
@@ -2684,11 +3014,7 @@ class PiCamera(object):
             raise PiCameraValueError("Invalid high framerate: %.2ffps" % high)
         if high < low:
             raise PiCameraValueError("framerate_range is backwards")
-        config = self._get_config()
-        self._disable_camera()
-        self._configure_camera(config, config._replace(framerate=(low, high)))
-        self._configure_splitter()
-        self._enable_camera()
+        self._reconfigure(framerate=(low, high))
     framerate_range = property(_get_framerate_range, _set_framerate_range, doc="""\
         Retrieves or sets a range between which the camera's framerate is
         allowed to float.
@@ -38,22 +38,33 @@ from __future__ import (
 str = type('')
 
 import datetime
+from time import time
 import threading
 import warnings
 import ctypes as ct
+from collections import OrderedDict, deque
 
 from . import bcm_host, mmal, mmalobj as mo
 from .frames import PiVideoFrame, PiVideoFrameType
 from .exc import (
+    mmal_check,
     PiCameraMMALError,
     PiCameraValueError,
     PiCameraIOError,
     PiCameraRuntimeError,
+    PiCameraWarning,
     PiCameraResizerEncoding,
     PiCameraAlphaStripping,
     PiCameraResolutionRounded,
     )
 
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional; without it alpha stripping falls back to a slower
+    # pure Python implementation
+    np = None
+
 
 class PiEncoder(object):
     """
@@ -442,17 +453,73 @@ class PiEncoder(object):
         self.output_port = None
 
 
+class PiFrameBufferRing(object):
+    """
+    A small ring of :class:`bytearray` buffers which are recycled in turn to
+    hold unencoded frame data. This is used internally by
+    :class:`MMALBufferAlphaStrip` and :class:`PiRawFrameAssembler` so that
+    raw video doesn't allocate a new buffer for every frame.
+
+    The *count* parameter specifies the number of buffers in the ring
+    (default 3). The content of a buffer is only overwritten when it comes
+    around again, i.e. after *count* - 1 further buffers have been taken.
+    """
+
+    def __init__(self, count=3):
+        if count < 1:
+            raise PiCameraValueError('count must be 1 or greater')
+        self._buffers = [None] * count
+        self._index = 0
+
+    def take(self, size):
+        """
+        Returns the next buffer in the ring, which is exactly *size* bytes
+        long. The content of the buffer is undefined.
+        """
+        buf = self._buffers[self._index]
+        if buf is None or len(buf) != size:
+            # Replace rather than resize the buffer; a consumer may still hold
+            # a view of the old one
+            buf = bytearray(size)
+            self._buffers[self._index] = buf
+        self._index = (self._index + 1) % len(self._buffers)
+        return buf
+
+
 class MMALBufferAlphaStrip(mo.MMALBuffer):
     """
     An MMALBuffer descendent that strips alpha bytes from the buffer data. This
     is used internally by PiRawMixin when it needs to strip alpha bytes itself
     (e.g. because an appropriate format cannot be selected on an output port).
+
+    The RGB bytes are written into a buffer taken from the
+    :class:`PiFrameBufferRing` *ring*, which is recycled for later frames; the
+    :attr:`data` of a stripped buffer is therefore only valid until a few
+    more frames have been stripped, and outputs must copy it if they wish to
+    keep it beyond the call to their ``write`` method. If numpy is available,
+    the locked buffer memory is read through a numpy view and copied into
+    the output buffer directly.
     """
 
-    def __init__(self, buf):
+    def __init__(self, buf, ring):
         super(MMALBufferAlphaStrip, self).__init__(buf)
-        self._stripped = bytearray(super(MMALBufferAlphaStrip, self).data)
-        del self._stripped[3::4]
+        pixels = self._buf[0].length // 4
+        self._stripped = ring.take(pixels * 3)
+        if pixels and np is None:
+            data = super(MMALBufferAlphaStrip, self).data
+            for channel in range(3):
+                self._stripped[channel::3] = data[channel:pixels * 4:4]
+        elif pixels:
+            with self as mem:
+                src = np.frombuffer(
+                    mem, dtype=np.uint8, count=pixels * 4,
+                    offset=self._buf[0].offset).reshape(pixels, 4)
+                dst = np.frombuffer(
+                    self._stripped, dtype=np.uint8).reshape(pixels, 3)
+                # Copying channel by channel is considerably faster than
+                # copying the (non-contiguous) 3-byte pixels in one go
+                for channel in range(3):
+                    dst[:, channel] = src[:, channel]
 
     @property
     def length(self):
@@ -463,6 +530,104 @@ class MMALBufferAlphaStrip(mo.MMALBuffer):
         return self._stripped
 
 
+class MMALBufferFrame(mo.MMALBuffer):
+    """
+    An MMALBuffer descendent representing a complete frame assembled from
+    several buffers by :class:`PiRawFrameAssembler`. The meta-data (flags,
+    timestamps, etc.) is that of the final buffer of the frame, while
+    :attr:`data` is a :class:`bytearray` of the assembled frame.
+    """
+
+    def __init__(self, buf, data):
+        super(MMALBufferFrame, self).__init__(buf)
+        self._frame = data
+
+    @property
+    def length(self):
+        return len(self._frame)
+
+    @property
+    def data(self):
+        return self._frame
+
+
+class PiRawFrameAssembler(object):
+    """
+    Assembles unencoded frames which MMAL delivers across several buffers.
+    This is used internally by :class:`PiRawVideoEncoder` so that its outputs
+    receive exactly one write per frame.
+
+    The *frame_size* parameter is the expected size of a frame in bytes.
+    Frames are assembled in buffers taken from a :class:`PiFrameBufferRing`
+    (of *count* buffers) and copied straight from the locked MMAL buffer
+    memory. An assembled frame is therefore only valid until *count* - 1
+    further frames have been assembled; outputs must copy it if they wish to
+    keep it beyond the call to their ``write`` method.
+    """
+
+    def __init__(self, frame_size, count=3):
+        self.frame_size = frame_size
+        self._ring = PiFrameBufferRing(count)
+        self._frame = None
+        self._length = 0
+
+    def reset(self):
+        """
+        Discards any partially assembled frame.
+        """
+        self._frame = None
+        self._length = 0
+
+    def _append(self, buf):
+        length = self._length + buf.length
+        if self._frame is None:
+            self._frame = self._ring.take(max(self.frame_size, length))
+        elif length > len(self._frame):
+            # The frame is larger than expected; move it to a larger buffer
+            # (the ring replaces the smaller ones as they come around)
+            self.frame_size = length
+            frame = bytearray(length)
+            frame[:self._length] = memoryview(self._frame)[:self._length]
+            self._frame = frame
+        if isinstance(buf, MMALBufferAlphaStrip):
+            memoryview(self._frame)[self._length:length] = buf.data
+        else:
+            target = (ct.c_uint8 * buf.length).from_buffer(
+                self._frame, self._length)
+            with buf as mem:
+                ct.memmove(
+                    target, ct.byref(mem, buf._buf[0].offset), buf.length)
+            del target
+        self._length = length
+
+    def feed(self, buf):
+        """
+        Adds the :class:`~mmalobj.MMALBuffer` *buf* to the frame under
+        assembly. Returns ``None`` if the frame is incomplete, or a buffer
+        containing the whole frame otherwise. When a frame arrives in a single
+        buffer, *buf* itself is returned and no copy is made. Otherwise the
+        returned :class:`MMALBufferFrame` refers to a recycled buffer (see
+        above).
+        """
+        complete = bool(buf.flags & (
+            mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END |
+            mmal.MMAL_BUFFER_HEADER_FLAG_EOS))
+        if complete and not self._length:
+            return buf
+        if buf.length:
+            self._append(buf)
+        if complete:
+            frame, length = self._frame, self._length
+            self._frame = None
+            self._length = 0
+            if length < len(frame):
+                # A short (e.g. final) frame; rare enough that copying it is
+                # simpler than handing out a view
+                frame = frame[:length]
+            return MMALBufferFrame(buf._buf, frame)
+        return None
+
+
 class PiRawMixin(PiEncoder):
     """
     Mixin class for "raw" (unencoded) output.
@@ -505,9 +670,10 @@ class PiRawMixin(PiEncoder):
                         "upgrading your firmware with sudo rpi-update "
                         "may improve performance"))
         # Workaround: If a non-alpha format is requested with the resizer, use
-        # the alpha-inclusive format and set a flag to get the callback to
-        # strip the alpha bytes
-        self._strip_alpha = False
+        # the alpha-inclusive format and give the callback a ring of buffers
+        # to strip the alpha bytes into
+        self._alpha_ring = None
+        self._assembler = None
         if resize:
             width, height = resize
             try:
@@ -515,12 +681,13 @@ class PiRawMixin(PiEncoder):
                     'rgb': 'rgba',
                     'bgr': 'bgra',
                     }[format]
-                self._strip_alpha = True
-                warnings.warn(
-                    PiCameraAlphaStripping(
-                        "using alpha-stripping to convert to non-alpha "
-                        "format; you may find the equivalent alpha format "
-                        "faster"))
+                self._alpha_ring = PiFrameBufferRing()
+                if np is None:
+                    warnings.warn(
+                        PiCameraAlphaStripping(
+                            "using alpha-stripping to convert to non-alpha "
+                            "format; you may find the equivalent alpha "
+                            "format faster"))
             except KeyError:
                 pass
         else:
@@ -572,12 +739,379 @@ class PiRawMixin(PiEncoder):
         """
         _callback_write(buf, key=PiVideoFrameType.frame)
 
-        Overridden to strip alpha bytes when required.
+        Overridden to strip alpha bytes when required, and to assemble
+        complete frames if a :class:`PiRawFrameAssembler` is in use.
         """
-        if self._strip_alpha:
-            return super(PiRawMixin, self)._callback_write(MMALBufferAlphaStrip(buf._buf), key)
+        if self._alpha_ring is not None:
+            buf = MMALBufferAlphaStrip(buf._buf, self._alpha_ring)
+        if self._assembler is not None:
+            buf = self._assembler.feed(buf)
+            if buf is None:
+                # Partial frame; nothing to write until the frame is complete.
+                # As PiVideoEncoder only sees complete frames, it can only
+                # switch outputs between frames
+                return False
+        return super(PiRawMixin, self)._callback_write(buf, key)
+
+
+class PiVideoSplitSchedule(object):
+    """
+    Tracks a sequence of splits scheduled with
+    :meth:`PiVideoEncoder.schedule_split`.
+
+    Users should never need to construct this class directly; it is returned
+    by :meth:`PiVideoEncoder.schedule_split` (and
+    :meth:`~PiCamera.schedule_split_recording`) and can be used to
+    :meth:`cancel` the remaining splits.
+
+    The *encoder* parameter is the :class:`PiVideoEncoder` the schedule
+    belongs to. The *outputs* parameter is an iterable of outputs (filenames,
+    file-like objects, or writeable buffers) to switch to in turn. The
+    *seconds* and *size* parameters give the criteria for ending a segment, and
+    *callback* is the optional segment-complete callback (see
+    :meth:`PiVideoEncoder.schedule_split` for details).
+
+    The next output is always opened ahead of time, and completed segments are
+    closed (and reported to *callback*) by a background thread, so that the
+    encoder's callback only has to switch between already opened outputs.
+    """
+    def __init__(self, encoder, outputs, seconds=None, size=None, callback=None):
+        if seconds is None and size is None:
+            raise PiCameraValueError(
+                'You must specify seconds, or size, or both')
+        self.encoder = encoder
+        self.seconds = seconds
+        self.size = size
+        self.callback = callback
+        self._outputs = iter(outputs)
+        with encoder.outputs_lock:
+            self._current = encoder.outputs[PiVideoFrameType.frame][0]
+        self._ready = None
+        self._exhausted = False
+        self._tasks = []
+        self._cond = threading.Condition()
+        self._closing = False
+        self.error = None
+        # Open the first output synchronously so that errors (e.g. bad
+        # filenames) are reported to the caller immediately
+        self._prefetch()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _prefetch(self):
+        if self._closing:
+            return
+        try:
+            output = next(self._outputs)
+        except StopIteration:
+            self._exhausted = True
         else:
-            return super(PiRawMixin, self)._callback_write(buf, key)
+            stream, opened = mo.open_stream(output)
+            with self._cond:
+                if self._closing:
+                    mo.close_stream(stream, opened)
+                else:
+                    self._ready = (output, stream, opened)
+
+    def _retire(self, output, stream, opened, first, last):
+        mo.close_stream(stream, opened)
+        if self.callback:
+            self.callback(output, first, last)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._tasks and not self._closing:
+                    self._cond.wait()
+                if not self._tasks:
+                    break
+                task, args = self._tasks.pop(0)
+            try:
+                task(*args)
+            except Exception as e:
+                # The encoder's callback raises the error on its next call,
+                # which stops the recording and reports the exception from
+                # wait_recording
+                self._exhausted = True
+                self.error = e
+
+    def _queue(self, task, *args):
+        with self._cond:
+            self._tasks.append((task, args))
+            self._cond.notify()
+
+    def due(self, last_frame, first_frame):
+        """
+        Returns ``True`` if the segment which began with *first_frame* and
+        ends with *last_frame* meets the schedule's criteria, *last_frame* is
+        the end of a frame, and the next output is ready to switch to.
+        """
+        if self._ready is None or not last_frame.complete:
+            return False
+        if self.size is not None and last_frame.split_size >= self.size:
+            return True
+        if self.seconds is not None:
+            start = first_frame.timestamp if first_frame is not None else 0
+            if last_frame.timestamp - start >= self.seconds * 1000000:
+                return True
+        return False
+
+    def switch(self, stream, opened, first_frame, last_frame):
+        """
+        Called by the encoder to switch outputs. The segment which was being
+        written to *stream* (spanning *first_frame* to *last_frame*) is queued
+        for closing, and the pre-opened next output's stream is returned as a
+        ``(stream, opened)`` tuple. Opening of the following output is queued
+        in the background.
+        """
+        with self._cond:
+            output, new_stream, new_opened = self._ready
+            self._ready = None
+            current, self._current = self._current, output
+        self._queue(
+            self._retire, current, stream, opened, first_frame, last_frame)
+        self._queue(self._prefetch)
+        return new_stream, new_opened
+
+    def replace(self, output, first_frame, last_frame):
+        """
+        Called by the encoder when :meth:`PiVideoEncoder.split` switches to
+        *output* while the schedule is active. The segment which ended
+        (spanning *first_frame* to *last_frame*) is reported to the callback,
+        and subsequent segments are attributed to *output* instead.
+        """
+        with self._cond:
+            current, self._current = self._current, output
+        if self.callback and last_frame is not None:
+            self._queue(self.callback, current, first_frame, last_frame)
+
+    @property
+    def finished(self):
+        """
+        Returns ``True`` once all outputs have been switched to.
+        """
+        return self._exhausted and self._ready is None
+
+    def finish(self, first_frame, last_frame):
+        """
+        Called by the encoder when recording stops. The final segment (spanning
+        *first_frame* to *last_frame*) is reported to the callback, and the
+        pre-opened next output (if any) is closed without being written to.
+        """
+        if self.callback and last_frame is not None:
+            self._queue(self.callback, self._current, first_frame, last_frame)
+        self._shutdown()
+
+    def cancel(self):
+        """
+        Cancel any remaining splits; recording continues to the current
+        output. The pre-opened next output (if any) is closed without being
+        written to.
+        """
+        with self.encoder.outputs_lock:
+            if self.encoder._schedule is self:
+                self.encoder._schedule = None
+        self._shutdown()
+
+    def _shutdown(self):
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            if self._ready is not None:
+                output, stream, opened = self._ready
+                self._ready = None
+                self._tasks.append((mo.close_stream, (stream, opened)))
+            self._cond.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+class PiBitrateController(object):
+    """
+    Adapts the bitrate of a recording in progress to the available bandwidth.
+
+    Users should never need to construct this class directly; it is returned
+    by :meth:`PiVideoEncoder.adapt_bitrate` (and
+    :meth:`~PiCamera.adapt_recording_bitrate`) and can be used to
+    :meth:`stop` adapting the bitrate.
+
+    The *encoder* parameter is the :class:`PiVideoEncoder` to control; the
+    controller sets parameters on its ``output_port``, and reads the amount of
+    video produced from its ``frame`` attribute. The encoder's bitrate is kept
+    between *min_bitrate* and *max_bitrate*.
+
+    If *bandwidth* is specified, it must be a callable returning an estimate
+    of the available bandwidth in bits per second; the bitrate tracks this
+    estimate (less 10% headroom). Otherwise, if *backlog* is specified, it must
+    be a callable returning the amount of output queued but not yet sent (e.g.
+    the length of a network client's queue). While the backlog grows, the bitrate is reduced
+    multiplicatively; once the backlog is empty, and the encoder is making
+    use of its current bitrate, it is increased gradually.
+
+    If *quality* is a ``(best, worst)`` tuple of quantization parameters
+    (e.g. ``(10, 40)``), the encoder's minimum quantization is raised towards
+    *worst* while the bitrate is at *min_bitrate* and the output remains
+    congested, and is lowered back towards *best* before the bitrate is
+    increased again. The minimum quantization is never raised above the
+    encoder's maximum quantization (set when a recording is started with a
+    *quality*).
+
+    The controller re-evaluates the bitrate every *interval* seconds in a
+    background thread, which is started by :meth:`start`. Alternatively,
+    :meth:`update` can be called directly.
+
+    .. versionadded:: 1.14
+    """
+
+    HEADROOM = 0.9
+    DECREASE = 0.75
+    INCREASE = 0.05
+    QUANT_STEP = 2
+
+    def __init__(
+            self, encoder, min_bitrate, max_bitrate, bandwidth=None,
+            backlog=None, quality=None, interval=1):
+        if not 0 < min_bitrate <= max_bitrate:
+            raise PiCameraValueError(
+                'min_bitrate must be greater than 0 and no greater than '
+                'max_bitrate')
+        if quality is not None:
+            best, worst = quality
+            if not 0 < best <= worst:
+                raise PiCameraValueError(
+                    'quality must be a (best, worst) tuple of quantization '
+                    'parameters')
+        if interval <= 0:
+            raise PiCameraValueError('interval must be greater than 0')
+        self.encoder = encoder
+        self.min_bitrate = min_bitrate
+        self.max_bitrate = max_bitrate
+        self.bandwidth = bandwidth
+        self.backlog = backlog
+        self.quality = quality
+        self.interval = interval
+        self.bitrate = getattr(encoder, '_bitrate', None) or max_bitrate
+        self.quantization = None
+        # The minimum quantization must never exceed the maximum (which is
+        # set when recording starts with quality); 0 means no maximum
+        self._max_quant = None
+        if quality is not None:
+            self._max_quant = encoder.output_port.params[
+                mmal.MMAL_PARAMETER_VIDEO_ENCODE_MAX_QUANT] or None
+        self.output_rate = None
+        self._last_size = None
+        self._last_time = None
+        self._last_backlog = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the background thread which calls :meth:`update` every
+        :attr:`interval` seconds.
+        """
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops adapting the bitrate. The encoder is left at its current
+        bitrate.
+        """
+        self._stopped.set()
+        if self._thread is not None and (
+                self._thread is not threading.current_thread()):
+            self._thread.join()
+        with self.encoder.outputs_lock:
+            if self.encoder._controller is self:
+                self.encoder._controller = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.update()
+            except Exception as e:
+                # Treat errors like those in the encoder's callback: stop the
+                # recording and report the exception from wait_recording
+                # (unless the callback already failed; that's the real cause)
+                self._stopped.set()
+                if self.encoder.exception is None:
+                    self.encoder.exception = e
+                self.encoder.event.set()
+
+    def _clamp(self, bitrate):
+        return int(max(self.min_bitrate, min(self.max_bitrate, bitrate)))
+
+    def _clamp_quant(self, quant):
+        if self._max_quant is not None:
+            return min(self._max_quant, quant)
+        return quant
+
+    def update(self, now=None):
+        """
+        Re-evaluates the bitrate, applying any change to the encoder's port.
+        The *now* parameter (which defaults to the current time) is used to
+        measure the encoder's output rate since the last update. Returns the
+        (possibly unchanged) bitrate.
+        """
+        if now is None:
+            now = time()
+        frame = self.encoder.frame
+        size = frame.video_size if frame is not None else 0
+        if self._last_time is not None and now > self._last_time:
+            self.output_rate = (
+                (size - self._last_size) * 8 / (now - self._last_time))
+        self._last_size = size
+        self._last_time = now
+        # Clamping here ensures the first update applies the limits if the
+        # encoder was started outside them
+        bitrate = self._clamp(self.bitrate)
+        quant = self.quantization
+        if quant is None and self.quality is not None:
+            quant = self._clamp_quant(self.quality[0])
+        if self.bandwidth is not None:
+            bitrate = self._clamp(self.bandwidth() * self.HEADROOM)
+            congested = bitrate == self.min_bitrate and (
+                self.output_rate is not None and
+                self.output_rate > bitrate)
+            idle = bitrate > self.min_bitrate
+        elif self.backlog is not None:
+            backlog = self.backlog()
+            congested = backlog > 0 and backlog >= self._last_backlog
+            idle = backlog == 0 and (
+                self.output_rate is None or
+                self.output_rate >= self.bitrate * self.HEADROOM)
+            self._last_backlog = backlog
+            if congested:
+                bitrate = self._clamp(bitrate * self.DECREASE)
+            elif idle and (
+                    quant is None or
+                    quant == self._clamp_quant(self.quality[0])):
+                bitrate = self._clamp(
+                    bitrate + self.max_bitrate * self.INCREASE)
+        else:
+            congested = idle = False
+        if quant is not None:
+            best, worst = self.quality
+            if congested and self.bitrate == self.min_bitrate:
+                quant = min(worst, quant + self.QUANT_STEP)
+            elif idle:
+                quant = max(best, quant - self.QUANT_STEP)
+            quant = self._clamp_quant(quant)
+        self._apply(bitrate, quant)
+        return self.bitrate
+
+    def _apply(self, bitrate, quant):
+        params = self.encoder.output_port.params
+        if bitrate != self.bitrate:
+            params[mmal.MMAL_PARAMETER_VIDEO_BIT_RATE] = bitrate
+            self.bitrate = bitrate
+        if quant != self.quantization:
+            params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_MIN_QUANT] = quant
+            self.quantization = quant
 
 
 class PiVideoEncoder(PiEncoder):
@@ -601,18 +1135,25 @@ class PiVideoEncoder(PiEncoder):
                 parent, camera_port, input_port, format, resize, **options)
         self._next_output = []
         self._split_frame = None
+        self._schedule = None
+        self._controller = None
+        self._segment_start = None
+        self._motion_subscribers = ()
+        self._picture_frame = None
         self.frame = None
 
     def _create_encoder(
             self, format, bitrate=17000000, intra_period=None, profile='high',
             level='4', quantization=0, quality=0, inline_headers=True,
             sei=False, sps_timing=False, motion_output=None,
-            intra_refresh=None):
+            intra_refresh=None, motion_vectors=False):
         """
         Extends the base :meth:`~PiEncoder._create_encoder` implementation to
         configure the video encoder for H.264 or MJPEG output.
         """
         super(PiVideoEncoder, self)._create_encoder(format)
+        self._bitrate = bitrate
+        self._bitrate_limit = None
 
         # XXX Remove quantization in 2.0
         quality = quality or quantization
@@ -692,6 +1233,7 @@ class PiVideoEncoder(PiEncoder):
                 (mmal.MMAL_VIDEO_LEVEL_H264_41, True):  62500000,
                 (mmal.MMAL_VIDEO_LEVEL_H264_42, True):  62500000,
                 }[level, profile == mmal.MMAL_VIDEO_PROFILE_H264_HIGH]
+            self._bitrate_limit = bitrate_limit
             if bitrate > bitrate_limit:
                 raise PiCameraValueError(
                     'bitrate %d exceeds %d which is the limit for the '
@@ -760,7 +1302,7 @@ class PiVideoEncoder(PiEncoder):
                 self.output_port.params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_SEI_ENABLE] = True
             if sps_timing:
                 self.output_port.params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_SPS_TIMING] = True
-            if motion_output is not None:
+            if motion_output is not None or motion_vectors:
                 self.output_port.params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_INLINE_VECTORS] = True
 
             # We need the intra-period to calculate the SPS header timeout in
@@ -816,6 +1358,8 @@ class PiVideoEncoder(PiEncoder):
                 timestamp=0,
                 complete=False,
                 )
+        self._segment_start = None
+        self._picture_frame = None
         if motion_output is not None:
             self._open_output(motion_output, PiVideoFrameType.motion_data)
         super(PiVideoEncoder, self).start(output)
@@ -823,6 +1367,13 @@ class PiVideoEncoder(PiEncoder):
     def stop(self):
         super(PiVideoEncoder, self).stop()
         self._close_output(PiVideoFrameType.motion_data)
+        with self.outputs_lock:
+            schedule, self._schedule = self._schedule, None
+            controller = self._controller
+        if schedule is not None:
+            schedule.finish(self._segment_start, self.frame)
+        if controller is not None:
+            controller.stop()
 
     def request_key_frame(self):
         """
@@ -867,12 +1418,136 @@ class PiVideoEncoder(PiEncoder):
         self.event.clear()
         return self._split_frame
 
+    def schedule_split(self, outputs, seconds=None, size=None, callback=None):
+        """
+        Schedule future switches of the encoder's output without blocking.
+
+        This method is called by :meth:`~PiCamera.schedule_split_recording`.
+        Unlike :meth:`split`, it returns immediately; the switch to each of
+        the *outputs* (an iterable of filenames, file-like objects, or
+        writeable buffers) takes place within :meth:`_callback_write` at the
+        first split point (an inline SPS header, or any frame for formats like
+        MJPEG) at which the current segment is at least *seconds* long or at
+        least *size* bytes in size. Either or both criteria may be specified.
+
+        Hence "split every N seconds" is achieved by passing an endless
+        iterable of outputs with *seconds* set to N, while "split at the next
+        key-frame after T seconds" is achieved with a single output and
+        *seconds* set to T.
+
+        The next output is opened ahead of time, and completed segments are
+        closed in a background thread. If *callback* is specified, it is
+        called (from that background thread) with ``(output, first_frame,
+        last_frame)`` as each segment completes, including the final segment
+        when recording stops. The *output* is the item of *outputs* that the
+        segment was written to (or the stream that was in use when the
+        schedule was created), while *first_frame* and *last_frame* are the
+        :class:`PiVideoFrame` meta-data of the first and last buffers written
+        to it. If :meth:`split` switches the output while the schedule is
+        active, the segment it ends is reported in the same way, and the
+        schedule continues from the new output. If opening or closing an
+        output fails in the background thread, the recording is stopped and
+        the exception is raised by :meth:`wait`.
+
+        Any previously scheduled splits are cancelled. Returns the
+        :class:`PiVideoSplitSchedule` which can be used to :meth:`cancel
+        <PiVideoSplitSchedule.cancel>` the remaining splits.
+        """
+        schedule = PiVideoSplitSchedule(self, outputs, seconds, size, callback)
+        with self.outputs_lock:
+            old_schedule, self._schedule = self._schedule, schedule
+        if old_schedule is not None:
+            old_schedule.cancel()
+        return schedule
+
+    def add_motion_subscriber(self, subscriber):
+        """
+        Adds *subscriber* to the callables which receive inline motion vector
+        data. This requires that the encoder was constructed with
+        *motion_vectors* (or *motion_output*) specified.
+
+        For each motion data buffer, *subscriber* is called from the encoder's
+        background thread with ``(frame, buf)``. The *frame* is the
+        :class:`PiVideoFrame` of the picture the motion data was estimated
+        from (``None`` if no picture has been seen yet), while *buf* is the
+        :class:`~mmalobj.MMALBuffer` holding the motion data. The buffer is
+        only valid for the duration of the call. See
+        :class:`~picamera.array.PiMotionRing` for a subscriber which copies
+        the motion data into a pre-allocated ring of numpy arrays.
+
+        If *subscriber* raises an exception, a :exc:`PiCameraWarning` is
+        issued and recording continues; the subscriber remains subscribed.
+        """
+        with self.outputs_lock:
+            self._motion_subscribers += (subscriber,)
+
+    def remove_motion_subscriber(self, subscriber):
+        """
+        Removes *subscriber* from the callables which receive motion vector
+        data. Raises :exc:`PiCameraValueError` if *subscriber* was not added
+        with :meth:`add_motion_subscriber`.
+        """
+        with self.outputs_lock:
+            if subscriber not in self._motion_subscribers:
+                raise PiCameraValueError(
+                    'subscriber %r is not subscribed' % subscriber)
+            self._motion_subscribers = tuple(
+                s for s in self._motion_subscribers if s is not subscriber)
+
+    def adapt_bitrate(
+            self, min_bitrate=None, max_bitrate=None, bandwidth=None,
+            backlog=None, quality=None, interval=1):
+        """
+        Adapt the encoder's bitrate to the available bandwidth while recording.
+
+        This method is called by :meth:`~PiCamera.adapt_recording_bitrate`.
+        It starts a :class:`PiBitrateController` which adjusts the bitrate
+        between *min_bitrate* and *max_bitrate* every *interval* seconds,
+        according to the *bandwidth* estimate or *backlog* callables (see
+        :class:`PiBitrateController` for details).
+
+        If *max_bitrate* is not specified it defaults to the bitrate the
+        recording was started with (or the limit of the H.264 level, if the
+        recording was started without a bitrate limit). It may not exceed the
+        limit of the H.264 level selected when recording started. If
+        *min_bitrate* is not specified it defaults to a tenth of
+        *max_bitrate*.
+
+        Any previous controller is stopped. Returns the new
+        :class:`PiBitrateController`.
+        """
+        limit = self._bitrate_limit
+        if max_bitrate is None:
+            max_bitrate = self._bitrate or limit
+            if not max_bitrate:
+                raise PiCameraValueError(
+                    'max_bitrate must be specified for recordings without '
+                    'a bitrate')
+        if limit is not None and max_bitrate > limit:
+            raise PiCameraValueError(
+                'max_bitrate %d exceeds %d which is the limit for the '
+                'selected H.264 level and profile' % (max_bitrate, limit))
+        if min_bitrate is None:
+            min_bitrate = max_bitrate // 10
+        controller = PiBitrateController(
+            self, min_bitrate, max_bitrate, bandwidth, backlog, quality,
+            interval)
+        with self.outputs_lock:
+            old_controller, self._controller = self._controller, controller
+        if old_controller is not None:
+            old_controller.stop()
+        controller.start()
+        return controller
+
     def _callback_write(self, buf, key=PiVideoFrameType.frame):
         """
         Extended to implement video frame meta-data tracking, and to handle
         splitting video recording to the next output when :meth:`split` is
         called.
         """
+        schedule = self._schedule
+        if schedule is not None and schedule.error is not None:
+            raise schedule.error
         last_frame = self.frame
         this_frame = PiVideoFrame(
             index=
@@ -914,11 +1589,15 @@ class PiVideoEncoder(PiEncoder):
                     new_outputs = self._next_output.pop(0)
                 except IndexError:
                     new_outputs = None
+                schedule = self._schedule
             if new_outputs:
                 for new_key, new_output in new_outputs.items():
                     self._close_output(new_key)
                     self._open_output(new_output, new_key)
                     if new_key == PiVideoFrameType.frame:
+                        if schedule is not None:
+                            schedule.replace(
+                                new_output, self._segment_start, last_frame)
                         this_frame = PiVideoFrame(
                                 index=this_frame.index,
                                 frame_type=this_frame.frame_type,
@@ -929,9 +1608,35 @@ class PiVideoEncoder(PiEncoder):
                                 complete=this_frame.complete,
                                 )
                 self._split_frame = this_frame
+                self._segment_start = None
                 self.event.set()
+            elif schedule is not None and schedule.due(
+                    last_frame, self._segment_start):
+                with self.outputs_lock:
+                    (output, opened) = self.outputs[PiVideoFrameType.frame]
+                    self.outputs[PiVideoFrameType.frame] = schedule.switch(
+                        output, opened, self._segment_start, last_frame)
+                this_frame = this_frame._replace(split_size=0)
+                self._segment_start = None
         if buf.flags & mmal.MMAL_BUFFER_HEADER_FLAG_CODECSIDEINFO:
             key = PiVideoFrameType.motion_data
+            # Motion data follows the picture it was estimated from; pass
+            # both to any subscribers
+            for subscriber in self._motion_subscribers:
+                try:
+                    subscriber(self._picture_frame, buf)
+                except Exception as e:
+                    # A failing subscriber mustn't end the recording (or
+                    # starve the other subscribers)
+                    warnings.warn(
+                        PiCameraWarning(
+                            'motion subscriber %r failed: %s' % (
+                                subscriber, e)))
+        else:
+            if self._segment_start is None:
+                self._segment_start = this_frame
+            if this_frame.complete:
+                self._picture_frame = this_frame
         self.frame = this_frame
         return super(PiVideoEncoder, self)._callback_write(buf, key)
 
@@ -954,6 +1659,12 @@ class PiRawVideoEncoder(PiRawMixin, PiVideoEncoder):
     :meth:`~PiCamera.start_recording` when it is called with an unencoded
     format.
 
+    Frames which MMAL delivers in several buffers are assembled (with a
+    :class:`PiRawFrameAssembler`) before being written, so outputs receive
+    exactly one write per frame. Assembled frames are held in buffers which
+    are recycled a few frames later, so outputs must copy the data they are
+    given if they wish to keep it beyond the call to ``write``.
+
     .. warning::
 
         This class creates an inheritance diamond. Take care to determine the
@@ -965,6 +1676,18 @@ class PiRawVideoEncoder(PiRawMixin, PiVideoEncoder):
         # Raw formats don't have an intra_period setting as such, but as every
         # frame is a full-frame, the intra_period is effectively 1
         self._intra_period = 1
+        self._assembler = PiRawFrameAssembler(self._frame_size)
+
+    def start(self, output, motion_output=None):
+        self._assembler.reset()
+        super(PiRawVideoEncoder, self).start(output, motion_output)
+
+    def stop(self):
+        super(PiRawVideoEncoder, self).stop()
+        # Discard any partial frame left when the port was disabled, so it
+        # can't be prepended to the first frame of a later recording
+        if self._assembler is not None:
+            self._assembler.reset()
 
 
 class PiImageEncoder(PiEncoder):
@@ -1039,6 +1762,135 @@ class PiOneImageEncoder(PiImageEncoder):
             )
 
 
+class PiOutputRotation(object):
+    """
+    Opens a sequence of outputs ahead of time, and closes finished outputs in
+    the background, on behalf of :class:`PiMultiImageEncoder`.
+
+    Users should never need to construct this class directly. The *outputs*
+    parameter is the sequence of outputs (filenames, file-like objects, or
+    writeable buffers) to rotate through. Up to *depth* outputs are opened by
+    a background thread ahead of their use, so that the encoder's callback
+    only has to switch between already opened streams. If the background
+    thread falls behind, :meth:`next` opens the following output itself.
+
+    .. versionadded:: 1.14
+    """
+    def __init__(self, outputs, depth=2):
+        if depth < 1:
+            raise PiCameraValueError('depth must be 1 or greater')
+        self.depth = depth
+        self.exception = None
+        self._outputs = iter(outputs)
+        self._ready = deque()
+        self._retired = deque()
+        self._opening = False
+        self._exhausted = False
+        self._closing = False
+        self._cond = threading.Condition()
+        # Open the first output synchronously so that errors (e.g. bad
+        # filenames) are reported to the caller immediately
+        self._opening = True
+        self._fetch()
+        if self._ready and self._ready[0][1] is not None:
+            raise self._ready.popleft()[1]
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _fetch(self):
+        # NOTE: The caller must have set _opening; this guarantees outputs are
+        # taken from the iterator (and queued) in order
+        try:
+            item = (mo.open_stream(next(self._outputs)), None)
+        except StopIteration:
+            item = None
+        except Exception as e:
+            item = (None, e)
+        with self._cond:
+            self._opening = False
+            if item is None or item[1] is not None:
+                self._exhausted = True
+            if item is not None:
+                if self._closing and item[0] is not None:
+                    self._retired.append(item[0])
+                else:
+                    self._ready.append(item)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (
+                        self._retired or self._closing or not (
+                        self._exhausted or self._opening or
+                        len(self._ready) >= self.depth)):
+                    self._cond.wait()
+                if self._retired:
+                    stream, opened = self._retired.popleft()
+                elif self._closing:
+                    break
+                else:
+                    stream = None
+                    self._opening = True
+            if stream is None:
+                self._fetch()
+            else:
+                try:
+                    mo.close_stream(stream, opened)
+                except Exception as e:
+                    if self.exception is None:
+                        self.exception = e
+
+    def next(self):
+        """
+        Returns the ``(stream, opened)`` tuple for the next output, or raises
+        :exc:`StopIteration` if the outputs are exhausted. If opening the
+        output failed, the exception is re-raised here.
+        """
+        while True:
+            with self._cond:
+                while not self._ready and self._opening:
+                    self._cond.wait()
+                if self._ready:
+                    stream, exc = self._ready.popleft()
+                    self._cond.notify_all()
+                    break
+                if self._exhausted:
+                    raise StopIteration
+                self._opening = True
+            self._fetch()
+        if exc is not None:
+            raise exc
+        return stream
+
+    def retire(self, stream, opened):
+        """
+        Queues *stream* (and its *opened* flag, as returned by :meth:`next`)
+        to be closed by the background thread.
+        """
+        with self._cond:
+            self._retired.append((stream, opened))
+            self._cond.notify_all()
+
+    def close(self):
+        """
+        Closes any outputs opened ahead of time but never used, and waits for
+        all retired outputs to be closed. If closing any output failed, the
+        first such exception is available from :attr:`exception` afterward.
+        """
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            while self._ready:
+                stream, exc = self._ready.popleft()
+                if stream is not None:
+                    self._retired.append(stream)
+            self._cond.notify_all()
+        self._thread.join()
+
+
 class PiMultiImageEncoder(PiImageEncoder):
     """
     Encoder for multiple image capture.
@@ -1049,9 +1901,22 @@ class PiMultiImageEncoder(PiImageEncoder):
     :meth:`PiEncoder._open_output` is overridden to begin iteration and rely
     on the new :meth:`_next_output` method to advance output to the next item
     in the iterable.
+
+    If the outputs are given as a list or tuple, a :class:`PiOutputRotation`
+    is used to open outputs ahead of time and close finished outputs in the
+    background. Other iterables (e.g. generators) are advanced only when the
+    previous output has been closed, as callers may rely on this ordering.
     """
 
+    def __init__(
+            self, parent, camera_port, input_port, format, resize, **options):
+        self._rotation = None
+        super(PiMultiImageEncoder, self).__init__(
+                parent, camera_port, input_port, format, resize, **options)
+
     def _open_output(self, outputs, key=PiVideoFrameType.frame):
+        if isinstance(outputs, (list, tuple)):
+            self._rotation = PiOutputRotation(outputs)
         self._output_iter = iter(outputs)
         self._next_output(key)
 
@@ -1060,8 +1925,16 @@ class PiMultiImageEncoder(PiImageEncoder):
         This method moves output to the next item from the iterable passed to
         :meth:`~PiEncoder.start`.
         """
-        self._close_output(key)
-        super(PiMultiImageEncoder, self)._open_output(next(self._output_iter), key)
+        if self._rotation is None:
+            self._close_output(key)
+            super(PiMultiImageEncoder, self)._open_output(next(self._output_iter), key)
+        else:
+            with self.outputs_lock:
+                try:
+                    self._rotation.retire(*self.outputs.pop(key))
+                except KeyError:
+                    pass
+                self.outputs[key] = self._rotation.next()
 
     def _callback_write(self, buf, key=PiVideoFrameType.frame):
         try:
@@ -1077,35 +1950,48 @@ class PiMultiImageEncoder(PiImageEncoder):
         except StopIteration:
             return True
 
+    def stop(self):
+        super(PiMultiImageEncoder, self).stop()
+        rotation, self._rotation = self._rotation, None
+        if rotation is not None:
+            rotation.close()
+            if rotation.exception and not self.exception:
+                self.exception = rotation.exception
 
-class PiCookedOneImageEncoder(PiOneImageEncoder):
-    """
-    Encoder for "cooked" (encoded) single image output.
 
-    This encoder extends :class:`PiOneImageEncoder` to include Exif tags in the
-    output.
+class _ExifCache(object):
+    """
+    Compiles Exif tags into ``MMAL_PARAMETER_EXIF_T`` structures, retaining
+    the compiled structures so that unchanged tags needn't be re-encoded on
+    every capture. Only the timestamp tags (which change on every capture
+    unless overridden) and tags whose values have changed since the last call
+    to :meth:`params` are compiled again.
     """
 
-    exif_encoding = 'ascii'
+    TIMESTAMP_TAGS = (
+        'EXIF.DateTimeDigitized',
+        'EXIF.DateTimeOriginal',
+        'IFD0.DateTime',
+        )
 
-    def __init__(
-            self, parent, camera_port, input_port, format, resize, **options):
-        super(PiCookedOneImageEncoder, self).__init__(
-                parent, camera_port, input_port, format, resize, **options)
-        if parent:
-            self.exif_tags = self.parent.exif_tags
-        else:
-            self.exif_tags = {}
+    def __init__(self, encoding='ascii'):
+        self.encoding = encoding
+        self._compiled = {}
 
-    def _add_exif_tag(self, tag, value):
+    def compile(self, tag, value):
+        """
+        Format *tag* and *value* into a (variable sized)
+        ``MMAL_PARAMETER_EXIF_T`` structure and return a pointer to its
+        header, suitable for passing to ``mmal_port_parameter_set``.
+        """
         # Format the tag and value into an appropriate bytes string, encoded
         # with the Exif encoding (ASCII)
         if isinstance(tag, str):
-            tag = tag.encode(self.exif_encoding)
+            tag = tag.encode(self.encoding)
         if isinstance(value, str):
-            value = value.encode(self.exif_encoding)
+            value = value.encode(self.encoding)
         elif isinstance(value, datetime.datetime):
-            value = value.strftime('%Y:%m:%d %H:%M:%S').encode(self.exif_encoding)
+            value = value.strftime('%Y:%m:%d %H:%M:%S').encode(self.encoding)
         # MMAL_PARAMETER_EXIF_T is a variable sized structure, hence all the
         # mucking about with string buffers here...
         buf = ct.create_string_buffer(
@@ -1121,23 +2007,86 @@ class PiCookedOneImageEncoder(PiOneImageEncoder):
         else:
             data = tag + b'=' + value
         ct.memmove(mp[0].data, data, len(data))
-        self.output_port.params[mmal.MMAL_PARAMETER_EXIF] = mp[0]
+        # NOTE: cast keeps a reference to buf so the header pointer remains
+        # valid for as long as it is retained
+        return ct.cast(buf, ct.POINTER(mmal.MMAL_PARAMETER_HEADER_T))
+
+    def _lookup(self, tag, value, compiled):
+        try:
+            old_value, param = self._compiled[tag]
+        except KeyError:
+            pass
+        else:
+            # The type check guards against Py2's b'foo' == u'foo'
+            if type(old_value) is type(value) and old_value == value:
+                compiled[tag] = (old_value, param)
+                return param
+        param = self.compile(tag, value)
+        compiled[tag] = (value, param)
+        return param
+
+    def params(self, tags, timestamp):
+        """
+        Returns a list of compiled parameters for the *tags* mapping, with
+        *timestamp* used for any of the :attr:`TIMESTAMP_TAGS` that *tags*
+        doesn't override. Tags which are no longer present in *tags* are
+        discarded from the cache.
+        """
+        compiled = {}
+        result = []
+        # Timestamp tags are always included with the value of *timestamp*,
+        # but the user may choose to override the value in the tags mapping
+        for tag in self.TIMESTAMP_TAGS:
+            if tag in tags:
+                result.append(self._lookup(tag, tags[tag], compiled))
+            else:
+                result.append(self.compile(tag, timestamp))
+        # All other tags are just copied in verbatim
+        for tag, value in tags.items():
+            if not tag in self.TIMESTAMP_TAGS:
+                result.append(self._lookup(tag, value, compiled))
+        self._compiled = compiled
+        return result
+
+
+class PiCookedOneImageEncoder(PiOneImageEncoder):
+    """
+    Encoder for "cooked" (encoded) single image output.
+
+    This encoder extends :class:`PiOneImageEncoder` to include Exif tags in the
+    output. Compiled Exif parameters are retained between captures so that
+    only the timestamp tags, and tags whose values have changed, are
+    re-encoded when the encoder is re-used.
+    """
+
+    exif_encoding = 'ascii'
+
+    def __init__(
+            self, parent, camera_port, input_port, format, resize, **options):
+        super(PiCookedOneImageEncoder, self).__init__(
+                parent, camera_port, input_port, format, resize, **options)
+        if parent:
+            self.exif_tags = self.parent.exif_tags
+        else:
+            self.exif_tags = {}
+        self._exif_cache = _ExifCache(self.exif_encoding)
+
+    def _set_exif_params(self, params):
+        # Bypass MMALPortParams here; its generic conversion and error
+        # formatting is needlessly expensive for a batch of Exif tags
+        port = self.output_port._port
+        for param in params:
+            mmal_check(
+                mmal.mmal_port_parameter_set(port, param),
+                prefix="Failed to set Exif parameter")
+
+    def _add_exif_tag(self, tag, value):
+        self._set_exif_params([self._exif_cache.compile(tag, value)])
 
     def start(self, output):
         timestamp = datetime.datetime.now()
-        timestamp_tags = (
-            'EXIF.DateTimeDigitized',
-            'EXIF.DateTimeOriginal',
-            'IFD0.DateTime')
-        # Timestamp tags are always included with the value calculated
-        # above, but the user may choose to override the value in the
-        # exif_tags mapping
-        for tag in timestamp_tags:
-            self._add_exif_tag(tag, self.exif_tags.get(tag, timestamp))
-        # All other tags are just copied in verbatim
-        for tag, value in self.exif_tags.items():
-            if not tag in timestamp_tags:
-                self._add_exif_tag(tag, value)
+        self._set_exif_params(
+            self._exif_cache.params(self.exif_tags, timestamp))
         super(PiCookedOneImageEncoder, self).start(output)
 
 
@@ -1216,3 +2165,148 @@ class PiRawMultiImageEncoder(PiMultiImageEncoder, PiRawImageMixin):
         super(PiRawMultiImageEncoder, self)._next_output(key)
         self._image_size = self._frame_size
 
+
+class PiEncoderPool(object):
+    """
+    A least-recently-used cache of idle image encoders.
+
+    Constructing an image encoder involves creating MMAL components,
+    connecting them, and committing port formats, all of which is repeated
+    (and then torn down again) by every call to :meth:`~PiCamera.capture`.
+    This class allows the camera to keep a small number of encoders alive
+    between captures so that back-to-back captures with identical parameters
+    can re-use a warm pipeline.
+
+    The *maxsize* parameter specifies the maximum number of idle encoders that
+    will be retained; when this is exceeded the least recently used encoder is
+    closed. Setting *maxsize* to 0 disables pooling entirely.
+
+    Because an MMAL port can only be connected to a single component, at most
+    one idle encoder is retained for each input port. Callers that wish to
+    construct a new encoder on a port must first call :meth:`evict` to ensure
+    any idle encoder attached to that port is closed.
+
+    .. versionadded:: 1.14
+    """
+
+    def __init__(self, maxsize=2):
+        if maxsize < 0:
+            raise PiCameraValueError('maxsize must be 0 or greater')
+        self._lock = threading.Lock()
+        self._encoders = OrderedDict()
+        self._maxsize = maxsize
+
+    def __len__(self):
+        with self._lock:
+            return len(self._encoders)
+
+    @property
+    def maxsize(self):
+        """
+        The maximum number of idle encoders the pool will retain.
+        """
+        return self._maxsize
+
+    @staticmethod
+    def make_key(camera_port, input_port, format, resize, options):
+        """
+        Returns a hashable key representing the parameters used to construct
+        an encoder, or ``None`` if the parameters cannot be represented (e.g.
+        because one of the *options* is unhashable). Encoders with a ``None``
+        key are never pooled.
+        """
+        key = (
+            camera_port, input_port, format, resize,
+            tuple(sorted(options.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def acquire(self, key):
+        """
+        Removes and returns the idle encoder matching *key*, re-enabling its
+        connections, or returns ``None`` if no such encoder is available.
+        """
+        if key is None:
+            return None
+        with self._lock:
+            encoder = self._encoders.pop(key, None)
+        if encoder is not None:
+            try:
+                if encoder.encoder:
+                    encoder.encoder.connection.enable()
+                if encoder.resizer:
+                    encoder.resizer.connection.enable()
+            except:
+                encoder.close()
+                raise
+        return encoder
+
+    def prepare(self, key, encoder):
+        """
+        Prepares the newly constructed *encoder* for pooling under *key*,
+        before it is first started. If *key* is not ``None`` and the pool is
+        enabled, the buffer pool of the encoder's output port is retained
+        (see :class:`~picamera.mmalobj.MMALPoolPolicy`) when the encoder is
+        stopped, so that it can be re-used by the next capture rather than
+        re-allocated.
+        """
+        if key is not None and self._maxsize and encoder.encoder:
+            port = encoder.encoder.outputs[0]
+            port.pool_policy = port.pool_policy._replace(retain=True)
+
+    def release(self, key, encoder):
+        """
+        Returns *encoder* (which must be stopped, and should have been passed
+        to :meth:`prepare` when constructed) to the pool under *key*. The
+        encoder's connections are disabled while it is idle. If *key* is
+        ``None`` or the pool is disabled, the encoder is simply closed.
+        """
+        if key is None or not self._maxsize:
+            encoder.close()
+            return
+        try:
+            if encoder.encoder:
+                encoder.encoder.connection.disable()
+            if encoder.resizer:
+                encoder.resizer.connection.disable()
+        except:
+            encoder.close()
+            raise
+        evicted = []
+        with self._lock:
+            for old_key in list(self._encoders):
+                if old_key[1] is key[1]:
+                    evicted.append(self._encoders.pop(old_key))
+            self._encoders[key] = encoder
+            while len(self._encoders) > self._maxsize:
+                evicted.append(self._encoders.popitem(last=False)[1])
+        for old_encoder in evicted:
+            old_encoder.close()
+
+    def evict(self, port):
+        """
+        Closes any idle encoder attached to the specified input *port*.
+        """
+        with self._lock:
+            evicted = [
+                self._encoders.pop(key)
+                for key in list(self._encoders)
+                if key[1] is port
+                ]
+        for encoder in evicted:
+            encoder.close()
+
+    def clear(self):
+        """
+        Closes all idle encoders. This must be called whenever the camera's
+        configuration (resolution, sensor mode, etc.) changes as the port
+        formats of pooled encoders will no longer be valid.
+        """
+        with self._lock:
+            evicted = list(self._encoders.values())
+            self._encoders.clear()
+        for encoder in evicted:
+            encoder.close()
@@ -37,8 +37,11 @@ from __future__ import (
 # Make Py2's str equivalent to Py3's
 str = type('')
 
-
-import picamera.mmal as mmal
+# The mmal module is only imported when an MMAL error is actually raised as
+# it is comparatively expensive to import, and this module is used by all the
+# pure-Python parts of the package too. MMAL_SUCCESS is duplicated here so
+# mmal_check needn't import it either
+_MMAL_SUCCESS = 0
 
 
 class PiCameraWarning(Warning):
@@ -130,6 +133,7 @@ class PiCameraMMALError(PiCameraError):
     Raised when an MMAL operation fails for whatever reason.
     """
     def __init__(self, status, prefix=""):
+        from . import mmal
         self.status = status
         PiCameraError.__init__(self, "%s%s%s" % (prefix, ": " if prefix else "", {
             mmal.MMAL_ENOMEM:    "Out of memory",
@@ -167,6 +171,7 @@ class PiCameraPortDisabled(PiCameraMMALError):
             # ...
     """
     def __init__(self, msg):
+        from . import mmal
         super(PiCameraPortDisabled, self).__init__(mmal.MMAL_EINVAL, msg)
 
 
@@ -180,6 +185,6 @@ def mmal_check(status, prefix=""):
     raised. The optional *prefix* parameter specifies a prefix message to place
     at the start of the exception's message to provide some context.
     """
-    if status != mmal.MMAL_SUCCESS:
+    if status != _MMAL_SUCCESS:
         raise PiCameraMMALError(status, prefix)
 
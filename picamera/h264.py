@@ -0,0 +1,566 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+
+from collections import namedtuple
+
+from .streams import TeeIO
+
+
+START_CODE = b'\x00\x00\x01'
+
+
+class H264NALType(object):
+    """
+    This class simply defines constants used to represent the type of a NAL
+    unit in :attr:`H264NALUnit.nal_type`. Only the types the camera's encoder
+    produces are listed. Effectively it is a namespace for an enum.
+
+    .. attribute:: slice
+
+        Indicates a coded slice of a non-IDR picture (a predicted frame)
+
+    .. attribute:: idr
+
+        Indicates a coded slice of an IDR picture (a key-frame)
+
+    .. attribute:: sei
+
+        Indicates supplemental enhancement information
+
+    .. attribute:: sps
+
+        Indicates a sequence parameter set
+
+    .. attribute:: pps
+
+        Indicates a picture parameter set
+
+    .. attribute:: aud
+
+        Indicates an access unit delimiter
+    """
+    slice = 1
+    idr = 5
+    sei = 6
+    sps = 7
+    pps = 8
+    aud = 9
+
+
+class H264NALUnit(namedtuple('H264NALUnit', (
+    'nal_type',
+    'ref_idc',
+    'data',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative representing a
+    single NAL unit produced by :class:`H264Parser`.
+
+    .. attribute:: nal_type
+
+        The type of the unit, typically one of the constants defined in
+        :class:`H264NALType`.
+
+    .. attribute:: ref_idc
+
+        The value of the ``nal_ref_idc`` field of the unit header; non-zero if
+        the unit is used as a reference.
+
+    .. attribute:: data
+
+        The :class:`bytes` of the unit, including its leading start code.
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Construct a unit from *data*, which must begin with a start code.
+        """
+        offset = data.find(START_CODE) + len(START_CODE)
+        header = ord(data[offset:offset + 1])
+        return cls(header & 0x1f, (header >> 5) & 0x03, data)
+
+
+class H264SPS(namedtuple('H264SPS', (
+    'profile',
+    'constraints',
+    'level',
+    'chroma_format',
+    'bit_depth_luma',
+    'bit_depth_chroma',
+    'width',
+    'height',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative representing
+    the fields of a sequence parameter set relevant to muxing, as returned by
+    :func:`parse_sps`.
+
+    .. attribute:: profile
+
+        The ``profile_idc`` of the stream (e.g. 66 for baseline, 77 for main,
+        100 for high).
+
+    .. attribute:: constraints
+
+        The byte containing the ``constraint_set`` flags.
+
+    .. attribute:: level
+
+        The ``level_idc`` of the stream (e.g. 40 for level 4).
+
+    .. attribute:: chroma_format
+
+        The ``chroma_format_idc`` of the stream (1 for 4:2:0).
+
+    .. attribute:: bit_depth_luma
+
+        The bit depth of luma samples (typically 8).
+
+    .. attribute:: bit_depth_chroma
+
+        The bit depth of chroma samples (typically 8).
+
+    .. attribute:: width
+
+        The width of the decoded frames in pixels (after cropping).
+
+    .. attribute:: height
+
+        The height of the decoded frames in pixels (after cropping).
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+
+class _BitReader(object):
+    __slots__ = ('_data', '_pos')
+
+    def __init__(self, data):
+        self._data = bytearray(data)
+        self._pos = 0
+
+    def u(self, bits):
+        result = 0
+        for i in range(bits):
+            byte = self._data[self._pos >> 3]
+            result = (result << 1) | ((byte >> (7 - (self._pos & 7))) & 1)
+            self._pos += 1
+        return result
+
+    def ue(self):
+        zeros = 0
+        while not self.u(1):
+            zeros += 1
+        return (1 << zeros) - 1 + self.u(zeros)
+
+    def se(self):
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def unescape_rbsp(data):
+    """
+    Return *data* (the payload of a NAL unit) with the emulation prevention
+    bytes (the ``0x03`` in each ``0x00 0x00 0x03`` sequence) removed.
+    """
+    return data.replace(b'\x00\x00\x03', b'\x00\x00')
+
+
+def parse_sps(data):
+    """
+    Parse the sequence parameter set NAL unit in *data* (with or without a
+    leading start code) and return an :class:`H264SPS` tuple.
+    """
+    if data[:1] == b'\x00':
+        data = data[data.find(START_CODE) + len(START_CODE):]
+    r = _BitReader(unescape_rbsp(data[1:]))
+    profile = r.u(8)
+    constraints = r.u(8)
+    level = r.u(8)
+    r.ue() # seq_parameter_set_id
+    chroma_format = 1
+    bit_depth_luma = bit_depth_chroma = 8
+    if profile in (
+            100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135):
+        chroma_format = r.ue()
+        if chroma_format == 3:
+            r.u(1) # separate_colour_plane_flag
+        bit_depth_luma = r.ue() + 8
+        bit_depth_chroma = r.ue() + 8
+        r.u(1) # qpprime_y_zero_transform_bypass_flag
+        if r.u(1): # seq_scaling_matrix_present_flag
+            for i in range(8 if chroma_format != 3 else 12):
+                if r.u(1): # seq_scaling_list_present_flag
+                    last = next_ = 8
+                    for j in range(16 if i < 6 else 64):
+                        if next_:
+                            next_ = (last + r.se()) % 256
+                        last = next_ or last
+    r.ue() # log2_max_frame_num_minus4
+    poc_type = r.ue()
+    if poc_type == 0:
+        r.ue() # log2_max_pic_order_cnt_lsb_minus4
+    elif poc_type == 1:
+        r.u(1) # delta_pic_order_always_zero_flag
+        r.se() # offset_for_non_ref_pic
+        r.se() # offset_for_top_to_bottom_field
+        for i in range(r.ue()):
+            r.se() # offset_for_ref_frame
+    r.ue() # max_num_ref_frames
+    r.u(1) # gaps_in_frame_num_value_allowed_flag
+    width = (r.ue() + 1) * 16
+    map_height = (r.ue() + 1) * 16
+    frame_mbs_only = r.u(1)
+    if not frame_mbs_only:
+        r.u(1) # mb_adaptive_frame_field_flag
+    height = map_height * (2 - frame_mbs_only)
+    r.u(1) # direct_8x8_inference_flag
+    if r.u(1): # frame_cropping_flag
+        left, right, top, bottom = r.ue(), r.ue(), r.ue(), r.ue()
+        sub_width, sub_height = {
+            0: (1, 1),
+            1: (2, 2),
+            2: (2, 1),
+            3: (1, 1),
+            }[chroma_format]
+        width -= sub_width * (left + right)
+        height -= sub_height * (2 - frame_mbs_only) * (top + bottom)
+    return H264SPS(
+        profile, constraints, level, chroma_format, bit_depth_luma,
+        bit_depth_chroma, width, height)
+
+
+def nal_offsets(data):
+    """
+    A generator which yields a tuple of ``(offset, nal_type)`` for each start
+    code within *data* (a bytes-like object) which is followed by a NAL unit
+    header. The *offset* is that of the start code itself (including the
+    leading zero byte of four-byte start codes).
+    """
+    pos = 0
+    while True:
+        i = data.find(START_CODE, pos)
+        if i == -1 or i + 3 >= len(data):
+            break
+        start = i - 1 if i and data[i - 1:i] == b'\x00' else i
+        yield start, ord(data[i + 3:i + 4]) & 0x1f
+        pos = i + 3
+
+
+class H264Parser(object):
+    """
+    An incremental parser which splits an H.264 Annex B byte-stream into
+    :class:`H264NALUnit` tuples.
+
+    Data is passed to :meth:`feed` in arbitrarily sized chunks (typically the
+    buffers produced by the camera's encoder). As the end of a NAL unit is only
+    known once the following start code is seen, each unit is returned by the
+    call to :meth:`feed` that completes it; the final unit of a stream can be
+    retrieved with :meth:`flush`. Any data preceding the first start code is
+    discarded. For example::
+
+        from picamera.h264 import H264Parser, H264NALType
+
+        parser = H264Parser()
+        with open('video.h264', 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                for unit in parser.feed(chunk):
+                    if unit.nal_type == H264NALType.idr:
+                        print('Key-frame of %d bytes' % len(unit.data))
+    """
+    __slots__ = ('_buf', '_pos', '_started', '_tail')
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+        self._started = False
+        self._tail = b''
+
+    def feed(self, data):
+        """
+        Append *data* to the parser's buffer and return a list of the
+        :class:`H264NALUnit` tuples completed by it.
+        """
+        buf = self._buf
+        buf.extend(data)
+        units = []
+        pos = self._pos
+        while True:
+            i = buf.find(START_CODE, pos)
+            if i == -1:
+                break
+            start = i - 1 if i and buf[i - 1] == 0 else i
+            if start:
+                if self._started:
+                    units.append(H264NALUnit.from_bytes(bytes(buf[:start])))
+                del buf[:start]
+                i -= start
+            self._started = True
+            pos = i + len(START_CODE)
+        if not self._started:
+            # Discard leading garbage, keeping enough to detect a start code
+            # split across calls
+            del buf[:-3]
+        # Resume the next search from the point a split start code could
+        # begin (two bytes before the end of the buffer)
+        self._pos = max(pos, len(buf) - 2) if self._started else 0
+        return units
+
+    def scan(self, data):
+        """
+        Return a list of ``(offset, nal_type)`` tuples for each start code in
+        *data*, as :func:`nal_offsets` does, but including start codes split
+        across successive calls. Each *offset* is relative to the start of
+        *data*, and is negative for a start code which began in a previous
+        call. Unlike :meth:`feed`, nothing is buffered or copied, which suits
+        callers that only need to know where units begin. Calls to
+        :meth:`scan` and :meth:`feed` should not be mixed on one parser.
+        """
+        tail = self._tail
+        # The last few bytes of the previous call, and enough of this one to
+        # complete a start code and NAL header begun in them
+        edge = tail + bytes(data[:3])
+        result = []
+        for start, nal_type in nal_offsets(edge):
+            i = start if edge[start:start + 3] == START_CODE else start + 1
+            if len(tail) - 3 <= i < len(tail):
+                result.append((start - len(tail), nal_type))
+        for start, nal_type in nal_offsets(data):
+            if (
+                    start == 0 and tail[-1:] == b'\x00' and
+                    edge[len(tail):] == START_CODE):
+                # The leading zero of a four-byte start code was in the
+                # previous call
+                start = -1
+            result.append((start, nal_type))
+        self._tail = (tail + bytes(data[-4:]))[-4:]
+        return result
+
+    def flush(self):
+        """
+        Return the final unit of the stream as a list (empty if there is no
+        pending unit), and reset the parser.
+        """
+        buf = bytes(self._buf)
+        started = self._started
+        self.__init__()
+        if started and len(buf) > buf.find(START_CODE) + len(START_CODE):
+            return [H264NALUnit.from_bytes(buf)]
+        return []
+
+
+def split_nal_units(data):
+    """
+    Split *data*, which must contain complete NAL units in Annex B format,
+    into a list of :class:`H264NALUnit` tuples.
+    """
+    parser = H264Parser()
+    return parser.feed(data) + parser.flush()
+
+
+class H264TeeIO(TeeIO):
+    """
+    A :class:`~picamera.TeeIO` derivative which allows sinks to join a live
+    H.264 recording immediately.
+
+    As data is written to the stream it is parsed (with :class:`H264Parser`)
+    to track the latest sequence and picture parameter sets (SPS and PPS) and
+    all data written since the most recent IDR (key) frame. When a sink is
+    attached with :meth:`add_sink` it is first "primed" with the SPS, PPS, last
+    IDR frame, and all frames which followed it, after which it receives the
+    live stream. A decoder reading from the sink can therefore begin decoding
+    straight away, rather than waiting up to *intra_period* frames for the next
+    key-frame (or calling :meth:`~PiCamera.request_key_frame` for every new
+    client). For example::
+
+        import socket
+        import picamera
+        from picamera.h264 import H264TeeIO
+
+        with picamera.PiCamera() as camera:
+            tee = H264TeeIO()
+            camera.start_recording(tee, format='h264')
+            server = socket.socket()
+            server.bind(('0.0.0.0', 8000))
+            server.listen(0)
+            while True:
+                client = server.accept()[0]
+                tee.add_sink(client.makefile('wb'), queue_size=60)
+
+    Sinks attached before the first IDR frame (or SPS and PPS) has been seen
+    receive nothing until the next IDR frame, at which point they are primed
+    with the parameter sets and join the stream.
+
+    The memory used by the cache is bounded by the size of a single group of
+    pictures (the IDR frame and the frames following it), which is governed by
+    the *intra_period* of the recording.
+
+    The *outputs*, *queue_size* and *drop* parameters are as for
+    :class:`~picamera.TeeIO`.
+    """
+    def __init__(self, outputs=(), queue_size=0, drop='oldest'):
+        self._parser = H264Parser()
+        self._sps = None
+        self._pps = None
+        self._gop = None
+        self._in_idr = False
+        self._capture = None
+        self._capture_type = None
+        self._waiting = set()
+        super(H264TeeIO, self).__init__(outputs, queue_size, drop)
+
+    @property
+    def sps(self):
+        """
+        The :class:`bytes` of the most recent sequence parameter set NAL unit
+        (including its start code), or ``None`` if none has been seen.
+        """
+        return self._sps
+
+    @property
+    def pps(self):
+        """
+        The :class:`bytes` of the most recent picture parameter set NAL unit
+        (including its start code), or ``None`` if none has been seen.
+        """
+        return self._pps
+
+    def _store_capture(self, data):
+        if self._capture_type == H264NALType.sps:
+            self._sps = data
+        else:
+            self._pps = data
+
+    def _prime_data(self):
+        if self._sps is None or self._pps is None or self._gop is None:
+            return None
+        return b''.join([self._sps, self._pps] + self._gop)
+
+    def add_sink(self, output, queue_size=0, drop='oldest'):
+        """
+        Attach *output* to the tee and return the resulting
+        :class:`~picamera.TeeSink`. The new sink is immediately sent the
+        cached parameter sets and group of pictures (if any) before receiving
+        further writes.
+        """
+        with self._lock:
+            sink = super(H264TeeIO, self).add_sink(output, queue_size, drop)
+            prime = self._prime_data()
+            if prime is None:
+                self._waiting.add(sink)
+            else:
+                sink.write(prime)
+        return sink
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._waiting = set(
+                s for s in self._waiting
+                if s is not sink and s.output is not sink)
+            super(H264TeeIO, self).remove_sink(sink)
+
+    def write(self, b):
+        """
+        Write *b* to all attached sinks, updating the cache of parameter sets
+        and the current group of pictures.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        if not isinstance(b, bytes):
+            b = bytes(b)
+        with self._lock:
+            tail = self._parser._tail
+            idr = None
+            # Parameter sets are copied as they're found; everything else is
+            # only located. A unit (or start code) may be split across writes
+            capture = self._capture
+            capture_start = 0
+            for offset, nal_type in self._parser.scan(b):
+                if capture is not None:
+                    if offset < 0:
+                        del capture[len(capture) + offset:]
+                    else:
+                        capture.extend(b[capture_start:offset])
+                    self._store_capture(bytes(capture))
+                    capture = None
+                if nal_type in (H264NALType.sps, H264NALType.pps):
+                    self._capture_type = nal_type
+                    if offset < 0:
+                        capture = bytearray(tail[offset:])
+                        capture_start = 0
+                    else:
+                        capture = bytearray()
+                        capture_start = offset
+                elif nal_type == H264NALType.idr:
+                    # Only the first slice of an IDR picture starts a new
+                    # group of pictures
+                    if not self._in_idr and idr is None:
+                        idr = offset
+                    self._in_idr = True
+                elif nal_type == H264NALType.slice:
+                    self._in_idr = False
+            if capture is not None:
+                capture.extend(b[capture_start:])
+                if len(capture) > 65536:
+                    # Not a plausible parameter set; give up on it
+                    capture = None
+            self._capture = capture
+            skip = ()
+            if idr is not None:
+                # An IDR start code begun in the previous write is completed
+                # from the parser's copy of that write's last bytes
+                self._gop = (
+                    [b[idr:]] if idr >= 0 else
+                    [tail[idr:], b])
+                if self._waiting:
+                    prime = self._prime_data()
+                    if prime is not None:
+                        skip, self._waiting = self._waiting, set()
+                        for sink in skip:
+                            sink.write(prime)
+            elif self._gop is not None:
+                self._gop.append(b)
+            for sink in self._sinks:
+                if sink not in skip and sink not in self._waiting:
+                    sink.write(b)
+        return len(b)
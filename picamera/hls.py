@@ -0,0 +1,523 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import io
+import os
+import math
+import struct
+import warnings
+import threading
+from collections import deque
+
+from .exc import PiCameraValueError, PiCameraWarning
+from .h264 import H264NALType, parse_sps, split_nal_units
+
+
+TIMESCALE = 90000
+
+UNITY_MATRIX = struct.pack(
+    '>9L', 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+
+
+def mp4_box(box_type, *payloads):
+    """
+    Return the bytes of an ISO base media file format box of *box_type* (a
+    four-byte :class:`bytes` string) containing the concatenation of
+    *payloads*.
+    """
+    payload = b''.join(payloads)
+    return struct.pack('>L4s', len(payload) + 8, box_type) + payload
+
+
+def mp4_full_box(box_type, version, flags, *payloads):
+    """
+    Return the bytes of a "full" box (a box with *version* and *flags*
+    fields) of *box_type* containing the concatenation of *payloads*.
+    """
+    return mp4_box(
+        box_type, struct.pack('>L', (version << 24) | flags), *payloads)
+
+
+def _strip_start_code(data):
+    return data[data.find(b'\x00\x00\x01') + 3:]
+
+
+def init_segment(sps, pps, track_id=1, timescale=TIMESCALE):
+    """
+    Return the bytes of a fragmented MP4 initialization segment (``ftyp`` and
+    ``moov`` boxes) for a single H.264 video track described by the sequence
+    and picture parameter set NAL units *sps* and *pps* (with or without
+    leading start codes).
+    """
+    sps = _strip_start_code(sps) if sps[:1] == b'\x00' else sps
+    pps = _strip_start_code(pps) if pps[:1] == b'\x00' else pps
+    info = parse_sps(sps)
+    avcc = struct.pack(
+        '>BBBBBBH', 1, info.profile, info.constraints, info.level,
+        0xff, 0xe1, len(sps)) + sps + struct.pack('>BH', 1, len(pps)) + pps
+    if info.profile in (100, 110, 122, 144):
+        avcc += struct.pack(
+            '>BBBB', 0xfc | info.chroma_format,
+            0xf8 | (info.bit_depth_luma - 8),
+            0xf8 | (info.bit_depth_chroma - 8), 0)
+    avc1 = mp4_box(
+        b'avc1',
+        b'\x00' * 6,                            # reserved
+        struct.pack('>H', 1),                   # data_reference_index
+        b'\x00' * 16,                           # pre_defined / reserved
+        struct.pack(
+            '>HHLLLH', info.width, info.height,
+            0x00480000, 0x00480000,             # 72dpi
+            0,                                  # reserved
+            1),                                 # frame_count
+        b'\x00' * 32,                           # compressorname
+        struct.pack('>Hh', 0x18, -1),           # depth, pre_defined
+        mp4_box(b'avcC', avcc),
+        )
+    stbl = mp4_box(
+        b'stbl',
+        mp4_full_box(b'stsd', 0, 0, struct.pack('>L', 1), avc1),
+        mp4_full_box(b'stts', 0, 0, struct.pack('>L', 0)),
+        mp4_full_box(b'stsc', 0, 0, struct.pack('>L', 0)),
+        mp4_full_box(b'stsz', 0, 0, struct.pack('>LL', 0, 0)),
+        mp4_full_box(b'stco', 0, 0, struct.pack('>L', 0)),
+        )
+    minf = mp4_box(
+        b'minf',
+        mp4_full_box(b'vmhd', 0, 1, b'\x00' * 8),
+        mp4_box(
+            b'dinf',
+            mp4_full_box(
+                b'dref', 0, 0, struct.pack('>L', 1),
+                mp4_full_box(b'url ', 0, 1))),
+        stbl,
+        )
+    mdia = mp4_box(
+        b'mdia',
+        mp4_full_box(
+            b'mdhd', 0, 0,
+            struct.pack('>LLLLHH', 0, 0, timescale, 0, 0x55c4, 0)), # 'und'
+        mp4_full_box(
+            b'hdlr', 0, 0,
+            struct.pack('>L4s', 0, b'vide'), b'\x00' * 12,
+            b'VideoHandler\x00'),
+        minf,
+        )
+    trak = mp4_box(
+        b'trak',
+        mp4_full_box(
+            b'tkhd', 0, 3,                      # enabled | in_movie
+            struct.pack('>LLLLL', 0, 0, track_id, 0, 0),
+            b'\x00' * 8,                        # reserved
+            struct.pack('>hhhH', 0, 0, 0, 0),   # layer, group, volume
+            UNITY_MATRIX,
+            struct.pack('>LL', info.width << 16, info.height << 16)),
+        mdia,
+        )
+    moov = mp4_box(
+        b'moov',
+        mp4_full_box(
+            b'mvhd', 0, 0,
+            struct.pack('>LLLLlh', 0, 0, timescale, 0, 0x00010000, 0x0100),
+            b'\x00' * 10,                       # reserved
+            UNITY_MATRIX,
+            b'\x00' * 24,                       # pre_defined
+            struct.pack('>L', track_id + 1)),   # next_track_ID
+        trak,
+        mp4_box(
+            b'mvex',
+            mp4_full_box(
+                b'trex', 0, 0, struct.pack('>LLLLL', track_id, 1, 0, 0, 0))),
+        )
+    ftyp = mp4_box(
+        b'ftyp', b'isom', struct.pack('>L', 0x200),
+        b'isom', b'iso5', b'avc1', b'mp41')
+    return ftyp + moov
+
+
+def media_segment(sequence, decode_time, samples, track_id=1):
+    """
+    Return the bytes of a fragmented MP4 media segment (``moof`` and ``mdat``
+    boxes) with the sequence number *sequence*, whose first sample is decoded
+    at *decode_time* (in units of the track's timescale).
+
+    The *samples* parameter is a sequence of ``(data, duration, key)`` tuples
+    where *data* is the sample's NAL units in length-prefixed (AVCC) format,
+    *duration* is the sample's duration in units of the track's timescale, and
+    *key* is ``True`` if the sample is a sync (IDR) sample.
+    """
+    entries = b''.join(
+        struct.pack(
+            '>LLL', duration, len(data),
+            0x02000000 if key else 0x01010000)
+        for data, duration, key in samples)
+    def moof(data_offset):
+        return mp4_box(
+            b'moof',
+            mp4_full_box(b'mfhd', 0, 0, struct.pack('>L', sequence)),
+            mp4_box(
+                b'traf',
+                # default-base-is-moof
+                mp4_full_box(b'tfhd', 0, 0x020000, struct.pack('>L', track_id)),
+                mp4_full_box(b'tfdt', 1, 0, struct.pack('>Q', decode_time)),
+                # data-offset, sample-duration, sample-size, sample-flags
+                mp4_full_box(
+                    b'trun', 0, 0x000701,
+                    struct.pack('>Ll', len(samples), data_offset), entries)))
+    header = moof(0)
+    return (
+        moof(len(header) + 8) +
+        mp4_box(b'mdat', *(data for data, duration, key in samples)))
+
+
+class PiCameraHLSIO(io.IOBase):
+    """
+    A write-only stream which segments an H.264 recording into fragmented MP4
+    files, and maintains an `HLS`_ playlist referencing them.
+
+    The stream is intended to be passed directly to
+    :meth:`~PiCamera.start_recording`; it writes an initialization segment,
+    a series of media segments, and a playlist to *path* (a directory, which
+    must exist) as the recording progresses. No separate muxing pass over the
+    recorded data is required, and the resulting files can be served by any
+    static HTTP server for playback in HLS-capable players. For example::
+
+        import picamera
+        from picamera.hls import PiCameraHLSIO
+
+        with picamera.PiCamera() as camera:
+            output = PiCameraHLSIO(camera, '/var/www/html/live')
+            camera.start_recording(output, format='h264', intra_period=30)
+            camera.wait_recording(3600)
+            camera.stop_recording()
+            output.close()
+
+    The *camera* parameter specifies the :class:`PiCamera` instance that will
+    be recording to the stream, and *splitter_port* the port the recording was
+    started on. Frame boundaries and timestamps are taken from the camera's
+    :class:`PiVideoFrame` meta-data, while key-frames are identified from the
+    NAL units of each frame.
+
+    Segments begin at IDR frames; a new segment is started at the first IDR
+    frame after the current segment reaches *segment_seconds* in length. When
+    a segment reaches that length, a key-frame is requested from the encoder,
+    so segments rarely run more than a frame or two over. The playlist's
+    target duration is fixed at *segment_seconds* (rounded up), as players
+    expect it never to change; if a segment nonetheless exceeds it, a
+    :exc:`PiCameraWarning` is issued. The playlist (*playlist_name*, ``playlist.m3u8`` by
+    default) lists the most recent *playlist_size* segments; if
+    *delete_segments* is ``True`` (the default) segments which drop out of the
+    playlist are deleted. If *playlist_size* is ``0``, all segments are
+    retained in the playlist (an "event" playlist).
+
+    Segment, playlist, and initialization files are written by a background
+    thread so that the encoder is not held up by file I/O. If writing a file
+    fails, the exception is raised by the next call to :meth:`write` (which
+    ends the recording) or by :meth:`close`.
+
+    The initialization segment is written from the first sequence parameter
+    set seen; if the encoder's parameter sets subsequently change (e.g.
+    because the resolution changed), a :exc:`PiCameraWarning` is issued, as
+    segments written afterward will not decode correctly.
+
+    When the stream is closed, the final segment is written and the playlist
+    is marked as ended.
+
+    .. _HLS: https://tools.ietf.org/html/rfc8216
+
+    .. versionadded:: 1.14
+    """
+    def __init__(
+            self, camera, path, segment_seconds=2, playlist_size=5,
+            splitter_port=1, delete_segments=True,
+            playlist_name='playlist.m3u8', init_name='init.mp4',
+            segment_name='segment%05d.m4s'):
+        super(PiCameraHLSIO, self).__init__()
+        try:
+            camera._encoders
+        except AttributeError:
+            raise PiCameraValueError('camera must be a valid PiCamera object')
+        if segment_seconds <= 0:
+            raise PiCameraValueError('segment_seconds must be positive')
+        if playlist_size < 0:
+            raise PiCameraValueError('playlist_size must be zero or positive')
+        self.camera = camera
+        self.splitter_port = splitter_port
+        self.path = path
+        self.segment_seconds = segment_seconds
+        self.playlist_size = playlist_size
+        self.delete_segments = delete_segments
+        self.playlist_name = playlist_name
+        self.init_name = init_name
+        self.segment_name = segment_name
+        self._chunks = []
+        self._sps = None
+        self._pps = None
+        self._initialized = False
+        self._pending = None
+        self._last_duration = None
+        self._decode_time = 0
+        self._segment = []
+        self._segment_start = 0
+        self._segment_time = 0
+        self._sequence = 0
+        self._playlist = []
+        self._first_sequence = 1
+        self._target_duration = int(math.ceil(segment_seconds))
+        self._key_requested = False
+        self._params_warned = False
+        self._error = None
+        self._tasks = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _get_frame(self):
+        """
+        Return frame meta-data from latest frame.
+        """
+        return self.camera._encoders[self.splitter_port].frame
+
+    def writable(self):
+        """
+        Returns ``True``, indicating that the stream supports :meth:`write`.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        return True
+
+    def write(self, b):
+        """
+        Add *b* to the current frame; when the frame is complete it is added
+        to the current segment. Returns the number of bytes written.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        if self._error is not None:
+            raise self._error
+        self._chunks.append(bytes(b))
+        frame = self._get_frame()
+        if frame.complete:
+            data = b''.join(self._chunks)
+            self._chunks = []
+            self._add_frame(data, frame.timestamp)
+        return len(b)
+
+    def _add_frame(self, data, timestamp):
+        nals = []
+        key = False
+        for unit in split_nal_units(data):
+            if unit.nal_type == H264NALType.sps:
+                self._set_param_set('_sps', unit.data)
+            elif unit.nal_type == H264NALType.pps:
+                self._set_param_set('_pps', unit.data)
+            elif unit.nal_type != H264NALType.aud:
+                payload = _strip_start_code(unit.data)
+                nals.append(struct.pack('>L', len(payload)))
+                nals.append(payload)
+                key = key or unit.nal_type == H264NALType.idr
+        if not nals:
+            return
+        if not self._initialized:
+            # Segments must begin with an IDR frame, and the initialization
+            # segment requires the parameter sets
+            if not key or self._sps is None or self._pps is None:
+                return
+            self._queue(
+                self._write_file, self.init_name,
+                init_segment(self._sps, self._pps))
+            self._initialized = True
+        # MMAL timestamps are in microseconds; convert to the 90kHz timescale
+        timestamp = None if timestamp is None else timestamp * 9 // 100
+        if self._pending is not None:
+            pending_data, pending_key, pending_timestamp = self._pending
+            if timestamp is None or pending_timestamp is None:
+                duration = 0
+            else:
+                duration = timestamp - pending_timestamp
+            if duration <= 0:
+                duration = self._last_duration or TIMESCALE // 30
+            self._add_sample(pending_data, duration, pending_key)
+            if (
+                    not self._key_requested and
+                    self._segment_time >= self.segment_seconds * TIMESCALE):
+                # Don't wait for the encoder's intra-period to end the
+                # segment; the target duration can't grow to accommodate
+                # long segments
+                self._key_requested = True
+                self.camera.request_key_frame(self.splitter_port)
+        self._pending = (b''.join(nals), key, timestamp)
+
+    def _set_param_set(self, attr, data):
+        data = _strip_start_code(data)
+        old = getattr(self, attr)
+        if self._initialized and old != data and not self._params_warned:
+            self._params_warned = True
+            warnings.warn(PiCameraWarning(
+                'H.264 parameter sets changed after the HLS initialization '
+                'segment was written; subsequent segments will not decode '
+                'correctly'))
+        if not self._initialized:
+            setattr(self, attr, data)
+
+    def _add_sample(self, data, duration, key):
+        if (
+                key and self._segment and
+                self._segment_time >= self.segment_seconds * TIMESCALE):
+            self._write_segment()
+        if not self._segment:
+            self._segment_start = self._decode_time
+            self._segment_time = 0
+            self._key_requested = False
+        self._segment.append((data, duration, key))
+        self._segment_time += duration
+        self._decode_time += duration
+        self._last_duration = duration
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._tasks and not self._closing:
+                    self._cond.wait()
+                if not self._tasks:
+                    break
+                task, args = self._tasks.popleft()
+            if self._error is None:
+                try:
+                    task(*args)
+                except Exception as e:
+                    self._error = e
+
+    def _queue(self, task, *args):
+        with self._cond:
+            self._tasks.append((task, args))
+            self._cond.notify()
+
+    def _write_file(self, name, data):
+        filename = os.path.join(self.path, name)
+        with io.open(filename + '.tmp', 'wb') as f:
+            f.write(data)
+        os.rename(filename + '.tmp', filename)
+
+    def _store_segment(self, name, segment, playlist, expired):
+        # The segment must exist before the playlist refers to it, and
+        # expired segments are only removed once the playlist no longer does
+        self._write_file(name, segment)
+        self._write_file(self.playlist_name, playlist)
+        for old_name in expired:
+            os.unlink(os.path.join(self.path, old_name))
+
+    def _write_segment(self):
+        self._sequence += 1
+        name = self.segment_name % self._sequence
+        segment = media_segment(
+            self._sequence, self._segment_start, self._segment)
+        duration = self._segment_time / TIMESCALE
+        self._segment = []
+        self._playlist.append((name, duration))
+        # RFC 8216 requires each segment's duration, rounded to the nearest
+        # integer, to be no greater than the target duration
+        if int(duration + 0.5) > self._target_duration:
+            warnings.warn(PiCameraWarning(
+                'HLS segment %s is %.3fs long, exceeding the target duration '
+                'of %ds' % (name, duration, self._target_duration)))
+        expired = []
+        if self.playlist_size:
+            while len(self._playlist) > self.playlist_size:
+                old_name, old_duration = self._playlist.pop(0)
+                self._first_sequence += 1
+                if self.delete_segments:
+                    expired.append(old_name)
+        self._queue(
+            self._store_segment, name, segment, self._playlist_data(), expired)
+
+    def _playlist_data(self, ended=False):
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:7',
+            '#EXT-X-TARGETDURATION:%d' % self._target_duration,
+            '#EXT-X-MEDIA-SEQUENCE:%d' % self._first_sequence,
+            '#EXT-X-INDEPENDENT-SEGMENTS',
+            '#EXT-X-MAP:URI="%s"' % self.init_name,
+            ]
+        if not self.playlist_size:
+            lines.insert(2, '#EXT-X-PLAYLIST-TYPE:EVENT')
+        for name, duration in self._playlist:
+            lines.append('#EXTINF:%.3f,' % duration)
+            lines.append(name)
+        if ended:
+            lines.append('#EXT-X-ENDLIST')
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    @property
+    def segments(self):
+        """
+        A list of ``(name, duration)`` tuples describing the segments
+        currently listed in the playlist.
+        """
+        return list(self._playlist)
+
+    def close(self):
+        """
+        Write the final segment, mark the playlist as ended, and close the
+        stream.
+        """
+        if not self.closed:
+            try:
+                if self._pending is not None:
+                    data, key, timestamp = self._pending
+                    self._pending = None
+                    self._add_sample(
+                        data, self._last_duration or TIMESCALE // 30, key)
+                if self._segment:
+                    self._write_segment()
+                if self._initialized:
+                    self._queue(
+                        self._write_file, self.playlist_name,
+                        self._playlist_data(ended=True))
+            finally:
+                with self._cond:
+                    self._closing = True
+                    self._cond.notify()
+                self._thread.join()
+                super(PiCameraHLSIO, self).close()
+            if self._error is not None:
+                raise self._error
@@ -0,0 +1,164 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import ctypes as ct
+import threading
+
+
+class LazyLibrary(object):
+    """
+    A stand-in for a :class:`ctypes.CDLL` which defers loading the shared
+    library *name* until one of its functions is first called.
+
+    Attribute access returns a :class:`LazyFunction` for the named symbol
+    which can be configured with ``argtypes`` and ``restype`` exactly as a
+    ctypes function would be. The *namespace* parameter is the ``globals()``
+    of the module defining the functions; when a function is first called it
+    is bound to the real library function, and the module's global of the
+    same name is replaced with it so subsequent calls pay no overhead at all.
+
+    The :meth:`use` method can substitute another implementation of the
+    library's functions (e.g. the simulator in :mod:`picamera.mmalsim`).
+    """
+    def __init__(self, name, namespace):
+        self._name = name
+        self._namespace = namespace
+        self._lock = threading.Lock()
+        self._dll = None
+        self._functions = {}
+
+    @property
+    def dll(self):
+        """
+        The underlying :class:`ctypes.CDLL`, loaded on first access.
+        """
+        if self._dll is None:
+            with self._lock:
+                if self._dll is None:
+                    self._dll = ct.CDLL(self._name)
+        return self._dll
+
+    def use(self, dll):
+        """
+        Replace the underlying library with *dll*, any object with an attribute
+        for each function of the library. Attributes which are not ctypes
+        functions are called with the arguments exactly as the caller passed
+        them (no ``argtypes`` conversion takes place) and their return values
+        are passed back verbatim.
+
+        Functions that were already bound are unbound so that their next call
+        binds them to *dll*. Passing ``None`` reverts to loading the real
+        library.
+        """
+        with self._lock:
+            self._dll = dll
+            for func in self._functions.values():
+                func.unbind()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._functions[name]
+        except KeyError:
+            func = self._functions[name] = LazyFunction(self, name)
+            return func
+
+
+class LazyFunction(object):
+    """
+    A proxy for the function *name* in a :class:`LazyLibrary`. The
+    ``argtypes``, ``restype``, and ``errcheck`` attributes are recorded and
+    applied to the real function when it is bound on first call.
+    """
+    __slots__ = ('_library', '_name', '_func', '_attrs')
+
+    def __init__(self, library, name):
+        object.__setattr__(self, '_library', library)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_func', None)
+        object.__setattr__(self, '_attrs', {})
+
+    def __repr__(self):
+        return '<LazyFunction %s in %s>' % (self._name, self._library._name)
+
+    def __getattr__(self, name):
+        if isinstance(self._func, ct._CFuncPtr):
+            return getattr(self._func, name)
+        try:
+            return self._attrs[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self._attrs[name] = value
+        if isinstance(self._func, ct._CFuncPtr):
+            setattr(self._func, name, value)
+
+    def bind(self):
+        """
+        Load the library (if necessary) and return the real ctypes function,
+        replacing this proxy in the defining module's namespace. Raises
+        :exc:`OSError` if the library cannot be loaded, or
+        :exc:`AttributeError` if it has no such function.
+        """
+        if self._func is None:
+            func = getattr(self._library.dll, self._name)
+            if isinstance(func, ct._CFuncPtr):
+                for attr, value in self._attrs.items():
+                    setattr(func, attr, value)
+            object.__setattr__(self, '_func', func)
+            namespace = self._library._namespace
+            if namespace.get(self._name) is self:
+                namespace[self._name] = func
+        return self._func
+
+    def unbind(self):
+        """
+        Forget the function bound by :meth:`bind`, restoring this proxy to the
+        defining module's namespace.
+        """
+        if self._func is not None:
+            namespace = self._library._namespace
+            if namespace.get(self._name) is self._func:
+                namespace[self._name] = self
+            object.__setattr__(self, '_func', None)
+
+    def __call__(self, *args):
+        return self.bind()(*args)
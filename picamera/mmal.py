@@ -45,8 +45,10 @@ import ctypes as ct
 import warnings
 
 from .bcm_host import VCOS_UNSIGNED
+from .lazy import LazyLibrary
 
-_lib = ct.CDLL('libmmal.so')
+# The library is loaded, and each function bound, on first call
+_lib = LazyLibrary('libmmal.so', globals())
 
 # mmal.h #####################################################################
 
@@ -2037,15 +2039,12 @@ mmal_queue_wait = _lib.mmal_queue_wait
 mmal_queue_wait.argtypes = [ct.POINTER(MMAL_QUEUE_T)]
 mmal_queue_wait.restype = ct.POINTER(MMAL_BUFFER_HEADER_T)
 
-try:
-    mmal_queue_timedwait = _lib.mmal_queue_timedwait
-except AttributeError:
-    # mmal_queue_timedwait doesn't exist in older firmwares. We don't use it
-    # anyway, so ignore it if we don't find it
-    pass
-else:
-    mmal_queue_timedwait.argtypes = [ct.POINTER(MMAL_QUEUE_T), VCOS_UNSIGNED]
-    mmal_queue_timedwait.restype = ct.POINTER(MMAL_BUFFER_HEADER_T)
+# mmal_queue_timedwait doesn't exist in older firmwares. We don't use it
+# anyway, and as functions are only bound when first called its absence only
+# matters if something calls it
+mmal_queue_timedwait = _lib.mmal_queue_timedwait
+mmal_queue_timedwait.argtypes = [ct.POINTER(MMAL_QUEUE_T), VCOS_UNSIGNED]
+mmal_queue_timedwait.restype = ct.POINTER(MMAL_BUFFER_HEADER_T)
 
 mmal_queue_length = _lib.mmal_queue_length
 mmal_queue_length.argtypes = [ct.POINTER(MMAL_QUEUE_T)]
@@ -2098,7 +2097,7 @@ MMAL_POOL_BH_CB_T = ct.CFUNCTYPE(
     ct.POINTER(MMAL_POOL_T), ct.POINTER(MMAL_BUFFER_HEADER_T), ct.c_void_p)
 
 mmal_pool_callback_set = _lib.mmal_pool_callback_set
-mmal_pool_callback_set.argtypes = [ct.POINTER(MMAL_POOL_T), MMAL_POOL_BH_CB_T]
+mmal_pool_callback_set.argtypes = [ct.POINTER(MMAL_POOL_T), MMAL_POOL_BH_CB_T, ct.c_void_p]
 mmal_pool_callback_set.restype = None
 
 mmal_pool_pre_release_callback_set = _lib.mmal_pool_pre_release_callback_set
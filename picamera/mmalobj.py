@@ -42,10 +42,13 @@ from __future__ import (
 str = type('')
 
 import io
+import os
+import mmap
+import time
 import ctypes as ct
 import warnings
 import weakref
-from threading import Thread, Event
+from threading import Thread, Event, Condition
 from collections import namedtuple
 from fractions import Fraction
 from itertools import cycle
@@ -68,6 +71,8 @@ from .exc import (
 # the order needs fixing (it is set during MMALCamera.__init__).
 FIX_RGB_BGR_ORDER = None
 
+_now = getattr(time, 'monotonic', time.time)
+
 # Mapping of parameters to the C-structure they expect / return. If a parameter
 # does not appear in this mapping, it cannot be queried / set with the
 # MMALControlPort.params attribute.
@@ -734,8 +739,10 @@ class MMALBaseComponent(MMALObject):
             # ensure we free any pools associated with input/output ports
             for output in self.outputs:
                 output.disable()
+                output.release_pool()
             for input in self.inputs:
                 input.disable()
+                input.release_pool()
             mmal.mmal_component_destroy(self._component)
             self._component = None
             self._inputs = ()
@@ -936,13 +943,80 @@ class MMALControlPort(MMALObject):
             return '<MMALControlPort closed>'
 
 
+class MMALPoolPolicy(namedtuple('MMALPoolPolicy', (
+    'count',
+    'size',
+    'headroom',
+    'retain',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative describing how
+    the buffer pool of an :class:`MMALPort` is sized and managed (see
+    :attr:`MMALPort.pool_policy`). All parameters are optional.
+
+    .. attribute:: count
+
+        The number of buffers to allocate, or ``None`` (the default) to use
+        the port's :attr:`~MMALPort.buffer_count`. The port's minimum is
+        always respected.
+
+    .. attribute:: size
+
+        The minimum size (in bytes) of each buffer. Buffers are never smaller
+        than the port's :attr:`~MMALPort.buffer_size`. Defaults to 0.
+
+    .. attribute:: headroom
+
+        The number of extra buffers to allocate on top of :attr:`count`. These
+        absorb bursts of output when the port's callback is slow to return
+        buffers, at the cost of memory. Defaults to 0.
+
+    .. attribute:: retain
+
+        If ``True``, the pool is kept when the port is disabled and re-used
+        when it is next enabled (provided the number and size of buffers
+        required is unchanged) instead of being re-allocated. Defaults to
+        ``False``.
+
+    .. versionadded:: 1.14
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+    def __new__(cls, count=None, size=0, headroom=0, retain=False):
+        if count is not None and count < 1:
+            raise PiCameraValueError('pool count must be 1 or more')
+        if size < 0:
+            raise PiCameraValueError('pool size must be 0 or more')
+        if headroom < 0:
+            raise PiCameraValueError('pool headroom must be 0 or more')
+        return super(MMALPoolPolicy, cls).__new__(
+            cls, count, size, headroom, bool(retain))
+
+
 class MMALPort(MMALControlPort):
     """
     Represents an MMAL port with properties to configure and update the port's
     format. This is the base class of :class:`MMALVideoPort`,
     :class:`MMALAudioPort`, and :class:`MMALSubPicturePort`.
+
+    .. data:: default_pool_policies
+
+        Class attribute mapping encodings to the :class:`MMALPoolPolicy` used
+        by ports with that format when no :attr:`pool_policy` has been set.
     """
-    __slots__ = ('_opaque_subformat', '_pool', '_stopped', '_connection')
+    __slots__ = (
+        '_opaque_subformat', '_pool', '_stopped', '_connection', '_counter',
+        '_pool_policy', '_pool_dims', '_retained')
+
+    # Workaround: There is a bug in the MJPEG encoder that causes a deadlock
+    # if the FIFO is full on shutdown. Increasing the encoder buffer size
+    # makes this less likely to happen. See raspberrypi/userland#208.
+    # Connecting the encoder component resets the output port's buffer size,
+    # hence why policies are applied just before enabling the port.
+    default_pool_policies = {
+        mmal.MMAL_ENCODING_MJPEG: MMALPoolPolicy(size=512 * 1024),
+        }
 
     # A mapping of corrected definitions of supported_formats for ports with
     # particular names. Older firmwares either raised EINVAL, ENOSYS, or just
@@ -1057,6 +1131,10 @@ class MMALPort(MMALControlPort):
         self._pool = None
         self._stopped = True
         self._connection = None
+        self._counter = None
+        self._pool_policy = None
+        self._pool_dims = None
+        self._retained = None
 
     def __repr__(self):
         if self._port is not None:
@@ -1270,6 +1348,73 @@ class MMALPort(MMALControlPort):
         recommendations from the MMAL library.
         """)
 
+    def _get_pool_policy(self):
+        if self._pool_policy is not None:
+            return self._pool_policy
+        return self.default_pool_policies.get(
+            self._port[0].format[0].encoding, MMALPoolPolicy())
+    def _set_pool_policy(self, value):
+        if value is not None and not isinstance(value, MMALPoolPolicy):
+            raise PiCameraValueError(
+                'pool_policy must be an MMALPoolPolicy or None')
+        self._pool_policy = value
+        if not self.pool_policy.retain:
+            self.release_pool()
+    pool_policy = property(_get_pool_policy, _set_pool_policy, doc="""\
+        The :class:`MMALPoolPolicy` which determines the number and size of
+        buffers allocated when the port is next enabled, and whether its pool
+        is retained while the port is disabled. Set this to ``None`` to revert
+        to the policy given by :data:`default_pool_policies` for the port's
+        format (or the default :class:`MMALPoolPolicy`).
+
+        .. versionadded:: 1.14
+        """)
+
+    def release_pool(self):
+        """
+        Destroy the pool retained by the disabled port (see
+        :attr:`MMALPoolPolicy.retain`), if any. This is called automatically
+        when the owning component is closed.
+
+        .. versionadded:: 1.14
+        """
+        if self._retained is not None:
+            self._retained.close()
+            self._retained = None
+
+    def _apply_pool_policy(self):
+        # Size the port's buffers according to the pool policy. The values
+        # the policy started from are remembered so that re-enabling the port
+        # (without an intervening commit or change to the buffer count or
+        # size) doesn't add the headroom again
+        port = self._port[0]
+        base = (port.buffer_num, port.buffer_size)
+        if self._pool_dims is not None and self._pool_dims[2:] == base:
+            base = self._pool_dims[:2]
+        elif (
+                port.format[0].encoding == mmal.MMAL_ENCODING_MJPEG and
+                port.buffer_size_recommended > 0):
+            # The MJPEG workaround (see default_pool_policies) has always
+            # sized buffers from the recommended size rather than whatever
+            # the port's buffer size happens to be
+            base = (port.buffer_num, port.buffer_size_recommended)
+        policy = self.pool_policy
+        count = base[0] if policy.count is None else policy.count
+        port.buffer_num = max(1, port.buffer_num_min, count + policy.headroom)
+        port.buffer_size = max(base[1], policy.size)
+        self._pool_dims = base + (port.buffer_num, port.buffer_size)
+
+    def _create_pool(self):
+        # Re-use the retained pool if it still matches the port's buffers
+        pool, self._retained = self._retained, None
+        if pool is not None:
+            if (
+                    len(pool) == self._port[0].buffer_num and
+                    pool[0].size == self._port[0].buffer_size):
+                return pool
+            pool.close()
+        return MMALPortPool(self)
+
     def enable(self, callback=None):
         """
         Enable the port with the specified callback function (this must be
@@ -1280,33 +1425,43 @@ class MMALPort(MMALControlPort):
         instance. The callback should return ``True`` when processing is
         complete and no further calls are expected (e.g. at frame-end for an
         image encoder), and ``False`` otherwise.
+
+        The port's buffers are allocated according to its
+        :attr:`pool_policy`.
         """
+        output = self._port[0].type == mmal.MMAL_PORT_TYPE_OUTPUT
+
         def wrapper(port, buf):
-            buf = MMALBuffer(buf)
+            pool = self._pool
+            buf = pool._wrap(buf)
+            counter = self._counter
+            if counter is not None:
+                length = buf.length
+                start = _now()
             try:
                 if not self._stopped and callback(self, buf):
                     self._stopped = True
             finally:
+                if counter is not None:
+                    counter.add(length, _now() - start)
                 buf.release()
                 try:
-                    self._pool.send_buffer(block=False)
+                    sent = pool.send_free_buffers()
                 except PiCameraPortDisabled:
                     # The port was disabled, no point trying again
                     pass
+                else:
+                    # If every buffer was free, the port had none to fill
+                    # while the callback ran
+                    if output and sent == len(pool._buffers):
+                        pool._exhausted += 1
 
-        # Workaround: There is a bug in the MJPEG encoder that causes a
-        # deadlock if the FIFO is full on shutdown. Increasing the encoder
-        # buffer size makes this less likely to happen. See
-        # raspberrypi/userland#208. Connecting the encoder component resets the
-        # output port's buffer size, hence why we correct this here, just
-        # before enabling the port.
-        if self._port[0].format[0].encoding == mmal.MMAL_ENCODING_MJPEG:
-            self._port[0].buffer_size = max(512 * 1024, self._port[0].buffer_size_recommended)
+        self._apply_pool_policy()
         if callback:
             assert self._stopped
             assert self._pool is None
             self._stopped = False
-            self._pool = MMALPortPool(self)
+            self._pool = self._create_pool()
             try:
                 self._wrapper = mmal.MMAL_PORT_BH_CB_T(wrapper)
                 mmal_check(
@@ -1315,7 +1470,7 @@ class MMALPort(MMALControlPort):
                 # If this port is an output port, send it all the buffers
                 # in the pool. If it's an input port, don't bother: the user
                 # will presumably want to feed buffers to it manually
-                if self._port[0].type == mmal.MMAL_PORT_TYPE_OUTPUT:
+                if output:
                     self._pool.send_all_buffers(block=False)
             except:
                 self._pool.close()
@@ -1332,7 +1487,10 @@ class MMALPort(MMALControlPort):
         self._stopped = True
         super(MMALPort, self).disable()
         if self._pool is not None:
-            self._pool.close()
+            if self.pool_policy.retain:
+                self._retained = self._pool
+            else:
+                self._pool.close()
             self._pool = None
 
     @property
@@ -1478,6 +1636,76 @@ class MMALSubPicturePort(MMALPort):
             return '<MMALSubPicturePort closed>'
 
 
+class _ParamDispatch(namedtuple('_ParamDispatch', (
+    'dtype', 'get_func', 'get_type', 'get_conv', 'set_func', 'set_conv'))):
+    # The functions are stored by name and looked up in the mmal module on
+    # each call as LazyLibrary rebinds them on first use (and when the
+    # library is replaced). A get_type of None indicates the full structure
+    # must be passed, and a conv of None that no conversion is required
+    __slots__ = ()
+
+
+def _param_value(v):
+    return v.value
+
+
+# Short-cut functions for the simple parameter structures (teeny bit faster if
+# we get some C to do the structure wrapping for us)
+_PARAM_SHORTCUTS = {
+    mmal.MMAL_PARAMETER_RATIONAL_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_RATIONAL_T,
+        'mmal_port_parameter_get_rational', mmal.MMAL_RATIONAL_T,
+        lambda v: Fraction(v.num, v.den),
+        'mmal_port_parameter_set_rational', to_rational),
+    mmal.MMAL_PARAMETER_BOOLEAN_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_BOOLEAN_T,
+        'mmal_port_parameter_get_boolean', mmal.MMAL_BOOL_T,
+        lambda v: v.value != mmal.MMAL_FALSE,
+        'mmal_port_parameter_set_boolean',
+        lambda v: mmal.MMAL_TRUE if v else mmal.MMAL_FALSE),
+    mmal.MMAL_PARAMETER_INT32_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_INT32_T,
+        'mmal_port_parameter_get_int32', ct.c_int32, _param_value,
+        'mmal_port_parameter_set_int32', None),
+    mmal.MMAL_PARAMETER_INT64_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_INT64_T,
+        'mmal_port_parameter_get_int64', ct.c_int64, _param_value,
+        'mmal_port_parameter_set_int64', None),
+    mmal.MMAL_PARAMETER_UINT32_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_UINT32_T,
+        'mmal_port_parameter_get_uint32', ct.c_uint32, _param_value,
+        'mmal_port_parameter_set_uint32', None),
+    mmal.MMAL_PARAMETER_UINT64_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_UINT64_T,
+        'mmal_port_parameter_get_uint64', ct.c_uint64, _param_value,
+        'mmal_port_parameter_set_uint64', None),
+    mmal.MMAL_PARAMETER_STRING_T: _ParamDispatch(
+        mmal.MMAL_PARAMETER_STRING_T,
+        'mmal_port_parameter_get', None, lambda v: v.str.decode('ascii'),
+        'mmal_port_parameter_set_string', lambda v: v.encode('ascii')),
+    }
+
+# Dispatch entries resolved by _param_dispatch. These are keyed by the
+# structure type rather than the parameter as some entries in PARAM_TYPES
+# change at runtime (e.g. MMALCamera.annotate_rev)
+_PARAM_DISPATCH = {}
+
+
+def _param_dispatch(key):
+    dtype = PARAM_TYPES[key]
+    try:
+        return _PARAM_DISPATCH[dtype]
+    except KeyError:
+        try:
+            result = _PARAM_SHORTCUTS[dtype]
+        except KeyError:
+            result = _ParamDispatch(
+                dtype, 'mmal_port_parameter_get', None, None,
+                'mmal_port_parameter_set', None)
+        _PARAM_DISPATCH[dtype] = result
+        return result
+
+
 class MMALPortParams(object):
     """
     Represents the parameters of an MMAL port. This class implements the
@@ -1502,74 +1730,82 @@ class MMALPortParams(object):
         self._port = port
 
     def __getitem__(self, key):
-        dtype = PARAM_TYPES[key]
-        # Use the short-cut functions where possible (teeny bit faster if we
-        # get some C to do the structure wrapping for us)
-        func = {
-            mmal.MMAL_PARAMETER_RATIONAL_T: mmal.mmal_port_parameter_get_rational,
-            mmal.MMAL_PARAMETER_BOOLEAN_T:  mmal.mmal_port_parameter_get_boolean,
-            mmal.MMAL_PARAMETER_INT32_T:    mmal.mmal_port_parameter_get_int32,
-            mmal.MMAL_PARAMETER_INT64_T:    mmal.mmal_port_parameter_get_int64,
-            mmal.MMAL_PARAMETER_UINT32_T:   mmal.mmal_port_parameter_get_uint32,
-            mmal.MMAL_PARAMETER_UINT64_T:   mmal.mmal_port_parameter_get_uint64,
-            }.get(dtype, mmal.mmal_port_parameter_get)
-        conv = {
-            mmal.MMAL_PARAMETER_RATIONAL_T: lambda v: Fraction(v.num, v.den),
-            mmal.MMAL_PARAMETER_BOOLEAN_T:  lambda v: v.value != mmal.MMAL_FALSE,
-            mmal.MMAL_PARAMETER_INT32_T:    lambda v: v.value,
-            mmal.MMAL_PARAMETER_INT64_T:    lambda v: v.value,
-            mmal.MMAL_PARAMETER_UINT32_T:   lambda v: v.value,
-            mmal.MMAL_PARAMETER_UINT64_T:   lambda v: v.value,
-            mmal.MMAL_PARAMETER_STRING_T:   lambda v: v.str.decode('ascii'),
-            }.get(dtype, lambda v: v)
-        if func == mmal.mmal_port_parameter_get:
-            result = dtype(
-                mmal.MMAL_PARAMETER_HEADER_T(key, ct.sizeof(dtype))
+        dispatch = _param_dispatch(key)
+        func = getattr(mmal, dispatch.get_func)
+        if dispatch.get_type is None:
+            result = dispatch.dtype(
+                mmal.MMAL_PARAMETER_HEADER_T(key, ct.sizeof(dispatch.dtype))
                 )
-            mmal_check(
-                func(self._port, result.hdr),
-                prefix="Failed to get parameter %d" % key)
+            status = func(self._port, result.hdr)
         else:
-            dtype = {
-                mmal.MMAL_PARAMETER_RATIONAL_T: mmal.MMAL_RATIONAL_T,
-                mmal.MMAL_PARAMETER_BOOLEAN_T:  mmal.MMAL_BOOL_T,
-                mmal.MMAL_PARAMETER_INT32_T:    ct.c_int32,
-                mmal.MMAL_PARAMETER_INT64_T:    ct.c_int64,
-                mmal.MMAL_PARAMETER_UINT32_T:   ct.c_uint32,
-                mmal.MMAL_PARAMETER_UINT64_T:   ct.c_uint64,
-                }[dtype]
-            result = dtype()
-            mmal_check(
-                func(self._port, key, result),
-                prefix="Failed to get parameter %d" % key)
-        return conv(result)
+            result = dispatch.get_type()
+            status = func(self._port, key, result)
+        if status != mmal.MMAL_SUCCESS:
+            mmal_check(status, prefix="Failed to get parameter %d" % key)
+        if dispatch.get_conv is None:
+            return result
+        return dispatch.get_conv(result)
+
+    def get_many(self, keys):
+        """
+        Return a list of the values of the parameters in *keys* (an iterable
+        of parameter identifiers), in the same order. The result is the same
+        as ``[params[key] for key in keys]`` but the functions and scratch
+        structures used to query each type of parameter are only looked up
+        once per call. This is intended for cheaply polling several values at
+        once (e.g. for logging the state of a control loop)::
+
+            iso, ev = camera.control.params.get_many([
+                mmal.MMAL_PARAMETER_ISO,
+                mmal.MMAL_PARAMETER_EXPOSURE_COMP,
+                ])
+
+        .. versionadded:: 1.14
+        """
+        port = self._port
+        header = mmal.MMAL_PARAMETER_HEADER_T
+        types = {}
+        result = []
+        for key in keys:
+            dispatch = _param_dispatch(key)
+            try:
+                func, scratch, size = types[dispatch.dtype]
+            except KeyError:
+                func = getattr(mmal, dispatch.get_func)
+                scratch = size = None
+                if dispatch.get_type is None:
+                    size = ct.sizeof(dispatch.dtype)
+                else:
+                    scratch = dispatch.get_type()
+                types[dispatch.dtype] = func, scratch, size
+            if scratch is None:
+                value = dispatch.dtype(header(key, size))
+                status = func(port, value.hdr)
+            else:
+                value = scratch
+                status = func(port, key, value)
+            if status != mmal.MMAL_SUCCESS:
+                mmal_check(status, prefix="Failed to get parameter %d" % key)
+            if dispatch.get_conv is not None:
+                value = dispatch.get_conv(value)
+            result.append(value)
+        return result
 
     def __setitem__(self, key, value):
-        dtype = PARAM_TYPES[key]
-        func = {
-            mmal.MMAL_PARAMETER_RATIONAL_T: mmal.mmal_port_parameter_set_rational,
-            mmal.MMAL_PARAMETER_BOOLEAN_T:  mmal.mmal_port_parameter_set_boolean,
-            mmal.MMAL_PARAMETER_INT32_T:    mmal.mmal_port_parameter_set_int32,
-            mmal.MMAL_PARAMETER_INT64_T:    mmal.mmal_port_parameter_set_int64,
-            mmal.MMAL_PARAMETER_UINT32_T:   mmal.mmal_port_parameter_set_uint32,
-            mmal.MMAL_PARAMETER_UINT64_T:   mmal.mmal_port_parameter_set_uint64,
-            mmal.MMAL_PARAMETER_STRING_T:   mmal.mmal_port_parameter_set_string,
-            }.get(dtype, mmal.mmal_port_parameter_set)
-        conv = {
-            mmal.MMAL_PARAMETER_RATIONAL_T: lambda v: to_rational(v),
-            mmal.MMAL_PARAMETER_BOOLEAN_T:  lambda v: mmal.MMAL_TRUE if v else mmal.MMAL_FALSE,
-            mmal.MMAL_PARAMETER_STRING_T:   lambda v: v.encode('ascii'),
-            }.get(dtype, lambda v: v)
-        if func == mmal.mmal_port_parameter_set:
-            mp = conv(value)
+        dispatch = _param_dispatch(key)
+        func = getattr(mmal, dispatch.set_func)
+        if dispatch.set_func == 'mmal_port_parameter_set':
+            mp = value
             assert mp.hdr.id == key
-            assert mp.hdr.size >= ct.sizeof(dtype)
-            mmal_check(
-                func(self._port, mp.hdr),
-                prefix="Failed to set parameter %d to %r" % (key, value))
+            assert mp.hdr.size >= ct.sizeof(dispatch.dtype)
+            status = func(self._port, mp.hdr)
+        elif dispatch.set_conv is None:
+            status = func(self._port, key, value)
         else:
+            status = func(self._port, key, dispatch.set_conv(value))
+        if status != mmal.MMAL_SUCCESS:
             mmal_check(
-                func(self._port, key, conv(value)),
+                status,
                 prefix="Failed to set parameter %d to %r" % (key, value))
 
 
@@ -1832,13 +2068,22 @@ class MMALQueue(object):
     """
     Represents an MMAL buffer queue. Buffers can be added to the queue with the
     :meth:`put` method, and retrieved from the queue (with optional wait
-    timeout) with the :meth:`get` method.
+    timeout) with the :meth:`get` method. Threads which need to be woken
+    for reasons other than a buffer arriving (e.g. a component being
+    disabled) can use :meth:`wait` and :meth:`wake` instead of :meth:`get`.
     """
-    __slots__ = ('_queue', '_created')
+    __slots__ = ('_queue', '_created', '_buffers', '_cond')
 
-    def __init__(self, queue):
+    def __init__(self, queue, buffers=None):
         self._created = False
         self._queue = queue
+        # Mapping of buffer header addresses to MMALBuffer wrappers which
+        # get() re-uses instead of constructing new ones; maintained by the
+        # pool owning the queue
+        self._buffers = {} if buffers is None else buffers
+        # Signalled whenever a buffer is put in the queue from Python (or
+        # released back to a watched pool; see MMALPool._watch) and by wake()
+        self._cond = Condition()
 
     @classmethod
     def create(cls):
@@ -1848,7 +2093,7 @@ class MMALQueue(object):
 
     def close(self):
         if self._created:
-            mmal_queue_destroy(self._queue)
+            mmal.mmal_queue_destroy(self._queue)
         self._queue = None
 
     def __len__(self):
@@ -1872,13 +2117,71 @@ class MMALQueue(object):
         else:
             buf = mmal.mmal_queue_get(self._queue)
         if buf:
+            return self._wrap(buf)
+
+    def wait(self, stopped, timeout=None):
+        """
+        Wait for the next buffer in the queue until *stopped* (a callable
+        accepting no parameters) returns ``True``. If *timeout* is not
+        ``None``, it is the maximum time to wait (in seconds). Returns the
+        buffer, or ``None`` if the wait was stopped or timed out.
+
+        *stopped* is tested before each attempt to retrieve a buffer, and
+        again whenever the waiting thread is woken by :meth:`put`,
+        :meth:`put_back`, or :meth:`wake`. Hence a thread which changes the
+        state tested by *stopped* should call :meth:`wake` afterward to
+        ensure waiting threads notice promptly.
+
+        .. note::
+
+            Only buffers placed in the queue by :meth:`put` and
+            :meth:`put_back`, or released to a pool that
+            :meth:`MMALPool.wait_buffer` has been called upon, wake waiting
+            threads. Buffers placed in the queue by other means will be
+            noticed the next time the thread is woken.
+
+        .. versionadded:: 1.14
+        """
+        cond = self._cond
+        with cond:
+            if timeout is not None:
+                deadline = _now() + timeout
+            while not stopped():
+                buf = mmal.mmal_queue_get(self._queue)
+                if buf:
+                    return self._wrap(buf)
+                if timeout is None:
+                    cond.wait()
+                else:
+                    remaining = deadline - _now()
+                    if remaining <= 0:
+                        break
+                    cond.wait(remaining)
+        return None
+
+    def wake(self):
+        """
+        Wake all threads blocked in :meth:`wait` so that they re-test their
+        *stopped* condition.
+
+        .. versionadded:: 1.14
+        """
+        with self._cond:
+            self._cond.notify_all()
+
+    def _wrap(self, buf):
+        try:
+            return self._buffers[ct.addressof(buf.contents)]
+        except KeyError:
             return MMALBuffer(buf)
 
     def put(self, buf):
         """
         Place :class:`MMALBuffer` *buf* at the back of the queue.
         """
-        mmal.mmal_queue_put(self._queue, buf._buf)
+        with self._cond:
+            mmal.mmal_queue_put(self._queue, buf._buf)
+            self._cond.notify()
 
     def put_back(self, buf):
         """
@@ -1886,7 +2189,9 @@ class MMALQueue(object):
         used when a buffer was removed from the queue but needs to be put
         back at the front where it was originally taken from.
         """
-        mmal.mmal_queue_put_back(self._queue, buf._buf)
+        with self._cond:
+            mmal.mmal_queue_put_back(self._queue, buf._buf)
+            self._cond.notify()
 
 
 class MMALPool(object):
@@ -1898,12 +2203,31 @@ class MMALPool(object):
     :meth:`send_buffer`, and :meth:`send_all_buffers` methods which work with
     the encapsulated :class:`MMALQueue`.
     """
-    __slots__ = ('_pool', '_queue')
+    __slots__ = ('_pool', '_queue', '_buffers', '_released', '_exhausted')
 
     def __init__(self, pool):
         self._pool = pool
         super(MMALPool, self).__init__()
-        self._queue = MMALQueue(pool[0].queue)
+        self._buffers = {}
+        self._released = None
+        self._exhausted = 0
+        self._queue = MMALQueue(pool[0].queue, self._buffers)
+        self._wrap_headers()
+
+    def _wrap_headers(self):
+        # Pre-create a wrapper for each of the pool's headers; these are
+        # re-used by the queue and by MMALPort's callbacks rather than
+        # constructing an MMALBuffer for every buffer that passes through
+        self._buffers.clear()
+        for index in range(self._pool[0].headers_num):
+            header = self._pool[0].header[index]
+            self._buffers[ct.addressof(header.contents)] = MMALBuffer(header)
+
+    def _wrap(self, buf):
+        try:
+            return self._buffers[ct.addressof(buf.contents)]
+        except KeyError:
+            return MMALBuffer(buf)
 
     def __len__(self):
         return self._pool[0].headers_num
@@ -1918,10 +2242,24 @@ class MMALPool(object):
         """
         return self._queue
 
+    @property
+    def exhausted(self):
+        """
+        The number of times the pool has run dry: a request for a buffer
+        found none free (and timed out or didn't block), or the output port
+        the pool belongs to was left with no buffers to fill. A steadily
+        increasing count suggests the pool needs more buffers (see
+        :attr:`MMALPoolPolicy.headroom`).
+
+        .. versionadded:: 1.14
+        """
+        return self._exhausted
+
     def close(self):
         if self._pool is not None:
             mmal.mmal_pool_destroy(self._pool)
             self._pool = None
+        self._released = None
 
     def resize(self, new_count, new_size):
         """
@@ -1940,13 +2278,62 @@ class MMALPool(object):
         mmal_check(
             mmal.mmal_pool_resize(self._pool, new_count, new_size),
             prefix='unable to resize pool')
+        self._wrap_headers()
 
     def get_buffer(self, block=True, timeout=None):
         """
         Get the next buffer from the pool's queue. See :meth:`MMALQueue.get`
         for the meaning of the parameters.
         """
-        return self._queue.get(block, timeout)
+        buf = self._queue.get(block, timeout)
+        if buf is None:
+            self._exhausted += 1
+        return buf
+
+    def wait_buffer(self, stopped, timeout=None):
+        """
+        Wait for a buffer to be released back to the pool. See
+        :meth:`MMALQueue.wait` for the meaning of the parameters. The first
+        call installs a release callback on the pool so that waiting threads
+        are woken as buffers return to it; use :meth:`wake` to wake them for
+        any other reason.
+
+        .. versionadded:: 1.14
+        """
+        if self._released is None:
+            self._watch()
+        buf = self._queue.wait(stopped, timeout)
+        if buf is None and not stopped():
+            self._exhausted += 1
+        return buf
+
+    def wake(self):
+        """
+        Wake all threads blocked in :meth:`wait_buffer`. See
+        :meth:`MMALQueue.wake`.
+
+        .. versionadded:: 1.14
+        """
+        self._queue.wake()
+
+    def _watch(self, port=None):
+        # Buffers normally return to the pool's queue within MMAL itself
+        # (from whichever thread released them) where Python can't see them;
+        # the release callback puts them in the queue under the queue's
+        # condition instead so that MMALQueue.wait can't miss them. If *port*
+        # is given, released buffers are sent straight back to it while it's
+        # enabled (much as MMAL's own connections do)
+        queue = self._queue
+        def released(pool, buf, userdata):
+            if port is not None and port.enabled:
+                if mmal.mmal_port_send_buffer(port._port, buf) == mmal.MMAL_SUCCESS:
+                    return False
+            with queue._cond:
+                mmal.mmal_queue_put(queue._queue, buf)
+                queue._cond.notify()
+            return False
+        self._released = mmal.MMAL_POOL_BH_CB_T(released)
+        mmal.mmal_pool_callback_set(self._pool, self._released, None)
 
     def send_buffer(self, port, block=True, timeout=None):
         """
@@ -1970,6 +2357,42 @@ class MMALPool(object):
         for i in range(len(self._queue)):
             self.send_buffer(port, block, timeout)
 
+    def send_free_buffers(self, port):
+        """
+        Send every buffer currently in the pool's queue to *port* without
+        blocking, and return the number of buffers sent. Unlike
+        :meth:`send_all_buffers` it is not an error for the queue to be
+        empty. This is used to re-queue buffers to a port after they are
+        released.
+
+        .. versionadded:: 1.14
+        """
+        if not isinstance(port, MMALPort) or port._connection is not None:
+            # Connected ports may have to pass buffers through a connection's
+            # callback; take the long way round
+            count = 0
+            while True:
+                buf = self._queue.get(block=False)
+                if buf is None:
+                    return count
+                port.send_buffer(buf)
+                count += 1
+        queue = self._queue._queue
+        count = 0
+        while True:
+            buf = mmal.mmal_queue_get(queue)
+            if not buf:
+                return count
+            status = mmal.mmal_port_send_buffer(port._port, buf)
+            if status != mmal.MMAL_SUCCESS:
+                mmal.mmal_queue_put_back(queue, buf)
+                if status == mmal.MMAL_EINVAL and not port.enabled:
+                    raise PiCameraPortDisabled(
+                        'cannot send buffer to disabled port %s' % port.name)
+                mmal_check(
+                    status, prefix="cannot send buffer to port %s" % port.name)
+            count += 1
+
 
 class MMALPortPool(MMALPool):
     """
@@ -2019,6 +2442,18 @@ class MMALPortPool(MMALPool):
             port = self._port
         super(MMALPortPool, self).send_all_buffers(port, block, timeout)
 
+    def send_free_buffers(self, port=None):
+        """
+        Send all free buffers in the pool to *port* (or the port the pool is
+        associated with by default) without blocking. See
+        :meth:`MMALPool.send_free_buffers`.
+
+        .. versionadded:: 1.14
+        """
+        if port is None:
+            port = self._port
+        return super(MMALPortPool, self).send_free_buffers(port)
+
 
 class MMALBaseConnection(MMALObject):
     """
@@ -2027,7 +2462,7 @@ class MMALBaseConnection(MMALObject):
     target ports, and format negotiation. All other connection details are
     handled by the descendent classes.
     """
-    __slots__ = ('_source', '_target')
+    __slots__ = ('_source', '_target', '_counter')
 
     default_formats = ()
 
@@ -2056,6 +2491,7 @@ class MMALBaseConnection(MMALObject):
             raise PiCameraValueError('target port is already connected')
         if formats is None:
             formats = ()
+        self._counter = None
         self._source = source
         self._target = target
         try:
@@ -2200,7 +2636,7 @@ class MMALConnection(MMALBaseConnection):
         Class attribute defining the default formats used to negotiate
         connections between MMAL components.
     """
-    __slots__ = ('_connection', '_callback', '_wrapper')
+    __slots__ = ('_connection', '_callback', '_wrapper', '_pool')
 
     default_formats = (
         mmal.MMAL_ENCODING_OPAQUE,
@@ -2220,6 +2656,7 @@ class MMALConnection(MMALBaseConnection):
         super(MMALConnection, self).__init__(source, target, formats)
         self._connection = ct.POINTER(mmal.MMAL_CONNECTION_T)()
         self._callback = callback
+        self._pool = None
         flags = mmal.MMAL_CONNECTION_FLAG_ALLOCATION_ON_INPUT
         if callback is None:
             flags |= mmal.MMAL_CONNECTION_FLAG_TUNNELLING
@@ -2237,6 +2674,7 @@ class MMALConnection(MMALBaseConnection):
             mmal.mmal_connection_destroy(self._connection)
         self._connection = None
         self._wrapper = None
+        self._pool = None
         super(MMALConnection, self).close()
 
     @property
@@ -2254,9 +2692,15 @@ class MMALConnection(MMALBaseConnection):
         port of the target component.
         """
         def wrapper(connection):
+            # Re-use the wrappers of the connection's pool once it exists
+            wrap = MMALBuffer if self._pool is None else self._pool._wrap
             buf = mmal.mmal_queue_get(connection[0].queue)
             if buf:
-                buf = MMALBuffer(buf)
+                buf = wrap(buf)
+                counter = self._counter
+                if counter is not None:
+                    length = buf.length
+                    start = _now()
                 try:
                     modified_buf = self._callback(self, buf)
                 except:
@@ -2271,10 +2715,12 @@ class MMALConnection(MMALBaseConnection):
                             pass
                     else:
                         buf.release()
+                    if counter is not None:
+                        counter.add(length, _now() - start)
                     return
             buf = mmal.mmal_queue_get(connection[0].pool[0].queue)
             if buf:
-                buf = MMALBuffer(buf)
+                buf = wrap(buf)
                 try:
                     self._source.send_buffer(buf)
                 except PiCameraPortDisabled:
@@ -2290,7 +2736,8 @@ class MMALConnection(MMALBaseConnection):
             mmal.mmal_connection_enable(self._connection),
             prefix="Failed to enable connection")
         if self._callback is not None:
-            MMALPool(self._connection[0].pool).send_all_buffers(self._source)
+            self._pool = MMALPool(self._connection[0].pool)
+            self._pool.send_all_buffers(self._source)
 
     def disable(self):
         """
@@ -2300,6 +2747,7 @@ class MMALConnection(MMALBaseConnection):
             mmal.mmal_connection_disable(self._connection),
             prefix="Failed to disable connection")
         self._wrapper = None
+        self._pool = None
 
     @property
     def name(self):
@@ -2502,7 +2950,7 @@ class MMALComponent(MMALBaseComponent):
         further information.
         """
         if isinstance(source, (MMALPort, MMALPythonPort)):
-            return self.inputs[0].connect(source)
+            return self.inputs[0].connect(source, **options)
         else:
             for port in source.outputs:
                 if not port.connection:
@@ -2667,6 +3115,7 @@ class MMALPythonPort(MMALObject):
         '_supported_formats',
         '_format',
         '_callback',
+        '_counter',
         )
 
     _FORMAT_BPP = {
@@ -2685,6 +3134,7 @@ class MMALPythonPort(MMALObject):
         self._owner = weakref.ref(owner)
         self._pool = None
         self._callback = None
+        self._counter = None
         self._type = port_type
         self._index = index
         self._supported_formats = {
@@ -2841,7 +3291,7 @@ class MMALPythonPort(MMALObject):
         video = self._format[0].es[0].video
         try:
             self._buffer_size = int(
-                MMALPythonPort._FORMAT_BPP[str(self.format)]
+                MMALPythonPort._FORMAT_BPP[mmal.FOURCC_str(self.format)]
                 * video.width
                 * video.height)
         except KeyError:
@@ -2921,6 +3371,38 @@ class MMALPythonPort(MMALObject):
             assert self.type == mmal.MMAL_PORT_TYPE_OUTPUT
             return self._connection.target.get_buffer(block, timeout)
 
+    def _buffer_pool(self):
+        # Returns the pool that get_buffer retrieves buffers from
+        if self._pool is not None:
+            return self._pool
+        assert self.type == mmal.MMAL_PORT_TYPE_OUTPUT
+        return self._connection.target.pool
+
+    def wait_buffer(self, stopped, timeout=None):
+        """
+        Wait for a :class:`MMALBuffer` to become available from the port's
+        pool (or the pool of the connected input port) until *stopped* returns
+        ``True``. See :meth:`MMALPool.wait_buffer` for the meaning of the
+        parameters.
+
+        .. versionadded:: 1.14
+        """
+        if not self._enabled:
+            raise PiCameraPortDisabled(
+                'cannot get buffer from disabled port %s' % self.name)
+        return self._buffer_pool().wait_buffer(stopped, timeout)
+
+    def wake(self):
+        """
+        Wake all threads blocked in :meth:`wait_buffer` on this port.
+
+        .. versionadded:: 1.14
+        """
+        if self._enabled:
+            pool = self._buffer_pool()
+            if pool is not None:
+                pool.wake()
+
     def send_buffer(self, buf):
         """
         Send :class:`MMALBuffer` *buf* to the port.
@@ -2946,12 +3428,18 @@ class MMALPythonPort(MMALObject):
                 'cannot send buffer to disabled port %s' % self.name)
         if self._callback is not None:
             # but what about output ports?
+            counter = self._counter
+            if counter is not None:
+                length = buf.length
+                start = _now()
             try:
                 # XXX Return value? If it's an input port we should ignore it,
                 self._callback(self, buf)
             except:
                 buf.release()
                 raise
+            if counter is not None:
+                counter.add(length, _now() - start)
         if self._type == mmal.MMAL_PORT_TYPE_INPUT:
             # Input port case; queue the buffer for processing on the
             # owning component
@@ -2964,7 +3452,14 @@ class MMALPythonPort(MMALObject):
             # Connected output port case; forward the buffer to the
             # connected component's input port
             # XXX If it's a format-change event?
-            self._connection.target.send_buffer(buf)
+            counter = self._connection._counter
+            if counter is None:
+                self._connection.target.send_buffer(buf)
+            else:
+                length = buf.length
+                start = _now()
+                self._connection.target.send_buffer(buf)
+                counter.add(length, _now() - start)
 
     @property
     def name(self):
@@ -3194,6 +3689,15 @@ class MMALPythonSource(MMALPythonBaseComponent):
     used as is. Otherwise, *input* is assumed to be a readable object
     supporting the buffer protocol (which is wrapped in a :class:`BufferIO`
     stream).
+
+    If *input* is (or refers to) a regular file, it is memory-mapped while the
+    source is enabled and data is copied straight from the map into the
+    output buffers; reading starts from the file's current position and the
+    file is left positioned after the last byte sent. Other inputs are read
+    with ``readinto`` where available.
+
+    .. versionchanged:: 1.14
+        Regular files are memory-mapped
     """
     __slots__ = ('_stream', '_opened', '_thread')
 
@@ -3222,6 +3726,7 @@ class MMALPythonSource(MMALPythonBaseComponent):
     def disable(self):
         super(MMALPythonSource, self).disable()
         if self._thread:
+            self._outputs[0].wake()
             self._thread.join()
             self._thread = None
 
@@ -3245,49 +3750,161 @@ class MMALPythonSource(MMALPythonBaseComponent):
         # presumably require decoding the stream) so leave framesize as None.
         video = self._outputs[0]._format[0].es[0].video
         try:
-            framesize = (
-                MMALPythonPort._FORMAT_BPP[str(self._outputs[0].format)]
+            framesize = int(
+                MMALPythonPort._FORMAT_BPP[mmal.FOURCC_str(self._outputs[0].format)]
                 * video.width
                 * video.height)
         except KeyError:
             framesize = None
         frameleft = framesize
-        while self.enabled:
-            buf = self._outputs[0].get_buffer(timeout=0.1)
-            if buf:
-                try:
-                    if frameleft is None:
-                        send = buf.size
-                    else:
-                        send = min(frameleft, buf.size)
-                    with buf as data:
-                        if send == buf.size:
+        stopped = lambda: not self._enabled
+        source, pos = self._map_input()
+        try:
+            while self._enabled:
+                buf = self._outputs[0].wait_buffer(stopped)
+                if buf:
+                    try:
+                        if frameleft is None:
+                            send = buf.size
+                        else:
+                            send = min(frameleft, buf.size)
+                        with buf as data:
                             try:
-                                # readinto() is by far the fastest method of
-                                # getting data into the buffer
-                                buf.length = self._stream.readinto(data)
+                                view = memoryview(data).cast('B')[:send]
                             except AttributeError:
-                                # if there's no readinto() method, fallback on
-                                # read() and the data setter (memmove)
-                                buf.data = self._stream.read(buf.size)
-                        else:
-                            buf.data = self._stream.read(send)
-                    if frameleft is not None:
-                        frameleft -= buf.length
-                        if not frameleft:
-                            buf.flags |= mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END
-                            frameleft = framesize
-                    if not buf.length:
-                        buf.flags |= mmal.MMAL_BUFFER_HEADER_FLAG_EOS
-                        break
-                finally:
-                    self._outputs[0].send_buffer(buf)
+                                # Py2's memoryview has no cast(); a ctypes
+                                # array over the same memory serves instead
+                                view = (ct.c_uint8 * send).from_address(
+                                    ct.addressof(data))
+                            if source is not None:
+                                # Copy straight from the mapped file; once
+                                # it's exhausted carry on reading from the
+                                # stream in case the file has grown since
+                                length = min(send, len(source) - pos)
+                                view[:length] = source[pos:pos + length]
+                                pos += length
+                                if pos == len(source):
+                                    source = self._unmap_input(source, pos)
+                            else:
+                                length = self._read_into(data, view)
+                        buf.offset = 0
+                        buf.length = length
+                        if frameleft is not None:
+                            frameleft -= buf.length
+                            if not frameleft:
+                                buf.flags |= mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END
+                                frameleft = framesize
+                        if not buf.length:
+                            buf.flags |= mmal.MMAL_BUFFER_HEADER_FLAG_EOS
+                            break
+                    finally:
+                        self._outputs[0].send_buffer(buf)
+        finally:
+            if source is not None:
+                self._unmap_input(source, pos)
+
+    def _map_input(self):
+        # Memory-map the input if it's a regular file, returning a memoryview
+        # of the map and the stream's current position within it, or (None,
+        # None) if the input can't be mapped (pipes, sockets, in-memory
+        # streams, empty files, etc.)
+        try:
+            fileno = self._stream.fileno()
+            pos = self._stream.tell()
+            size = os.fstat(fileno).st_size
+            if pos >= size:
+                return None, None
+            return memoryview(
+                mmap.mmap(fileno, size, access=mmap.ACCESS_READ)), pos
+        except (AttributeError, TypeError, ValueError, IOError, OSError,
+                mmap.error):
+            return None, None
+
+    def _unmap_input(self, source, pos):
+        # Release the map, leaving the stream positioned after the last byte
+        # copied from it
+        m = source.obj
+        source.release()
+        m.close()
+        self._stream.seek(pos)
+        return None
+
+    def _read_into(self, data, view):
+        # Fill *view*, the leading portion of the buffer memory *data*, from
+        # the stream, returning the number of bytes read
+        try:
+            # readinto() is by far the fastest method of getting data into
+            # the buffer
+            return self._stream.readinto(view) or 0
+        except AttributeError:
+            # if there's no readinto() method, fallback on read() and memmove
+            chunk = self._stream.read(len(view))
+            ct.memmove(data, chunk, len(chunk))
+            return len(chunk)
 
     @property
     def name(self):
         return 'py.source'
 
 
+class MMALPythonStats(namedtuple('MMALPythonStats', (
+    'frames',
+    'busy',
+    'elapsed',
+    'queued',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative returned by
+    :attr:`MMALPythonComponent.stats`. All figures are measured from the
+    point the component was last enabled.
+
+    .. attribute:: frames
+
+        The number of frame buffers the component has handled.
+
+    .. attribute:: busy
+
+        The total time (in seconds) the component's thread spent handling
+        frames.
+
+    .. attribute:: elapsed
+
+        The time (in seconds) the component has been enabled for (or was
+        enabled for, if it is now disabled).
+
+    .. attribute:: queued
+
+        The number of buffers waiting in the component's input queue.
+
+    .. versionadded:: 1.14
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+    @property
+    def fps(self):
+        """
+        The mean number of frames handled per second.
+        """
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def latency(self):
+        """
+        The mean time (in seconds) spent handling each frame.
+        """
+        return self.busy / self.frames if self.frames else 0.0
+
+    @property
+    def load(self):
+        """
+        The proportion of :attr:`elapsed` time spent handling frames. A value
+        close to 1.0 indicates the component cannot keep up with its input
+        and is the bottleneck of its pipeline.
+        """
+        return self.busy / self.elapsed if self.elapsed else 0.0
+
+
 class MMALPythonComponent(MMALPythonBaseComponent):
     """
     Provides a Python-based MMAL component with a *name*, a single input and
@@ -3300,14 +3917,30 @@ class MMALPythonComponent(MMALPythonBaseComponent):
     :attr:`MMALPythonPort.supported_formats` in the constructor to define the
     formats that the component will work with.
     """
-    __slots__ = ('_name', '_thread', '_queue', '_error')
+    __slots__ = (
+        '_name', '_thread', '_queue', '_error', '_handlers',
+        '_frames', '_busy', '_started', '_stopped',
+        )
 
     def __init__(self, name='py.component', outputs=1):
         super(MMALPythonComponent, self).__init__()
         self._name = name
         self._thread = None
         self._error = None
+        self._frames = 0
+        self._busy = 0.0
+        self._started = self._stopped = None
         self._queue = MMALQueue.create()
+        # Look up the handlers once (rather than for every buffer); they're
+        # taken from the class so the mapping doesn't keep self alive
+        cls = type(self)
+        self._handlers = {
+            0:                                 cls._handle_frame,
+            mmal.MMAL_EVENT_PARAMETER_CHANGED: cls._handle_parameter_changed,
+            mmal.MMAL_EVENT_FORMAT_CHANGED:    cls._handle_format_changed,
+            mmal.MMAL_EVENT_ERROR:             cls._handle_error,
+            mmal.MMAL_EVENT_EOS:               cls._handle_end_of_stream,
+            }
         self._inputs = (MMALPythonPort(self, mmal.MMAL_PORT_TYPE_INPUT, 0),)
         self._outputs = tuple(
             MMALPythonPort(self, mmal.MMAL_PORT_TYPE_OUTPUT, n)
@@ -3339,7 +3972,7 @@ class MMALPythonComponent(MMALPythonBaseComponent):
         further information.
         """
         if isinstance(source, (MMALPort, MMALPythonPort)):
-            return self.inputs[0].connect(source)
+            return self.inputs[0].connect(source, **options)
         else:
             for port in source.outputs:
                 if not port.connection:
@@ -3380,9 +4013,30 @@ class MMALPythonComponent(MMALPythonBaseComponent):
             if port.format != self.inputs[0].format:
                 raise PiCameraMMALError(mmal.MMAL_EINVAL, 'output format mismatch')
 
+    @property
+    def stats(self):
+        """
+        Returns a :class:`MMALPythonStats` tuple describing the throughput of
+        the component since it was last enabled. Comparing the stats of
+        each Python component in a pipeline shows which is the bottleneck.
+
+        .. versionadded:: 1.14
+        """
+        if self._started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._stopped or _now()) - self._started
+        return MMALPythonStats(
+            self._frames, self._busy, elapsed,
+            len(self._queue) if self._queue else 0)
+
     def enable(self):
         super(MMALPythonComponent, self).enable()
         if not self._thread:
+            self._frames = 0
+            self._busy = 0.0
+            self._started = _now()
+            self._stopped = None
             self._thread = Thread(target=self._thread_run)
             self._thread.daemon = True
             self._thread.start()
@@ -3390,28 +4044,32 @@ class MMALPythonComponent(MMALPythonBaseComponent):
     def disable(self):
         super(MMALPythonComponent, self).disable()
         if self._thread:
+            self._queue.wake()
             self._thread.join()
+            self._stopped = _now()
             self._thread = None
-            if self._error:
-                raise self._error
+            error, self._error = self._error, None
+            if error:
+                raise error
 
     def _thread_run(self):
+        stopped = lambda: not self._enabled
+        handlers = self._handlers
+        port = self._inputs[0]
         try:
             while self._enabled:
-                buf = self._queue.get(timeout=0.1)
+                buf = self._queue.wait(stopped)
                 if buf:
+                    command = buf.command
+                    start = _now()
                     try:
-                        handler = {
-                            0:                                 self._handle_frame,
-                            mmal.MMAL_EVENT_PARAMETER_CHANGED: self._handle_parameter_changed,
-                            mmal.MMAL_EVENT_FORMAT_CHANGED:    self._handle_format_changed,
-                            mmal.MMAL_EVENT_ERROR:             self._handle_error,
-                            mmal.MMAL_EVENT_EOS:               self._handle_end_of_stream,
-                            }[buf.command]
-                        if handler(self.inputs[0], buf):
+                        if handlers[command](self, port, buf):
                             self._enabled = False
                     finally:
                         buf.release()
+                        if not command:
+                            self._frames += 1
+                            self._busy += _now() - start
         except Exception as e:
             self._error = e
             self._enabled = False
@@ -3470,7 +4128,7 @@ class MMALPythonComponent(MMALPythonBaseComponent):
                 if isinstance(output, MMALPythonPort):
                     output.enable()
                 else:
-                    output.enable(port.connection._transfer)
+                    port.connection._enable_source()
             # Now deal with the format change on this input port (this is only
             # called from _thread_run so port must be an input port)
             try:
@@ -3635,6 +4293,16 @@ class MMALPythonConnection(MMALBaseConnection):
     return it to permit it to continue traversing the connection, or return
     ``None`` in which case the buffer will be released.
 
+    If *zero_copy* is ``True`` and the connection leads from an
+    :class:`MMALPort` to an :class:`MMALPythonPort`, frames are forwarded to
+    the target by reference (with :meth:`MMALBuffer.replicate`) instead of
+    being copied. The source port's buffer is then held until the target
+    component releases the frame, so the source port may require more
+    buffers to avoid dropping frames. Events are always copied.
+
+    .. versionadded:: 1.14
+        The *zero_copy* parameter
+
     .. data:: default_formats
         :annotation: = (MMAL_ENCODING_I420, MMAL_ENCODING_RGB24, MMAL_ENCODING_BGR24, MMAL_ENCODING_RGBA, MMAL_ENCODING_BGRA)
 
@@ -3643,7 +4311,7 @@ class MMALPythonConnection(MMALBaseConnection):
         order. Note that OPAQUE is not present in contrast with the default
         formats in :class:`MMALConnection`.
     """
-    __slots__ = ('_enabled', '_callback')
+    __slots__ = ('_enabled', '_callback', '_zero_copy')
 
     default_formats = (
         mmal.MMAL_ENCODING_I420,
@@ -3654,7 +4322,8 @@ class MMALPythonConnection(MMALBaseConnection):
         )
 
     def __init__(
-            self, source, target, formats=default_formats, callback=None):
+            self, source, target, formats=default_formats, callback=None,
+            zero_copy=False):
         if not (
                 isinstance(source, MMALPythonPort) or
                 isinstance(target, MMALPythonPort)
@@ -3663,6 +4332,18 @@ class MMALPythonConnection(MMALBaseConnection):
         super(MMALPythonConnection, self).__init__(source, target, formats)
         self._enabled = False
         self._callback = callback
+        self._zero_copy = bool(zero_copy) and isinstance(source, MMALPort)
+
+    @property
+    def zero_copy(self):
+        """
+        Returns ``True`` if frames are forwarded from the source port to the
+        target by reference rather than copied (see the *zero_copy* parameter
+        of the constructor).
+
+        .. versionadded:: 1.14
+        """
+        return self._zero_copy
 
     def close(self):
         self.disable()
@@ -3700,29 +4381,60 @@ class MMALPythonConnection(MMALBaseConnection):
                 # Connected MMAL output ports are made to transfer their
                 # data to the Python input port
                 self._source.params[mmal.MMAL_PARAMETER_ZERO_COPY] = True
-                self._source.enable(self._transfer)
+                self._enable_source()
 
     def disable(self):
         """
         Disables the connection.
         """
         self._enabled = False
-        self._source.disable()
-        self._target.disable()
+        if isinstance(self._target, MMALPythonPort):
+            self._target.wake()
+        if self._zero_copy:
+            # Disable the target first; this releases any queued frames still
+            # referencing the source's buffers before its pool is destroyed
+            self._target.disable()
+            self._source.disable()
+        else:
+            self._source.disable()
+            self._target.disable()
+
+    def _enable_source(self):
+        self._source.enable(self._transfer)
+        if self._zero_copy:
+            # Forwarded frames are released by the target component long
+            # after _transfer returns, so the source's buffers must be sent
+            # back to it as they're released rather than after each callback
+            self._source.pool._watch(self._source)
 
     def _transfer(self, port, buf):
-        while self._enabled:
+        # Wait briefly for the target to free a buffer; if it doesn't (or the
+        # connection is disabled meanwhile) the frame is dropped rather than
+        # stalling the source's callback thread
+        counter = self._counter
+        if counter is not None:
+            start = _now()
+        try:
+            dest = self._target.wait_buffer(self._stopped, timeout=0.01)
+        except PiCameraPortDisabled:
+            dest = None
+        if dest:
+            if self._zero_copy and not buf.command:
+                dest.replicate(buf)
+            else:
+                dest.copy_from(buf)
             try:
-                dest = self._target.get_buffer(timeout=0.01)
+                self._target.send_buffer(dest)
             except PiCameraPortDisabled:
-                dest = None
-            if dest:
-                dest.copy_from(buf)
-                try:
-                    self._target.send_buffer(dest)
-                except PiCameraPortDisabled:
-                    pass
-            return False
+                pass
+            if counter is not None:
+                counter.add(buf.length, _now() - start)
+        elif counter is not None:
+            counter.dropped += 1
+        return False
+
+    def _stopped(self):
+        return not self._enabled
 
     @property
     def name(self):
@@ -3734,3 +4446,340 @@ class MMALPythonConnection(MMALBaseConnection):
         except NameError:
             return '<MMALPythonConnection closed>'
 
+
+
+class _StageCounter(object):
+    # Accumulates the buffers and bytes passing through a port callback or
+    # connection, and the time spent handling them. Attached to the
+    # "_counter" slot of ports and connections by MMALPipelineProfiler
+    __slots__ = ('buffers', 'bytes', 'busy', 'dropped')
+
+    def __init__(self):
+        self.buffers = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.dropped = 0
+
+    def add(self, length, busy):
+        self.buffers += 1
+        self.bytes += length
+        self.busy += busy
+
+
+class MMALStageProfile(namedtuple('MMALStageProfile', (
+    'name',
+    'kind',
+    'buffers',
+    'bytes',
+    'busy',
+    'dropped',
+    'queued',
+    'capacity',
+    'elapsed',
+    'status',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative describing one
+    stage of a pipeline, as returned by :meth:`MMALPipelineProfiler.sample`.
+    All counts cover the interval since the previous sample. Figures which
+    cannot be measured for a stage are ``None``.
+
+    .. attribute:: name
+
+        The name of the component, connection, or port.
+
+    .. attribute:: kind
+
+        One of ``'component'``, ``'connection'``, or ``'callback'`` (the
+        callback of the port the pipeline was traced from).
+
+    .. attribute:: buffers
+
+        The number of buffers which passed through the stage.
+
+    .. attribute:: bytes
+
+        The number of bytes which passed through the stage.
+
+    .. attribute:: busy
+
+        The time (in seconds) the stage spent handling buffers.
+
+    .. attribute:: dropped
+
+        The number of buffers the stage dropped for lack of a buffer in the
+        next stage.
+
+    .. attribute:: queued
+
+        The number of buffers waiting to be handled by the stage at the time
+        of the sample.
+
+    .. attribute:: capacity
+
+        The maximum number of buffers which may wait for the stage.
+
+    .. attribute:: elapsed
+
+        The length (in seconds) of the sample's interval.
+
+    .. attribute:: status
+
+        ``'saturated'`` if the stage was busy for most of the interval, its
+        queue is full, or it dropped buffers, ``'starved'`` if the stage is
+        waiting on a saturated (or stalled) stage upstream, and ``'ok'``
+        otherwise.
+
+    .. versionadded:: 1.14
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+    @property
+    def rate(self):
+        """
+        The number of buffers per second which passed through the stage.
+        """
+        if self.buffers is None:
+            return None
+        return self.buffers / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bandwidth(self):
+        """
+        The number of bytes per second which passed through the stage.
+        """
+        if self.bytes is None:
+            return None
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def load(self):
+        """
+        The proportion of the interval the stage spent handling buffers.
+        """
+        if self.busy is None:
+            return None
+        return self.busy / self.elapsed if self.elapsed else 0.0
+
+
+def _format_bytes(value):
+    for unit in ('B', 'KB', 'MB'):
+        if value < 1024:
+            break
+        value /= 1024
+    else:
+        unit = 'GB'
+    return '%.1f%s' % (value, unit)
+
+
+class MMALPipelineProfiler(object):
+    """
+    Measures the throughput of each stage of the pipeline feeding the
+    :class:`MMALPort` or :class:`MMALPythonPort` *port* (as traced by
+    :func:`debug_pipeline`). Counters are attached to every connection in
+    the pipeline, and to the callback of *port* (if it is an unconnected
+    output port) until :meth:`close` is called, or the profiler is used as a
+    context manager::
+
+        with MMALPipelineProfiler(encoder.outputs[0]) as profiler:
+            while recording:
+                time.sleep(1)
+                print(profiler.text())
+
+    Each call to :meth:`sample` returns a list of :class:`MMALStageProfile`
+    tuples describing the stages of the pipeline, from the most upstream
+    component to *port*, covering the interval since the previous call (or
+    construction of the profiler). :meth:`text` and :meth:`dot` render the
+    same information as a table or a `Graphviz`_ graph respectively,
+    highlighting stages that are saturated (the bottleneck of the pipeline)
+    and those starved of buffers as a result.
+
+    Buffers traversing a tunnelled :class:`MMALConnection` never reach
+    Python; for these the buffer count reported by MMAL's core statistics for
+    the source port is used instead. The time spent within MMAL components
+    cannot be measured, though :class:`MMALPythonComponent` stages report
+    their :attr:`~MMALPythonComponent.stats`.
+
+    .. _Graphviz: https://graphviz.org/
+
+    .. versionadded:: 1.14
+    """
+    __slots__ = ('_port', '_stages', '_last', '_last_time')
+
+    saturated_load = 0.9
+
+    def __init__(self, port):
+        self._port = port
+        self._stages = []
+        for obj in reversed(list(debug_pipeline(port))):
+            if isinstance(obj, (MMALBaseComponent, MMALPythonBaseComponent)):
+                self._stages.append(('component', obj))
+            elif isinstance(obj, MMALBaseConnection):
+                obj._counter = _StageCounter()
+                self._stages.append(('connection', obj))
+        if port.type == mmal.MMAL_PORT_TYPE_OUTPUT and port.connection is None:
+            port._counter = _StageCounter()
+            self._stages.append(('callback', port))
+        self._last = [self._read(obj) for kind, obj in self._stages]
+        self._last_time = _now()
+
+    def close(self):
+        """
+        Detach the profiler's counters from the pipeline.
+        """
+        for kind, obj in self._stages:
+            if kind != 'component':
+                obj._counter = None
+        self._stages = []
+        self._last = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    def _read(self, obj):
+        # Returns the cumulative (buffers, bytes, busy, dropped) and the
+        # current (queued, capacity) figures for a stage
+        if isinstance(obj, MMALPythonComponent):
+            stats = obj.stats
+            return (
+                stats.frames, None, stats.busy, None,
+                stats.queued, obj.inputs[0].buffer_count)
+        counter = getattr(obj, '_counter', None)
+        if counter is not None:
+            if isinstance(obj, MMALConnection) and obj._callback is None:
+                stats = mmal.MMAL_CORE_STATISTICS_T()
+                if mmal.mmal_util_get_core_port_stats(
+                        obj._source._port, mmal.MMAL_CORE_STATS_TX,
+                        False, stats) == mmal.MMAL_SUCCESS:
+                    return (stats.buffer_count, None, None, None, None, None)
+                return (None, None, None, None, None, None)
+            return (
+                counter.buffers, counter.bytes, counter.busy,
+                counter.dropped, None, None)
+        return (None, None, None, None, None, None)
+
+    def sample(self):
+        """
+        Return a list of :class:`MMALStageProfile` tuples describing each
+        stage of the pipeline since the last sample.
+        """
+        now = _now()
+        elapsed = now - self._last_time
+        self._last_time = now
+        result = []
+        upstream_saturated = upstream_flowing = False
+        for i, (kind, obj) in enumerate(self._stages):
+            current = self._read(obj)
+            last, self._last[i] = self._last[i], current
+            # Cumulative figures may go backwards if a component was
+            # re-enabled (resetting its stats) during the interval
+            buffers, nbytes, busy, dropped = (
+                None if value is None else
+                value - prev if value >= prev else value
+                for value, prev in zip(current[:4], last[:4])
+                )
+            queued, capacity = current[4:]
+            if (
+                    (busy is not None and elapsed and
+                        busy / elapsed >= self.saturated_load) or
+                    (queued is not None and capacity and queued >= capacity) or
+                    dropped):
+                status = 'saturated'
+            elif upstream_saturated or (upstream_flowing and buffers == 0):
+                status = 'starved'
+            else:
+                status = 'ok'
+            upstream_saturated = upstream_saturated or status == 'saturated'
+            upstream_flowing = upstream_flowing or bool(buffers)
+            result.append(MMALStageProfile(
+                obj.name, kind, buffers, nbytes, busy, dropped, queued,
+                capacity, elapsed, status))
+        return result
+
+    def text(self, stages=None):
+        """
+        Return a human readable table of *stages* (as returned by
+        :meth:`sample`). If *stages* is omitted, :meth:`sample` is called.
+        """
+        if stages is None:
+            stages = self.sample()
+        rows = [(
+            'stage', 'kind', 'buf/s', 'bytes/s', 'load', 'queue', 'dropped',
+            'status')]
+        for stage in stages:
+            rows.append((
+                stage.name,
+                stage.kind,
+                '-' if stage.rate is None else '%.1f' % stage.rate,
+                '-' if stage.bandwidth is None else
+                    _format_bytes(stage.bandwidth),
+                '-' if stage.load is None else '%d%%' % (stage.load * 100),
+                '-' if stage.queued is None else
+                    '%d/%d' % (stage.queued, stage.capacity),
+                '-' if stage.dropped is None else '%d' % stage.dropped,
+                stage.status,
+                ))
+        widths = [max(len(s) for s in col) for col in zip(*rows)]
+        return '\n'.join(
+            '  '.join(
+                s.ljust(width) if col in (0, 1, 7) else s.rjust(width)
+                for col, (s, width) in enumerate(zip(row, widths))
+                ).rstrip()
+            for row in rows
+            )
+
+    def dot(self, stages=None):
+        """
+        Return a `Graphviz`_ DOT description of *stages* (as returned by
+        :meth:`sample`). Components (and the port callback) are rendered as
+        nodes, and connections as edges labelled with their throughput.
+        Saturated stages are drawn in red, and starved stages in blue. If
+        *stages* is omitted, :meth:`sample` is called.
+        """
+        if stages is None:
+            stages = self.sample()
+        colors = {'saturated': 'red', 'starved': 'blue', 'ok': 'black'}
+
+        def label(stage):
+            lines = []
+            if stage.rate is not None:
+                lines.append('%.1f buf/s' % stage.rate)
+            if stage.bandwidth is not None:
+                lines.append('%s/s' % _format_bytes(stage.bandwidth))
+            if stage.load is not None:
+                lines.append('load %d%%' % (stage.load * 100))
+            if stage.queued is not None:
+                lines.append('queue %d/%d' % (stage.queued, stage.capacity))
+            if stage.dropped:
+                lines.append('%d dropped' % stage.dropped)
+            return '\\n'.join(lines)
+
+        lines = [
+            'digraph pipeline {',
+            '    rankdir=LR;',
+            '    node [shape=box];',
+            ]
+        prev = edge = None
+        for i, stage in enumerate(stages):
+            if stage.kind == 'connection':
+                edge = stage
+                continue
+            node = 's%d' % i
+            text = '\\n'.join(
+                s for s in (stage.name.replace('"', '\\"'), label(stage)) if s)
+            lines.append('    %s [label="%s", color=%s%s];' % (
+                node, text, colors[stage.status],
+                ', shape=ellipse' if stage.kind == 'callback' else ''))
+            if prev is not None:
+                if edge is None:
+                    lines.append('    %s -> %s;' % (prev, node))
+                else:
+                    lines.append('    %s -> %s [label="%s", color=%s];' % (
+                        prev, node, label(edge), colors[edge.status]))
+            prev, edge = node, None
+        lines.append('}')
+        return '\n'.join(lines)
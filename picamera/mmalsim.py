@@ -0,0 +1,1645 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import time
+import threading
+import traceback
+import ctypes as ct
+from collections import deque, namedtuple
+from fractions import Fraction
+
+from . import mmal, bcm_host
+
+
+_now = getattr(time, 'monotonic', time.time)
+
+
+def _addr(obj):
+    # Callers pass ports, buffers, etc. either as ctypes pointers or (in the
+    # case of parameter headers) as the structures themselves
+    if isinstance(obj, ct._Pointer):
+        return ct.addressof(obj.contents)
+    return ct.addressof(obj)
+
+
+def _deref(obj):
+    if isinstance(obj, ct._Pointer):
+        return obj[0]
+    return obj
+
+
+# Bytes per pixel of the raw encodings the simulated components produce
+_RAW_ENCODINGS = {
+    mmal.MMAL_ENCODING_I420:  1.5,
+    mmal.MMAL_ENCODING_YV12:  1.5,
+    mmal.MMAL_ENCODING_NV12:  1.5,
+    mmal.MMAL_ENCODING_NV21:  1.5,
+    mmal.MMAL_ENCODING_I422:  2,
+    mmal.MMAL_ENCODING_YUYV:  2,
+    mmal.MMAL_ENCODING_YVYU:  2,
+    mmal.MMAL_ENCODING_UYVY:  2,
+    mmal.MMAL_ENCODING_VYUY:  2,
+    mmal.MMAL_ENCODING_RGB16: 2,
+    mmal.MMAL_ENCODING_RGB24: 3,
+    mmal.MMAL_ENCODING_BGR24: 3,
+    mmal.MMAL_ENCODING_RGBA:  4,
+    mmal.MMAL_ENCODING_BGRA:  4,
+    }
+
+_CAMERA_ENCODINGS = (
+    mmal.MMAL_ENCODING_I420,
+    mmal.MMAL_ENCODING_RGB24,
+    mmal.MMAL_ENCODING_BGR24,
+    mmal.MMAL_ENCODING_RGBA,
+    mmal.MMAL_ENCODING_BGRA,
+    mmal.MMAL_ENCODING_YV12,
+    mmal.MMAL_ENCODING_NV12,
+    mmal.MMAL_ENCODING_NV21,
+    mmal.MMAL_ENCODING_I422,
+    mmal.MMAL_ENCODING_YUYV,
+    mmal.MMAL_ENCODING_YVYU,
+    mmal.MMAL_ENCODING_UYVY,
+    mmal.MMAL_ENCODING_VYUY,
+    mmal.MMAL_ENCODING_RGB16,
+    )
+
+_RESIZER_ENCODINGS = (
+    mmal.MMAL_ENCODING_RGBA,
+    mmal.MMAL_ENCODING_BGRA,
+    mmal.MMAL_ENCODING_RGB16,
+    mmal.MMAL_ENCODING_I420,
+    )
+
+_SINK_ENCODINGS = (
+    mmal.MMAL_ENCODING_I420,
+    mmal.MMAL_ENCODING_RGB24,
+    mmal.MMAL_ENCODING_BGR24,
+    mmal.MMAL_ENCODING_RGBA,
+    mmal.MMAL_ENCODING_BGRA,
+    )
+
+_IMAGE_ENCODINGS = {
+    mmal.MMAL_ENCODING_JPEG: (
+        b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00',
+        b'\xff\xd9'),
+    mmal.MMAL_ENCODING_GIF:  (b'GIF89a', b';'),
+    mmal.MMAL_ENCODING_PNG:  (b'\x89PNG\r\n\x1a\n', b''),
+    mmal.MMAL_ENCODING_BMP:  (b'BM', b''),
+    mmal.MMAL_ENCODING_PPM:  (b'P6\n', b''),
+    mmal.MMAL_ENCODING_TGA:  (b'\x00\x00\x02', b''),
+    }
+
+_H264_PROFILES = {
+    mmal.MMAL_VIDEO_PROFILE_H264_BASELINE:             (66, 0x00),
+    mmal.MMAL_VIDEO_PROFILE_H264_CONSTRAINED_BASELINE: (66, 0xC0),
+    mmal.MMAL_VIDEO_PROFILE_H264_MAIN:                 (77, 0x00),
+    mmal.MMAL_VIDEO_PROFILE_H264_HIGH:                 (100, 0x00),
+    }
+
+_H264_LEVELS = (10, 9, 11, 12, 13, 20, 21, 22, 30, 31, 32, 40, 41, 42, 50, 51)
+
+# Payload of the opaque buffers passed between components; on the GPU these
+# are handles to images which never leave VideoCore memory
+_OPAQUE_SIZE = 128
+
+
+class _BitWriter(object):
+    __slots__ = ('_bits',)
+
+    def __init__(self):
+        self._bits = []
+
+    def u(self, bits, value):
+        self._bits.extend((value >> i) & 1 for i in reversed(range(bits)))
+
+    def ue(self, value):
+        value += 1
+        bits = value.bit_length()
+        self.u(bits - 1, 0)
+        self.u(bits, value)
+
+    def rbsp(self):
+        bits = self._bits + [1]
+        bits += [0] * (-len(bits) % 8)
+        data = bytearray(
+            int(''.join(str(b) for b in bits[i:i + 8]), 2)
+            for i in range(0, len(bits), 8))
+        # Insert emulation prevention bytes
+        result = bytearray()
+        zeros = 0
+        for byte in data:
+            if zeros >= 2 and byte <= 3:
+                result.append(3)
+                zeros = 0
+            result.append(byte)
+            zeros = zeros + 1 if byte == 0 else 0
+        return bytes(result)
+
+
+def _h264_headers(profile, constraints, level, width, height):
+    """
+    Return SPS and PPS NAL units (with start codes) describing a *width* by
+    *height* stream.
+    """
+    mb_width = (width + 15) // 16
+    mb_height = (height + 15) // 16
+    sps = _BitWriter()
+    sps.u(8, profile)
+    sps.u(8, constraints)
+    sps.u(8, level)
+    sps.ue(0)       # seq_parameter_set_id
+    if profile >= 100:
+        sps.ue(1)   # chroma_format_idc
+        sps.ue(0)   # bit_depth_luma_minus8
+        sps.ue(0)   # bit_depth_chroma_minus8
+        sps.u(1, 0) # qpprime_y_zero_transform_bypass_flag
+        sps.u(1, 0) # seq_scaling_matrix_present_flag
+    sps.ue(4)       # log2_max_frame_num_minus4
+    sps.ue(2)       # pic_order_cnt_type
+    sps.ue(1)       # max_num_ref_frames
+    sps.u(1, 0)     # gaps_in_frame_num_value_allowed_flag
+    sps.ue(mb_width - 1)
+    sps.ue(mb_height - 1)
+    sps.u(1, 1)     # frame_mbs_only_flag
+    sps.u(1, 1)     # direct_8x8_inference_flag
+    crop_right = (mb_width * 16 - width) // 2
+    crop_bottom = (mb_height * 16 - height) // 2
+    if crop_right or crop_bottom:
+        sps.u(1, 1)
+        sps.ue(0)
+        sps.ue(crop_right)
+        sps.ue(0)
+        sps.ue(crop_bottom)
+    else:
+        sps.u(1, 0)
+    sps.u(1, 0)     # vui_parameters_present_flag
+    pps = _BitWriter()
+    pps.ue(0)       # pic_parameter_set_id
+    pps.ue(0)       # seq_parameter_set_id
+    pps.u(1, int(profile != 66)) # entropy_coding_mode_flag
+    pps.u(1, 0)     # bottom_field_pic_order_in_frame_present_flag
+    pps.ue(0)       # num_slice_groups_minus1
+    pps.ue(0)       # num_ref_idx_l0_default_active_minus1
+    pps.ue(0)       # num_ref_idx_l1_default_active_minus1
+    pps.u(1, 0)     # weighted_pred_flag
+    pps.u(2, 0)     # weighted_bipred_idc
+    pps.ue(0)       # pic_init_qp_minus26
+    pps.ue(0)       # pic_init_qs_minus26
+    pps.ue(0)       # chroma_qp_index_offset
+    pps.u(1, 1)     # deblocking_filter_control_present_flag
+    pps.u(1, 0)     # constrained_intra_pred_flag
+    pps.u(1, 0)     # redundant_pic_cnt_present_flag
+    return (
+        b'\x00\x00\x00\x01\x27' + sps.rbsp() +
+        b'\x00\x00\x00\x01\x28' + pps.rbsp())
+
+
+def _frame_tag(frame):
+    # Four bytes identifying the frame which can never form a start code
+    return bytearray(0x80 | ((frame >> shift) & 0x7F) for shift in (21, 14, 7, 0))
+
+
+class _SimBuffer(object):
+    __slots__ = (
+        'header', 'ptr', 'address', 'type', 'payload', 'pool', 'refs',
+        'reference', 'frame')
+
+    def __init__(self, pool, size):
+        self.header = mmal.MMAL_BUFFER_HEADER_T()
+        self.type = mmal.MMAL_BUFFER_HEADER_TYPE_SPECIFIC_T()
+        self.header.type = ct.pointer(self.type)
+        self.ptr = ct.pointer(self.header)
+        self.address = ct.addressof(self.header)
+        self.pool = pool
+        self.refs = 1
+        self.reference = None
+        self.frame = 0
+        if size:
+            self.payload = (ct.c_uint8 * size)()
+            self.header.data = ct.cast(self.payload, ct.POINTER(ct.c_uint8))
+        else:
+            self.payload = None
+        self.header.alloc_size = size
+        self.reset()
+
+    def reset(self):
+        h = self.header
+        h.cmd = 0
+        h.length = 0
+        h.offset = 0
+        h.flags = 0
+        h.pts = h.dts = mmal.MMAL_TIME_UNKNOWN
+
+
+class _SimQueue(object):
+    __slots__ = ('storage', 'ptr', 'address', 'items', 'cond')
+
+    def __init__(self):
+        # MMAL_QUEUE_T is opaque; a few bytes of storage give it an address
+        self.storage = (ct.c_uint8 * 8)()
+        self.ptr = ct.cast(self.storage, ct.POINTER(mmal.MMAL_QUEUE_T))
+        self.address = ct.addressof(self.storage)
+        self.items = deque()
+        self.cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, buf):
+        with self.cond:
+            self.items.append(buf)
+            self.cond.notify()
+
+    def put_back(self, buf):
+        with self.cond:
+            self.items.appendleft(buf)
+            self.cond.notify()
+
+    def get(self, timeout=0):
+        with self.cond:
+            if timeout != 0 and not self.items:
+                if timeout is None:
+                    while not self.items:
+                        self.cond.wait()
+                else:
+                    deadline = _now() + timeout
+                    while not self.items:
+                        remaining = deadline - _now()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+            if self.items:
+                return self.items.popleft()
+        return None
+
+
+class _SimPool(object):
+    __slots__ = (
+        'struct', 'ptr', 'address', 'queue', 'buffers', 'headers', 'port',
+        'on_release', 'callback', 'destroyed')
+
+    def __init__(self, num, size, port=None):
+        self.struct = mmal.MMAL_POOL_T()
+        self.ptr = ct.pointer(self.struct)
+        self.address = ct.addressof(self.struct)
+        self.queue = _SimQueue()
+        self.struct.queue = self.queue.ptr
+        self.port = port
+        self.on_release = None
+        self.callback = None
+        self.destroyed = False
+        self.buffers = []
+        self.resize(num, size)
+
+    def resize(self, num, size):
+        self.buffers = [_SimBuffer(self, size) for i in range(num)]
+        self.headers = (ct.POINTER(mmal.MMAL_BUFFER_HEADER_T) * num)(
+            *(buf.ptr for buf in self.buffers))
+        self.struct.headers_num = num
+        self.struct.header = ct.cast(
+            self.headers, ct.POINTER(ct.POINTER(mmal.MMAL_BUFFER_HEADER_T)))
+        with self.queue.cond:
+            self.queue.items.clear()
+            self.queue.items.extend(self.buffers)
+
+
+class _SimPort(object):
+    __slots__ = (
+        'component', 'struct', 'ptr', 'address', 'format', 'es', 'name',
+        'params', 'strings', 'encodings', 'opaque', 'callback', 'buffers',
+        'busy', 'connection', 'capture', 'frames', 'dropped')
+
+    def __init__(self, component, port_type, index, index_all, encodings=(),
+                 opaque=True):
+        self.component = component
+        self.struct = mmal.MMAL_PORT_T()
+        self.ptr = ct.pointer(self.struct)
+        self.address = ct.addressof(self.struct)
+        self.es = mmal.MMAL_ES_SPECIFIC_FORMAT_T()
+        self.format = mmal.MMAL_ES_FORMAT_T()
+        self.format.es = ct.pointer(self.es)
+        self.format.type = (
+            mmal.MMAL_ES_TYPE_CONTROL
+            if port_type == mmal.MMAL_PORT_TYPE_CONTROL else
+            mmal.MMAL_ES_TYPE_VIDEO)
+        self.name = ('%s:%s:%d' % (
+            component.name.decode('ascii'), {
+                mmal.MMAL_PORT_TYPE_CONTROL: 'ctr',
+                mmal.MMAL_PORT_TYPE_INPUT:   'in',
+                mmal.MMAL_PORT_TYPE_OUTPUT:  'out',
+                }[port_type], index)).encode('ascii')
+        s = self.struct
+        s.name = self.name
+        s.type = port_type
+        s.index = index
+        s.index_all = index_all
+        s.format = ct.pointer(self.format)
+        s.buffer_alignment_min = 16
+        s.component = component.ptr
+        self.params = {}
+        self.strings = {}
+        self.encodings = encodings
+        self.opaque = opaque
+        self.callback = None
+        self.buffers = deque()
+        self.busy = threading.RLock()
+        self.connection = None
+        self.capture = False
+        self.frames = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return bool(self.struct.is_enabled)
+
+    @property
+    def frame_size(self):
+        enc = self.format.encoding
+        video = self.es.video
+        if enc == mmal.MMAL_ENCODING_OPAQUE:
+            return _OPAQUE_SIZE
+        return int(video.width * video.height * _RAW_ENCODINGS.get(enc, 1))
+
+    @property
+    def framerate(self):
+        rate = self.es.video.frame_rate
+        if rate.num and rate.den:
+            return Fraction(rate.num, rate.den)
+        return None
+
+    def param(self, key, struct):
+        """
+        Return the stored value of parameter *key* as an instance of
+        *struct*, or ``None`` if it has never been set.
+        """
+        try:
+            data = self.params[key]
+        except KeyError:
+            return None
+        size = ct.sizeof(struct)
+        return struct.from_buffer_copy(data[:size].ljust(size, b'\0'))
+
+    def store(self, value):
+        self.params[value.hdr.id] = ct.string_at(
+            ct.addressof(value), ct.sizeof(value))
+
+    def deliver(self, buf):
+        """
+        Pass *buf* to the port's callback, or release it if the port has been
+        disabled in the meantime.
+        """
+        with self.busy:
+            callback = self.callback
+            if self.struct.is_enabled and callback is not None:
+                callback(buf)
+                return
+        self.component.sim._release(buf)
+
+
+class _SimComponent(object):
+    """
+    Base class of the simulated components. Each component has a thread which
+    processes the buffers sent to its input ports (calling :meth:`process`)
+    and returns them to their owners afterward. As with most firmware
+    components, processing depends only on the ports being enabled; the
+    camera is the exception.
+    """
+    name = b'none'
+    input_encodings = ()
+    output_encodings = ()
+    input_opaque = ()
+    output_opaque = ()
+
+    def __init__(self, sim, id):
+        self.sim = sim
+        self.struct = mmal.MMAL_COMPONENT_T()
+        self.ptr = ct.pointer(self.struct)
+        self.address = ct.addressof(self.struct)
+        self.cond = threading.Condition()
+        self.work = deque()
+        self.closed = False
+        s = self.struct
+        s.name = self.name
+        s.id = id
+        self.control = _SimPort(self, mmal.MMAL_PORT_TYPE_CONTROL, 0, 0)
+        self.inputs = [
+            _SimPort(
+                self, mmal.MMAL_PORT_TYPE_INPUT, i, i + 1,
+                self.input_encodings, opaque)
+            for i, opaque in enumerate(self.input_opaque)]
+        self.outputs = [
+            _SimPort(
+                self, mmal.MMAL_PORT_TYPE_OUTPUT, i, i + 1 + len(self.inputs),
+                self.output_encodings, opaque)
+            for i, opaque in enumerate(self.output_opaque)]
+        self.ports = [self.control] + self.inputs + self.outputs
+        self._arrays = [
+            (ct.POINTER(mmal.MMAL_PORT_T) * len(ports))(
+                *(port.ptr for port in ports))
+            for ports in (self.inputs, self.outputs, self.ports)]
+        s.control = self.control.ptr
+        s.input_num = len(self.inputs)
+        s.output_num = len(self.outputs)
+        s.port_num = len(self.ports)
+        s.input, s.output, s.port = (
+            ct.cast(array, ct.POINTER(ct.POINTER(mmal.MMAL_PORT_T)))
+            for array in self._arrays)
+        self.setup()
+        for port in self.inputs + self.outputs:
+            self.commit(port)
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def setup(self):
+        """
+        Configure the initial formats and parameters of the ports.
+        """
+        for port in self.inputs + self.outputs:
+            port.format.encoding = (
+                mmal.MMAL_ENCODING_OPAQUE if port.opaque else
+                port.encodings[0])
+            port.format.encoding_variant = mmal.MMAL_ENCODING_I420
+            video = port.es.video
+            video.width = video.crop.width = 640
+            video.height = video.crop.height = 480
+            video.frame_rate.num = 30
+            video.frame_rate.den = 1
+
+    @property
+    def enabled(self):
+        return bool(self.struct.is_enabled)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not threading.current_thread():
+            self.thread.join(1)
+
+    def notify(self):
+        with self.cond:
+            self.cond.notify_all()
+
+    def commit(self, port):
+        enc = port.format.encoding
+        if enc == mmal.MMAL_ENCODING_OPAQUE:
+            if not port.opaque:
+                return mmal.MMAL_EINVAL
+        elif enc not in port.encodings:
+            return mmal.MMAL_EINVAL
+        num, size = self.requirements(port)
+        s = port.struct
+        s.buffer_num_min = s.buffer_num_recommended = num
+        s.buffer_size_min = s.buffer_size_recommended = size
+        return mmal.MMAL_SUCCESS
+
+    def requirements(self, port):
+        """
+        Return the minimum number and size of buffers required by *port*.
+        """
+        if port.format.encoding == mmal.MMAL_ENCODING_OPAQUE:
+            return 3, _OPAQUE_SIZE
+        return 1, port.frame_size
+
+    def get_param(self, port, key, addr, size):
+        if key == mmal.MMAL_PARAMETER_SUPPORTED_ENCODINGS:
+            mp = mmal.MMAL_PARAMETER_ENCODING_T.from_address(addr)
+            count = min(len(port.encodings), (size - 8) // 4)
+            for i, enc in enumerate(port.encodings[:count]):
+                mp.encoding[i] = enc
+            mp.hdr.size = 8 + count * 4
+            return mmal.MMAL_SUCCESS
+        data = port.params.get(key)
+        if data is None:
+            ct.memset(addr + 8, 0, size - 8)
+        else:
+            count = max(0, min(len(data), size) - 8)
+            ct.memmove(addr + 8, data[8:8 + count], count)
+            ct.memset(addr + 8 + count, 0, size - 8 - count)
+        return mmal.MMAL_SUCCESS
+
+    def set_param(self, port, key, data):
+        port.params[key] = data
+        return mmal.MMAL_SUCCESS
+
+    def port_enabled(self, port):
+        pass
+
+    def send(self, port, buf):
+        with self.cond:
+            if not port.struct.is_enabled:
+                return mmal.MMAL_EINVAL
+            if port.struct.type == mmal.MMAL_PORT_TYPE_OUTPUT:
+                port.buffers.append(buf)
+            elif port.struct.type == mmal.MMAL_PORT_TYPE_INPUT:
+                self.work.append((port, buf))
+            else:
+                return mmal.MMAL_EINVAL
+            self.cond.notify_all()
+        return mmal.MMAL_SUCCESS
+
+    def take(self, port, block=True):
+        """
+        Return the next empty buffer sent to output *port*. If none is
+        available and *block* is ``True``, wait for one unless the port is
+        disabled. Returns ``None`` if no buffer could be obtained.
+        """
+        with self.cond:
+            while True:
+                if port.buffers:
+                    return port.buffers.popleft()
+                if not (block and port.struct.is_enabled and not self.closed):
+                    return None
+                self.cond.wait()
+
+    def withdraw(self, port):
+        """
+        Remove and return all buffers held by *port*.
+        """
+        with self.cond:
+            bufs = list(port.buffers)
+            port.buffers.clear()
+            work = [item for item in self.work if item[0] is port]
+            if work:
+                self.work = deque(item for item in self.work if item[0] is not port)
+            self.cond.notify_all()
+        return bufs + [buf for p, buf in work]
+
+    def emit(self, port, data, length, flags, pts, frame, block=True):
+        """
+        Send *length* bytes of *data* from *port*, splitting it across as many
+        buffers as required. If *data* is an int, the output is filled with
+        that byte value. Returns ``False`` if the data was dropped for lack of
+        a buffer (or because the port was disabled).
+        """
+        if not isinstance(data, int):
+            src = (ct.c_char * length).from_buffer(data)
+        offset = 0
+        while True:
+            buf = self.take(port, block)
+            if buf is None:
+                if not offset:
+                    port.dropped += 1
+                return False
+            h = buf.header
+            chunk = min(length - offset, h.alloc_size)
+            if isinstance(data, int):
+                ct.memset(h.data, data, chunk)
+            else:
+                ct.memmove(h.data, ct.byref(src, offset), chunk)
+            offset += chunk
+            h.offset = 0
+            h.length = chunk
+            h.flags = (
+                flags if offset >= length else
+                flags & ~mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END)
+            h.pts = h.dts = pts
+            buf.frame = frame
+            if offset >= length:
+                port.frames += 1
+                port.deliver(buf)
+                return True
+            port.deliver(buf)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.work and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                port, buf = self.work.popleft()
+            keep = False
+            try:
+                if port.struct.is_enabled:
+                    keep = self.process(port, buf)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                if not keep:
+                    port.deliver(buf)
+
+    def process(self, port, buf):
+        """
+        Process *buf* which was sent to input *port*. Return ``True`` if the
+        component has retained *buf* (in *port*'s buffers, from which it is
+        withdrawn when the port is disabled), or ``False`` to return it to its
+        owner immediately.
+        """
+        return False
+
+
+class _SimCamera(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_CAMERA
+    output_encodings = _CAMERA_ENCODINGS
+    output_opaque = (True, True, True)
+
+    def setup(self):
+        super(_SimCamera, self).setup()
+        settings = mmal.MMAL_PARAMETER_CAMERA_SETTINGS_T(
+            mmal.MMAL_PARAMETER_HEADER_T(
+                mmal.MMAL_PARAMETER_CAMERA_SETTINGS,
+                ct.sizeof(mmal.MMAL_PARAMETER_CAMERA_SETTINGS_T)),
+            exposure=33000,
+            analog_gain=mmal.MMAL_RATIONAL_T(1, 1),
+            digital_gain=mmal.MMAL_RATIONAL_T(1, 1),
+            awb_red_gain=mmal.MMAL_RATIONAL_T(3, 2),
+            awb_blue_gain=mmal.MMAL_RATIONAL_T(3, 2),
+            )
+        self.control.store(settings)
+
+    def get_param(self, port, key, addr, size):
+        if key == mmal.MMAL_PARAMETER_SYSTEM_TIME:
+            mp = mmal.MMAL_PARAMETER_UINT64_T.from_address(addr)
+            mp.value = self.sim.timestamp()
+            return mmal.MMAL_SUCCESS
+        if key == mmal.MMAL_PARAMETER_FRAME_RATE and port.framerate:
+            # The firmware reports the framerate the port is running at
+            mp = mmal.MMAL_PARAMETER_FRAME_RATE_T.from_address(addr)
+            mp.frame_rate.num = port.framerate.numerator
+            mp.frame_rate.den = port.framerate.denominator
+            return mmal.MMAL_SUCCESS
+        return super(_SimCamera, self).get_param(port, key, addr, size)
+
+    def set_param(self, port, key, data):
+        if key == mmal.MMAL_PARAMETER_CAPTURE:
+            port.capture = bool(
+                mmal.MMAL_PARAMETER_BOOLEAN_T.from_buffer_copy(data).enable)
+            self.notify()
+        return super(_SimCamera, self).set_param(port, key, data)
+
+    def period(self):
+        video = self.outputs[1]
+        fps = video.framerate
+        if fps is None:
+            mp = video.param(
+                mmal.MMAL_PARAMETER_FPS_RANGE, mmal.MMAL_PARAMETER_FPS_RANGE_T)
+            if mp is not None and mp.fps_high.num and mp.fps_high.den:
+                fps = Fraction(mp.fps_high.num, mp.fps_high.den)
+            else:
+                fps = 30
+        return 1 / (float(fps) * self.sim.speed)
+
+    def _run(self):
+        frame = 0
+        next_tick = _now()
+        while True:
+            with self.cond:
+                if self.closed:
+                    return
+                if not self.struct.is_enabled:
+                    self.cond.wait()
+                    next_tick = _now()
+                    continue
+                delay = next_tick - _now()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+            try:
+                self.tick(frame, self.sim.timestamp())
+            except Exception:
+                traceback.print_exc()
+            frame += 1
+            next_tick = max(next_tick + self.period(), _now() - self.period())
+
+    def tick(self, frame, pts):
+        preview, video, still = self.outputs
+        value = frame & 0xFF
+        flags = mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END
+        if preview.enabled:
+            self.emit(preview, value, preview.frame_size, flags, pts, frame, False)
+        if video.enabled and video.capture:
+            self.emit(video, value, video.frame_size, flags, pts, frame, False)
+        if still.enabled and still.capture:
+            # Stills are one-shot; the capture flag is cleared once a frame is
+            # delivered
+            if self.emit(still, value, still.frame_size, flags, pts, frame, False):
+                still.capture = False
+
+
+class _SimCameraInfo(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_CAMERA_INFO
+
+    def get_param(self, port, key, addr, size):
+        if key == mmal.MMAL_PARAMETER_CAMERA_INFO:
+            # Modern firmwares reject the original revision of the structure
+            if size != ct.sizeof(mmal.MMAL_PARAMETER_CAMERA_INFO_V2_T):
+                return mmal.MMAL_EINVAL
+            mp = mmal.MMAL_PARAMETER_CAMERA_INFO_V2_T.from_address(addr)
+            ct.memset(addr + 8, 0, size - 8)
+            mp.num_cameras = 1
+            mp.cameras[0].max_width, mp.cameras[0].max_height = self.sim.resolution
+            mp.cameras[0].lens_present = mmal.MMAL_TRUE
+            mp.cameras[0].camera_name = self.sim.sensor.encode('ascii')
+            return mmal.MMAL_SUCCESS
+        return super(_SimCameraInfo, self).get_param(port, key, addr, size)
+
+
+class _SimSplitter(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_VIDEO_SPLITTER
+    input_encodings = output_encodings = _SINK_ENCODINGS
+    input_opaque = (True,)
+    output_opaque = (True,) * 4
+
+    def commit(self, port):
+        result = super(_SimSplitter, self).commit(port)
+        if result == mmal.MMAL_SUCCESS and port in self.inputs:
+            # The splitter propagates its input format to its outputs
+            for output in self.outputs:
+                if not output.enabled:
+                    self.sim._copy_format(output.format, port.format)
+                    self.commit(output)
+        return result
+
+    def process(self, port, buf):
+        value = buf.frame & 0xFF
+        flags = buf.header.flags
+        for output in self.outputs:
+            if output.enabled:
+                self.emit(
+                    output, value, output.frame_size, flags, buf.header.pts,
+                    buf.frame, False)
+
+
+class _SimResizer(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_RESIZER
+    input_encodings = output_encodings = _RESIZER_ENCODINGS
+    input_opaque = (False,)
+    output_opaque = (False,)
+
+    def process(self, port, buf):
+        output = self.outputs[0]
+        self.emit(
+            output, buf.frame & 0xFF, output.frame_size, buf.header.flags,
+            buf.header.pts, buf.frame)
+
+
+class _SimISP(_SimResizer):
+    name = mmal.MMAL_COMPONENT_DEFAULT_ISP
+    input_encodings = output_encodings = _CAMERA_ENCODINGS
+    input_opaque = (True,)
+
+
+class _SimVideoEncoder(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_VIDEO_ENCODER
+    input_encodings = _SINK_ENCODINGS
+    output_encodings = (mmal.MMAL_ENCODING_H264, mmal.MMAL_ENCODING_MJPEG)
+    input_opaque = (True,)
+    output_opaque = (False,)
+
+    def setup(self):
+        super(_SimVideoEncoder, self).setup()
+        self.outputs[0].store(mmal.MMAL_PARAMETER_UINT32_T(
+            mmal.MMAL_PARAMETER_HEADER_T(
+                mmal.MMAL_PARAMETER_INTRAPERIOD,
+                ct.sizeof(mmal.MMAL_PARAMETER_UINT32_T)),
+            60))
+        self.count = 0
+        self.request_key = False
+
+    def requirements(self, port):
+        if port in self.outputs:
+            return 1, 65536
+        return super(_SimVideoEncoder, self).requirements(port)
+
+    def set_param(self, port, key, data):
+        if key == mmal.MMAL_PARAMETER_VIDEO_REQUEST_I_FRAME:
+            self.request_key = bool(
+                mmal.MMAL_PARAMETER_BOOLEAN_T.from_buffer_copy(data).enable)
+        return super(_SimVideoEncoder, self).set_param(port, key, data)
+
+    def port_enabled(self, port):
+        if port in self.outputs:
+            self.count = 0
+
+    def frame_bytes(self, output):
+        mp = output.param(
+            mmal.MMAL_PARAMETER_VIDEO_BIT_RATE, mmal.MMAL_PARAMETER_UINT32_T)
+        bitrate = mp.value if mp is not None else output.format.bitrate
+        if not bitrate:
+            bitrate = 17000000
+        fps = output.framerate or self.inputs[0].framerate or 30
+        return max(64, int(bitrate / 8 / fps))
+
+    def process(self, port, buf):
+        output = self.outputs[0]
+        if not output.enabled:
+            return
+        video = output.es.video
+        width = video.crop.width or video.width
+        height = video.crop.height or video.height
+        pts = buf.header.pts
+        size = self.frame_bytes(output)
+        if output.format.encoding == mmal.MMAL_ENCODING_MJPEG:
+            head, tail = _IMAGE_ENCODINGS[mmal.MMAL_ENCODING_JPEG]
+            data = bytearray(b'\xaa') * size
+            data[:len(head)] = head
+            data[-len(tail):] = tail
+            self.emit(
+                output, data, size, mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END,
+                pts, buf.frame)
+            return
+        intra_period = output.param(
+            mmal.MMAL_PARAMETER_INTRAPERIOD,
+            mmal.MMAL_PARAMETER_UINT32_T).value
+        key = (
+            self.count == 0 or self.request_key or
+            (intra_period > 0 and self.count % intra_period == 0))
+        if key:
+            self.request_key = False
+            inline = output.param(
+                mmal.MMAL_PARAMETER_VIDEO_ENCODE_INLINE_HEADER,
+                mmal.MMAL_PARAMETER_BOOLEAN_T)
+            if self.count == 0 or (inline is not None and inline.enable):
+                mp = output.param(
+                    mmal.MMAL_PARAMETER_PROFILE,
+                    mmal.MMAL_PARAMETER_VIDEO_PROFILE_T)
+                if mp is None:
+                    profile, constraints = _H264_PROFILES[
+                        mmal.MMAL_VIDEO_PROFILE_H264_HIGH]
+                    level = 40
+                else:
+                    profile, constraints = _H264_PROFILES.get(
+                        mp.profile[0].profile, (100, 0))
+                    try:
+                        level = _H264_LEVELS[
+                            mp.profile[0].level - mmal.MMAL_VIDEO_LEVEL_H264_1]
+                    except IndexError:
+                        level = 40
+                headers = bytearray(_h264_headers(
+                    profile, constraints, level, width, height))
+                self.emit(
+                    output, headers, len(headers),
+                    mmal.MMAL_BUFFER_HEADER_FLAG_CONFIG |
+                    mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END, pts, buf.frame)
+            size *= 4
+        data = bytearray(b'\xaa') * size
+        data[:5] = b'\x00\x00\x00\x01\x25' if key else b'\x00\x00\x00\x01\x21'
+        data[5:9] = _frame_tag(self.count)
+        flags = mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END
+        if key:
+            flags |= mmal.MMAL_BUFFER_HEADER_FLAG_KEYFRAME
+        self.emit(output, data, size, flags, pts, buf.frame)
+        self.count += 1
+        vectors = output.param(
+            mmal.MMAL_PARAMETER_VIDEO_ENCODE_INLINE_VECTORS,
+            mmal.MMAL_PARAMETER_BOOLEAN_T)
+        if vectors is not None and vectors.enable:
+            size = ((width + 15) // 16 + 1) * ((height + 15) // 16) * 4
+            self.emit(
+                output, 0, size,
+                mmal.MMAL_BUFFER_HEADER_FLAG_CODECSIDEINFO |
+                mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END, pts, buf.frame)
+
+
+class _SimImageEncoder(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_IMAGE_ENCODER
+    input_encodings = _CAMERA_ENCODINGS
+    output_encodings = tuple(_IMAGE_ENCODINGS)
+    input_opaque = (True,)
+    output_opaque = (False,)
+
+    def requirements(self, port):
+        if port in self.outputs:
+            return 1, 81920
+        return super(_SimImageEncoder, self).requirements(port)
+
+    def process(self, port, buf):
+        output = self.outputs[0]
+        if not output.enabled:
+            return
+        video = port.es.video
+        mp = output.param(
+            mmal.MMAL_PARAMETER_JPEG_Q_FACTOR, mmal.MMAL_PARAMETER_UINT32_T)
+        quality = mp.value if mp is not None else 85
+        head, tail = _IMAGE_ENCODINGS[output.format.encoding]
+        size = max(256, video.width * video.height * max(1, quality) // 600)
+        data = bytearray(b'\xaa') * size
+        data[:len(head)] = head
+        if tail:
+            data[-len(tail):] = tail
+        self.emit(
+            output, data, size, mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END,
+            buf.header.pts, buf.frame)
+
+
+class _SimRenderer(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_VIDEO_RENDERER
+    input_encodings = _SINK_ENCODINGS
+    input_opaque = (True,)
+
+    def requirements(self, port):
+        num, size = super(_SimRenderer, self).requirements(port)
+        return max(2, num), size
+
+    def process(self, port, buf):
+        # Empty buffers (which mmalobj sends back to input ports with
+        # callbacks) carry nothing to display and go straight back to their
+        # pool; returning them via the callback would just ping-pong them
+        if not buf.header.length:
+            self.sim._release(buf)
+            return True
+        return False
+
+
+class _SimNullSink(_SimComponent):
+    name = mmal.MMAL_COMPONENT_DEFAULT_NULL_SINK
+    input_encodings = _SINK_ENCODINGS
+    input_opaque = (True,)
+
+
+class _SimConnection(object):
+    """
+    A connection between an output and an input port. Tunnelled connections
+    forward buffers between the ports internally; otherwise the connection's
+    callback is invoked whenever a buffer arrives in its queue or returns to
+    its pool, as in MMAL.
+    """
+    def __init__(self, sim, output, input, flags):
+        self.sim = sim
+        self.struct = mmal.MMAL_CONNECTION_T()
+        self.ptr = ct.pointer(self.struct)
+        self.address = ct.addressof(self.struct)
+        self.output = output
+        self.input = input
+        self.queue = _SimQueue()
+        self.pool = None
+        self.name = output.name + b'/' + input.name
+        s = self.struct
+        s.name = self.name
+        s.flags = flags
+        s.out = output.ptr
+        s.in_ = input.ptr
+        s.queue = self.queue.ptr
+        output.connection = input.connection = self
+
+    @property
+    def tunnelled(self):
+        return bool(self.struct.flags & mmal.MMAL_CONNECTION_FLAG_TUNNELLING)
+
+    def enable(self):
+        if self.struct.is_enabled:
+            return mmal.MMAL_SUCCESS
+        output, input = self.output, self.input
+        self.pool = self.sim._create_pool(
+            max(output.struct.buffer_num, input.struct.buffer_num, 1),
+            max(output.struct.buffer_size, input.struct.buffer_size))
+        self.pool.on_release = self._notify
+        self.struct.pool = self.pool.ptr
+        for port, callback in ((input, self._input), (output, self._output)):
+            status = self.sim._enable_port(port, callback)
+            if status != mmal.MMAL_SUCCESS:
+                self.disable()
+                return status
+        self.struct.is_enabled = 1
+        if self.tunnelled:
+            self._pump()
+        return mmal.MMAL_SUCCESS
+
+    def disable(self):
+        self.struct.is_enabled = 0
+        for port in (self.output, self.input):
+            if port.enabled:
+                self.sim._disable_port(port)
+        while True:
+            buf = self.queue.get()
+            if buf is None:
+                break
+            self.sim._release(buf)
+        if self.pool is not None:
+            self.sim._destroy_pool(self.pool)
+            self.pool = None
+            self.struct.pool = None
+        return mmal.MMAL_SUCCESS
+
+    def destroy(self):
+        self.disable()
+        self.output.connection = self.input.connection = None
+
+    def _output(self, buf):
+        self.queue.put(buf)
+        self._notify()
+
+    def _input(self, buf):
+        self.sim._release(buf)
+
+    def _notify(self):
+        if not self.struct.is_enabled:
+            return
+        if self.tunnelled:
+            self._pump()
+        elif self.struct.callback:
+            self.struct.callback(self.ptr)
+
+    def _pump(self):
+        sim = self.sim
+        while True:
+            buf = self.queue.get()
+            if buf is None:
+                break
+            if buf.header.length or buf.header.flags or buf.header.cmd:
+                if sim._send(self.input, buf) != mmal.MMAL_SUCCESS:
+                    sim._release(buf)
+            else:
+                # Empty buffers (e.g. returned by a flush) go straight back
+                sim._release(buf)
+        pool = self.pool
+        while pool is not None:
+            buf = pool.queue.get()
+            if buf is None:
+                break
+            if sim._send(self.output, buf) != mmal.MMAL_SUCCESS:
+                pool.queue.put_back(buf)
+                break
+
+
+class MMALSimPortStats(namedtuple('MMALSimPortStats', (
+    'name',
+    'frames',
+    'dropped',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative returned by
+    :meth:`MMALSimulator.stats`.
+
+    .. attribute:: name
+
+        The name of the simulated port, e.g. ``vc.ril.camera:out:1``.
+
+    .. attribute:: frames
+
+        The number of frames the port has output.
+
+    .. attribute:: dropped
+
+        The number of frames the port has dropped because no buffer was
+        available to hold them (the camera and splitter never wait for
+        buffers, just like their firmware counterparts).
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+
+class MMALSimulator(object):
+    """
+    A pure Python implementation of the parts of ``libmmal`` and
+    ``libbcm_host`` used by picamera. Construct an instance and pass it to
+    :func:`install` to run picamera (or :mod:`~picamera.mmalobj` pipelines)
+    on machines without a camera module.
+
+    The simulator provides the camera, camera-info, video-splitter, resizer,
+    ISP, video-encoder, image-encoder, video-renderer and null-sink
+    components, along with ports, pools, queues and connections (tunnelled
+    or not). The camera emits frames at the framerate configured on its
+    video port, multiplied by *speed*.
+
+    *sensor* and *resolution* specify the camera module to report (an OV5647
+    with its 2592x1944 maximum resolution by default).
+
+    Frames are synthetic: raw and opaque frames are filled with a single byte
+    value derived from the frame number, H.264 output consists of valid
+    SPS/PPS headers followed by a NAL unit per frame (with the size implied
+    by the configured bitrate), and image and MJPEG output merely begins and
+    ends with the right markers. Inline motion vectors are zero. The
+    ``vc_dispmanx_*`` functions are not implemented.
+    """
+
+    components = {
+        cls.name: cls
+        for cls in (
+            _SimCamera, _SimCameraInfo, _SimSplitter, _SimResizer, _SimISP,
+            _SimVideoEncoder, _SimImageEncoder, _SimRenderer, _SimNullSink)
+        }
+
+    def __init__(self, sensor='ov5647', resolution=(2592, 1944), speed=1.0):
+        self.sensor = sensor
+        self.resolution = tuple(resolution)
+        self.speed = speed
+        self._epoch = _now()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._components = {}
+        self._ports = {}
+        self._buffers = {}
+        self._queues = {}
+        self._pools = {}
+        self._connections = {}
+
+    def __repr__(self):
+        return '<MMALSimulator %s %dx%d>' % (
+            self.sensor, self.resolution[0], self.resolution[1])
+
+    def timestamp(self):
+        """
+        Return the simulated system time in microseconds (the clock used to
+        timestamp frames).
+        """
+        return int((_now() - self._epoch) * 1000000)
+
+    def stats(self):
+        """
+        Return a list of :class:`MMALSimPortStats` tuples for the output
+        ports of all extant components.
+        """
+        return [
+            MMALSimPortStats(
+                port.name.decode('ascii'), port.frames, port.dropped)
+            for component in list(self._components.values())
+            for port in component.outputs
+            ]
+
+    # Internal helpers ########################################################
+
+    def _send(self, port, buf):
+        return port.component.send(port, buf)
+
+    def _release(self, buf):
+        with self._lock:
+            buf.refs -= 1
+            if buf.refs > 0:
+                return
+            buf.refs = 1
+        reference, buf.reference = buf.reference, None
+        if reference is not None:
+            buf.header.data = (
+                ct.cast(buf.payload, ct.POINTER(ct.c_uint8))
+                if buf.payload is not None else None)
+            buf.header.alloc_size = (
+                len(buf.payload) if buf.payload is not None else 0)
+            self._release(reference)
+        buf.reset()
+        buf.frame = 0
+        pool = buf.pool
+        if pool.destroyed:
+            self._buffers.pop(buf.address, None)
+        else:
+            callback = pool.callback
+            if callback is None or callback(pool.ptr, buf.ptr, None):
+                pool.queue.put(buf)
+            if pool.on_release is not None:
+                pool.on_release()
+
+    def _create_pool(self, num, size, port=None):
+        pool = _SimPool(num, size, port)
+        self._pools[pool.address] = pool
+        self._queues[pool.queue.address] = pool.queue
+        for buf in pool.buffers:
+            self._buffers[buf.address] = buf
+        return pool
+
+    def _destroy_pool(self, pool):
+        pool.destroyed = True
+        self._pools.pop(pool.address, None)
+        self._queues.pop(pool.queue.address, None)
+        # Buffers still in use are forgotten when they are released
+        with pool.queue.cond:
+            for buf in pool.queue.items:
+                self._buffers.pop(buf.address, None)
+            pool.queue.items.clear()
+
+    def _enable_port(self, port, callback):
+        component = port.component
+        with component.cond:
+            if port.struct.is_enabled:
+                return mmal.MMAL_EINVAL
+            port.callback = callback
+            port.struct.is_enabled = 1
+            component.cond.notify_all()
+        component.port_enabled(port)
+        return mmal.MMAL_SUCCESS
+
+    def _disable_port(self, port):
+        component = port.component
+        with component.cond:
+            if not port.struct.is_enabled:
+                return mmal.MMAL_EINVAL
+            port.struct.is_enabled = 0
+        bufs = component.withdraw(port)
+        # Wait for any callback in progress to finish
+        with port.busy:
+            port.callback = None
+        for buf in bufs:
+            self._release(buf)
+        return mmal.MMAL_SUCCESS
+
+    def _copy_format(self, dest, source):
+        dest.type = source.type
+        dest.encoding = source.encoding
+        dest.encoding_variant = source.encoding_variant
+        dest.bitrate = source.bitrate
+        dest.flags = source.flags
+        dest.es[0] = source.es[0]
+
+    # libmmal #################################################################
+
+    def mmal_component_create(self, name, component):
+        try:
+            cls = self.components[name]
+        except KeyError:
+            return mmal.MMAL_ENOSYS
+        with self._lock:
+            id = self._next_id
+            self._next_id += 1
+        result = cls(self, id)
+        self._components[result.address] = result
+        for port in result.ports:
+            self._ports[port.address] = port
+        component.contents = result.struct
+        return mmal.MMAL_SUCCESS
+
+    def mmal_component_destroy(self, component):
+        result = self._components.pop(_addr(component), None)
+        if result is None:
+            return mmal.MMAL_EINVAL
+        for port in result.ports:
+            if port.connection is not None:
+                self._connections.pop(port.connection.address, None)
+                port.connection.destroy()
+            if port.enabled:
+                self._disable_port(port)
+        result.struct.is_enabled = 0
+        result.close()
+        for port in result.ports:
+            self._ports.pop(port.address, None)
+        return mmal.MMAL_SUCCESS
+
+    def mmal_component_enable(self, component):
+        result = self._components[_addr(component)]
+        with result.cond:
+            result.struct.is_enabled = 1
+            result.cond.notify_all()
+        return mmal.MMAL_SUCCESS
+
+    def mmal_component_disable(self, component):
+        result = self._components[_addr(component)]
+        with result.cond:
+            result.struct.is_enabled = 0
+            result.cond.notify_all()
+        return mmal.MMAL_SUCCESS
+
+    def mmal_port_enable(self, port, callback):
+        port = self._ports[_addr(port)]
+        if not callback:
+            # Only connected ports may be enabled without a callback, and
+            # those are enabled by their connection
+            if port.connection is None:
+                return mmal.MMAL_EINVAL
+            return mmal.MMAL_SUCCESS
+        ptr = port.ptr
+        return self._enable_port(port, lambda buf: callback(ptr, buf.ptr))
+
+    def mmal_port_disable(self, port):
+        return self._disable_port(self._ports[_addr(port)])
+
+    def mmal_port_flush(self, port):
+        port = self._ports[_addr(port)]
+        for buf in port.component.withdraw(port):
+            port.deliver(buf)
+        return mmal.MMAL_SUCCESS
+
+    def mmal_port_format_commit(self, port):
+        port = self._ports[_addr(port)]
+        if port.struct.type == mmal.MMAL_PORT_TYPE_CONTROL:
+            return mmal.MMAL_EINVAL
+        return port.component.commit(port)
+
+    def mmal_port_send_buffer(self, port, buf):
+        port = self._ports[_addr(port)]
+        try:
+            buf = self._buffers[_addr(buf)]
+        except KeyError:
+            return mmal.MMAL_EINVAL
+        return self._send(port, buf)
+
+    def mmal_port_parameter_set(self, port, param):
+        port = self._ports[_addr(port)]
+        addr = _addr(param)
+        hdr = mmal.MMAL_PARAMETER_HEADER_T.from_address(addr)
+        return port.component.set_param(
+            port, hdr.id, ct.string_at(addr, hdr.size))
+
+    def mmal_port_parameter_get(self, port, param):
+        port = self._ports[_addr(port)]
+        addr = _addr(param)
+        hdr = mmal.MMAL_PARAMETER_HEADER_T.from_address(addr)
+        if hdr.size < ct.sizeof(mmal.MMAL_PARAMETER_HEADER_T):
+            return mmal.MMAL_EINVAL
+        return port.component.get_param(port, hdr.id, addr, hdr.size)
+
+    def _get_typed(self, port, key, value, struct, field):
+        mp = struct(mmal.MMAL_PARAMETER_HEADER_T(key, ct.sizeof(struct)))
+        status = self.mmal_port_parameter_get(port, mp.hdr)
+        if status == mmal.MMAL_SUCCESS:
+            result = getattr(mp, field)
+            if isinstance(result, mmal.MMAL_RATIONAL_T):
+                value.num = result.num
+                value.den = result.den or 1
+            else:
+                value.value = getattr(result, 'value', result)
+        return status
+
+    def _set_typed(self, port, key, value, struct, field):
+        mp = struct(mmal.MMAL_PARAMETER_HEADER_T(key, ct.sizeof(struct)))
+        setattr(mp, field, value)
+        return self.mmal_port_parameter_set(port, mp.hdr)
+
+    def mmal_port_parameter_get_rational(self, port, key, value):
+        return self._get_typed(
+            port, key, value, mmal.MMAL_PARAMETER_RATIONAL_T, 'value')
+
+    def mmal_port_parameter_get_boolean(self, port, key, value):
+        return self._get_typed(
+            port, key, value, mmal.MMAL_PARAMETER_BOOLEAN_T, 'enable')
+
+    def mmal_port_parameter_get_int32(self, port, key, value):
+        return self._get_typed(
+            port, key, value, mmal.MMAL_PARAMETER_INT32_T, 'value')
+
+    def mmal_port_parameter_get_int64(self, port, key, value):
+        return self._get_typed(
+            port, key, value, mmal.MMAL_PARAMETER_INT64_T, 'value')
+
+    def mmal_port_parameter_get_uint32(self, port, key, value):
+        return self._get_typed(
+            port, key, value, mmal.MMAL_PARAMETER_UINT32_T, 'value')
+
+    def mmal_port_parameter_get_uint64(self, port, key, value):
+        return self._get_typed(
+            port, key, value, mmal.MMAL_PARAMETER_UINT64_T, 'value')
+
+    def mmal_port_parameter_set_rational(self, port, key, value):
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_RATIONAL_T, 'value')
+
+    def mmal_port_parameter_set_boolean(self, port, key, value):
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_BOOLEAN_T, 'enable')
+
+    def mmal_port_parameter_set_int32(self, port, key, value):
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_INT32_T, 'value')
+
+    def mmal_port_parameter_set_int64(self, port, key, value):
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_INT64_T, 'value')
+
+    def mmal_port_parameter_set_uint32(self, port, key, value):
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_UINT32_T, 'value')
+
+    def mmal_port_parameter_set_uint64(self, port, key, value):
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_UINT64_T, 'value')
+
+    def mmal_port_parameter_set_string(self, port, key, value):
+        # The structure holds a pointer to the string, so the string must be
+        # kept alive for as long as the parameter is stored
+        self._ports[_addr(port)].strings[key] = value
+        return self._set_typed(
+            port, key, value, mmal.MMAL_PARAMETER_STRING_T, 'str')
+
+    def mmal_port_pool_create(self, port, num, size):
+        return self._create_pool(num, size, self._ports[_addr(port)]).ptr
+
+    def mmal_port_pool_destroy(self, port, pool):
+        self.mmal_pool_destroy(pool)
+
+    def mmal_pool_create(self, num, size):
+        return self._create_pool(num, size).ptr
+
+    def mmal_pool_destroy(self, pool):
+        pool = self._pools.get(_addr(pool))
+        if pool is not None:
+            self._destroy_pool(pool)
+
+    def mmal_pool_resize(self, pool, num, size):
+        pool = self._pools[_addr(pool)]
+        if len(pool.queue) != len(pool.buffers):
+            # Buffers are still in use
+            return mmal.MMAL_EINVAL
+        for buf in pool.buffers:
+            self._buffers.pop(buf.address, None)
+        pool.resize(num, size)
+        for buf in pool.buffers:
+            self._buffers[buf.address] = buf
+        return mmal.MMAL_SUCCESS
+
+    def mmal_pool_callback_set(self, pool, callback, userdata):
+        self._pools[_addr(pool)].callback = callback or None
+
+    def mmal_queue_create(self):
+        queue = _SimQueue()
+        self._queues[queue.address] = queue
+        return queue.ptr
+
+    def mmal_queue_destroy(self, queue):
+        self._queues.pop(_addr(queue), None)
+
+    def mmal_queue_length(self, queue):
+        return len(self._queues[_addr(queue)])
+
+    def _queue_get(self, queue, timeout):
+        buf = self._queues[_addr(queue)].get(timeout)
+        if buf is None:
+            return ct.POINTER(mmal.MMAL_BUFFER_HEADER_T)()
+        return buf.ptr
+
+    def mmal_queue_get(self, queue):
+        return self._queue_get(queue, 0)
+
+    def mmal_queue_wait(self, queue):
+        return self._queue_get(queue, None)
+
+    def mmal_queue_timedwait(self, queue, timeout):
+        return self._queue_get(queue, timeout / 1000)
+
+    def mmal_queue_put(self, queue, buf):
+        self._queues[_addr(queue)].put(self._buffers[_addr(buf)])
+
+    def mmal_queue_put_back(self, queue, buf):
+        self._queues[_addr(queue)].put_back(self._buffers[_addr(buf)])
+
+    def mmal_buffer_header_acquire(self, buf):
+        buf = self._buffers[_addr(buf)]
+        with self._lock:
+            buf.refs += 1
+
+    def mmal_buffer_header_release(self, buf):
+        buf = self._buffers.get(_addr(buf))
+        if buf is not None:
+            self._release(buf)
+
+    def mmal_buffer_header_reset(self, buf):
+        self._buffers[_addr(buf)].reset()
+
+    def mmal_buffer_header_replicate(self, dest, source):
+        dest = self._buffers[_addr(dest)]
+        source = self._buffers[_addr(source)]
+        with self._lock:
+            source.refs += 1
+        dest.reference = source
+        d, s = dest.header, source.header
+        d.cmd = s.cmd
+        d.data = s.data
+        d.alloc_size = s.alloc_size
+        d.length = s.length
+        d.offset = s.offset
+        d.flags = s.flags
+        d.pts = s.pts
+        d.dts = s.dts
+        dest.type.video = source.type.video
+        dest.frame = source.frame
+        return mmal.MMAL_SUCCESS
+
+    def mmal_buffer_header_mem_lock(self, buf):
+        return mmal.MMAL_SUCCESS
+
+    def mmal_buffer_header_mem_unlock(self, buf):
+        pass
+
+    def mmal_format_copy(self, dest, source):
+        self._copy_format(_deref(dest), _deref(source))
+
+    def mmal_format_full_copy(self, dest, source):
+        self._copy_format(_deref(dest), _deref(source))
+        return mmal.MMAL_SUCCESS
+
+    def mmal_event_format_changed_get(self, buf):
+        h = self._buffers[_addr(buf)].header
+        if (
+                h.cmd != mmal.MMAL_EVENT_FORMAT_CHANGED or
+                h.length < ct.sizeof(mmal.MMAL_EVENT_FORMAT_CHANGED_T)):
+            return ct.POINTER(mmal.MMAL_EVENT_FORMAT_CHANGED_T)()
+        return ct.cast(h.data, ct.POINTER(mmal.MMAL_EVENT_FORMAT_CHANGED_T))
+
+    def mmal_connection_create(self, connection, output, input, flags):
+        output = self._ports[_addr(output)]
+        input = self._ports[_addr(input)]
+        if (
+                output.struct.type != mmal.MMAL_PORT_TYPE_OUTPUT or
+                input.struct.type != mmal.MMAL_PORT_TYPE_INPUT or
+                output.connection is not None or
+                input.connection is not None):
+            return mmal.MMAL_EINVAL
+        result = _SimConnection(self, output, input, flags)
+        self._connections[result.address] = result
+        self._queues[result.queue.address] = result.queue
+        connection.contents = result.struct
+        return mmal.MMAL_SUCCESS
+
+    def mmal_connection_destroy(self, connection):
+        result = self._connections.pop(_addr(connection), None)
+        if result is not None:
+            result.destroy()
+            self._queues.pop(result.queue.address, None)
+        return mmal.MMAL_SUCCESS
+
+    def mmal_connection_enable(self, connection):
+        return self._connections[_addr(connection)].enable()
+
+    def mmal_connection_disable(self, connection):
+        return self._connections[_addr(connection)].disable()
+
+    def mmal_util_get_core_port_stats(self, port, dir, reset, stats):
+        port = self._ports[_addr(port)]
+        stats = _deref(stats)
+        # Only transmitted frames are counted; buffer times aren't simulated
+        stats.buffer_count = port.frames if dir == mmal.MMAL_CORE_STATS_TX else 0
+        stats.first_buffer_time = stats.last_buffer_time = stats.max_delay = 0
+        if reset and dir == mmal.MMAL_CORE_STATS_TX:
+            port.frames = 0
+        return mmal.MMAL_SUCCESS
+
+    # libbcm_host #############################################################
+
+    def bcm_host_init(self):
+        pass
+
+    def graphics_get_display_size(self, display, width, height):
+        # There is no display attached
+        return -1
+
+
+_installed = None
+
+
+def install(simulator=None, **kwargs):
+    """
+    Replace ``libmmal`` and ``libbcm_host`` with *simulator*, an instance of
+    :class:`MMALSimulator`. If *simulator* is omitted, one is constructed with
+    the specified keyword arguments. Returns the installed simulator::
+
+        from picamera import PiCamera, mmalsim
+
+        mmalsim.install(speed=2)
+        with PiCamera(resolution=(1280, 720)) as camera:
+            camera.start_recording('test.h264')
+            camera.wait_recording(5)
+            camera.stop_recording()
+
+    This must be called before any cameras are opened (objects created with
+    one backend cannot be used with another).
+    """
+    global _installed
+    if simulator is None:
+        simulator = MMALSimulator(**kwargs)
+    mmal._lib.use(simulator)
+    bcm_host._lib.use(simulator)
+    _installed = simulator
+    return simulator
+
+
+def uninstall():
+    """
+    Revert to the real ``libmmal`` and ``libbcm_host`` libraries after
+    :func:`install` was called.
+    """
+    global _installed
+    mmal._lib.use(None)
+    bcm_host._lib.use(None)
+    _installed = None
+
+
+def installed():
+    """
+    Return the :class:`MMALSimulator` installed by :func:`install`, or
+    ``None`` if the real libraries are in use.
+    """
+    return _installed
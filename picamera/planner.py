@@ -0,0 +1,342 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+from collections import namedtuple
+
+from .exc import PiCameraValueError
+from .mmalobj import to_resolution
+from .streams import TeeIO
+
+
+class PiPlannedRecording(namedtuple('PiPlannedRecording', (
+    'splitter_port',
+    'format',
+    'resize',
+    'options',
+    'outputs',
+    ))):
+    """
+    This class is a :func:`~collections.namedtuple` derivative describing
+    a single encoder in a :class:`PiRecordingPlan`.
+
+    .. attribute:: splitter_port
+
+        The splitter port that the encoder will be attached to.
+
+    .. attribute:: format
+
+        The format of the recording, e.g. ``'h264'`` or ``'yuv'``.
+
+    .. attribute:: resize
+
+        The resolution the recording will be resized to, or ``None`` if the
+        recording is at the camera's resolution and needs no resizer.
+
+    .. attribute:: options
+
+        A :class:`dict` of the additional options that will be passed to
+        :meth:`~PiCamera.start_recording`.
+
+    .. attribute:: outputs
+
+        A tuple of the outputs that the encoder will write to. When this
+        contains more than one output, the encoder's output is duplicated to
+        all of them with a :class:`~picamera.TeeIO`.
+
+    .. versionadded:: 1.14
+    """
+
+    __slots__ = () # workaround python issue #24931
+
+
+class PiRecordingPlan(object):
+    """
+    Plans a set of simultaneous recordings at different resolutions and in
+    different formats, allocating splitter ports and estimating the load the
+    recordings will place upon the camera's firmware.
+
+    The *camera* parameter is the :class:`PiCamera` instance to record from,
+    and *recordings* is a sequence of :class:`dict` instances, each of which
+    contains the keyword arguments that would be passed to
+    :meth:`~PiCamera.start_recording` for that recording. For example::
+
+        import picamera
+
+        with picamera.PiCamera(resolution='1080p', framerate=30) as camera:
+            plan = picamera.PiRecordingPlan(camera, [
+                dict(output='archive.h264', bitrate=10000000),
+                dict(output='live.mjpeg', resize='VGA'),
+                dict(output=analysis, format='yuv', resize=(320, 240)),
+                ])
+            print(plan.report())
+            with plan:
+                plan.wait(60)
+
+    Recordings may specify *splitter_port* to pin themselves to a particular
+    port (for instance when the output is a :class:`PiCameraCircularIO`
+    which must know the port it is recording from). All other recordings are
+    allocated ports from *ports* in order (splitter port 0 comes last by
+    default as it is the port used by :meth:`~PiCamera.capture` when
+    *use_video_port* is ``True``). Ports in use by recordings already in
+    progress are skipped. If there are not enough free ports,
+    :exc:`PiCameraValueError` is raised.
+
+    The plan minimizes the number of components required in the following
+    ways:
+
+    * A *resize* equal to the camera's :attr:`~PiCamera.resolution` is
+      removed, so the recording's encoder is connected directly to the
+      splitter without a resizer.
+
+    * Recordings with the same format, resolution, and options (other than
+      *motion_output*, which cannot be shared) share a single encoder and
+      splitter port, with the encoder's output duplicated to all their
+      outputs by a :class:`~picamera.TeeIO`.
+
+    The resulting encoders are available from :attr:`recordings`, and the
+    estimated load from :attr:`load`. Call :meth:`start` to start all the
+    recordings, and :meth:`stop` to stop them (the plan can also be used as a
+    context manager which does both).
+
+    .. versionadded:: 1.14
+    """
+
+    #: The approximate number of 16x16 macroblocks per second that each
+    #: firmware component can sustain. The H.264 figure is the level 4 limit
+    #: (1080p at 30fps) which is the most the VideoCore IV encoder manages.
+    #: The JPEG block isn't bound by the H.264 encoder's 1920 pixel width
+    #: limit, and records the V1 module's full resolution mode (2592x1944 at
+    #: 15fps, 162x122 macroblocks); its figure is that mode's rate. The
+    #: resizer figure is similarly conservative.
+    BUDGETS = {
+        'h264':    245760,
+        'mjpeg':   296460,
+        'resizer': 489600,
+        }
+
+    def __init__(self, camera, recordings, ports=(1, 2, 3, 0)):
+        self.camera = camera
+        self._tees = []
+        self._started = []
+        resolution = to_resolution(camera.resolution)
+        framerate = camera.framerate
+        if not framerate:
+            # When a framerate range is in use, plan for its upper limit
+            framerate = camera.framerate_range.high
+        self._resolution = resolution
+        self._framerate = float(framerate)
+        busy = set(camera._encoders)
+        planned = []
+        for recording in recordings:
+            options = dict(recording)
+            try:
+                output = options.pop('output')
+            except KeyError:
+                raise PiCameraValueError(
+                    'Recording %r has no output' % recording)
+            format = camera._get_video_format(output, options.pop('format', None))
+            resize = options.pop('resize', None)
+            if resize is not None:
+                resize = to_resolution(resize)
+                if resize == resolution:
+                    resize = None
+            port = options.pop('splitter_port', None)
+            for entry in planned:
+                if (
+                        entry['format'] == format and
+                        entry['resize'] == resize and
+                        entry['options'] == options and
+                        'motion_output' not in options and
+                        port in (None, entry['splitter_port'])):
+                    entry['outputs'].append(output)
+                    if port is not None:
+                        entry['splitter_port'] = port
+                    break
+            else:
+                planned.append({
+                    'splitter_port': port,
+                    'format': format,
+                    'resize': resize,
+                    'options': options,
+                    'outputs': [output],
+                    })
+        if not planned:
+            raise PiCameraValueError('No recordings specified')
+        pinned = [entry['splitter_port'] for entry in planned]
+        for port in pinned:
+            if port is None:
+                continue
+            if port in busy:
+                raise PiCameraValueError(
+                    'Splitter port %d is already in use' % port)
+            if pinned.count(port) > 1:
+                raise PiCameraValueError(
+                    'Splitter port %d requested by several recordings' % port)
+        free = [
+            port for port in ports
+            if port not in busy and port not in pinned
+            ]
+        for entry in planned:
+            if entry['splitter_port'] is None:
+                try:
+                    entry['splitter_port'] = free.pop(0)
+                except IndexError:
+                    raise PiCameraValueError(
+                        'Not enough free splitter ports for %d recordings' %
+                        len(planned))
+        self._recordings = tuple(
+            PiPlannedRecording(
+                entry['splitter_port'], entry['format'], entry['resize'],
+                entry['options'], tuple(entry['outputs']))
+            for entry in planned
+            )
+        self._load = self._calc_load()
+
+    def _calc_load(self):
+        load = {key: 0.0 for key in self.BUDGETS}
+        for recording in self._recordings:
+            width, height = recording.resize or self._resolution
+            rate = (
+                ((width + 15) // 16) * ((height + 15) // 16) * self._framerate)
+            if recording.format in load:
+                load[recording.format] += rate / self.BUDGETS[recording.format]
+            if recording.resize:
+                load['resizer'] += rate / self.BUDGETS['resizer']
+        return load
+
+    @property
+    def recordings(self):
+        """
+        A tuple of :class:`PiPlannedRecording` instances describing the
+        encoders the plan will construct, in the order they will be started.
+        """
+        return self._recordings
+
+    @property
+    def load(self):
+        """
+        A :class:`dict` mapping ``'h264'``, ``'mjpeg'``, and ``'resizer'``
+        to the estimated fraction of that component's capacity (see
+        :attr:`BUDGETS`) that the plan requires. Values greater than 1.0
+        indicate the firmware is unlikely to keep up with the camera's
+        framerate.
+        """
+        return self._load.copy()
+
+    @property
+    def overloaded(self):
+        """
+        Returns ``True`` if any value in :attr:`load` exceeds 1.0.
+        """
+        return any(value > 1.0 for value in self._load.values())
+
+    def report(self):
+        """
+        Returns a string describing the planned encoders and the estimated
+        load, suitable for printing.
+        """
+        lines = [
+            'Camera: %dx%d @ %gfps' % (
+                self._resolution.width, self._resolution.height,
+                self._framerate)
+            ]
+        for recording in self._recordings:
+            width, height = recording.resize or self._resolution
+            lines.append('Port %d: %s %dx%d%s -> %d output(s)' % (
+                recording.splitter_port, recording.format, width, height,
+                ' (resized)' if recording.resize else '',
+                len(recording.outputs)))
+        for key in sorted(self._load):
+            lines.append('Load %s: %.0f%%' % (key, self._load[key] * 100))
+        return '\n'.join(lines)
+
+    def start(self):
+        """
+        Start all the planned recordings. If any recording fails to start,
+        those already started are stopped before the exception is re-raised.
+        """
+        try:
+            for recording in self._recordings:
+                if len(recording.outputs) > 1:
+                    output = TeeIO(recording.outputs)
+                    self._tees.append(output)
+                else:
+                    output = recording.outputs[0]
+                self.camera.start_recording(
+                    output, recording.format, recording.resize,
+                    recording.splitter_port, **recording.options)
+                self._started.append(recording.splitter_port)
+        except:
+            self.stop()
+            raise
+
+    def wait(self, timeout=0):
+        """
+        Wait on all the planned recordings for *timeout* seconds (see
+        :meth:`~PiCamera.wait_recording`), raising any exception that has
+        occurred in any of them.
+        """
+        self.camera.wait_recording(timeout, self._recordings[0].splitter_port)
+        for recording in self._recordings[1:]:
+            self.camera.wait_recording(0, recording.splitter_port)
+
+    def stop(self):
+        """
+        Stop all the planned recordings that were started, and close any
+        :class:`~picamera.TeeIO` instances created for shared encoders.
+        """
+        # Stop everything even if one recording fails to stop, then re-raise
+        # the first error
+        error = None
+        while self._started:
+            try:
+                self.camera.stop_recording(self._started.pop())
+            except Exception as e:
+                error = error or e
+        while self._tees:
+            self._tees.pop().close()
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.stop()
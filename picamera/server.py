@@ -0,0 +1,385 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import asyncio
+from collections import deque
+
+from .exc import PiCameraValueError
+from .h264 import H264NALType, nal_offsets
+
+
+class StreamingClient(object):
+    """
+    Represents a single client connected to a :class:`StreamingServer`.
+
+    Each client has its own bounded queue of pending data (frames for MJPEG
+    clients, encoder buffers for H.264 clients). Users should never need to
+    construct this class directly, but instances are available from
+    :attr:`StreamingServer.clients` for monitoring purposes.
+
+    .. attribute:: address
+
+        The peer address of the client's connection.
+
+    .. attribute:: kind
+
+        Either ``'mjpeg'`` or ``'h264'``.
+
+    .. attribute:: sent
+
+        The number of bytes of stream data queued for sending to the client.
+
+    .. attribute:: dropped
+
+        The number of frames (for MJPEG clients) or buffers (for H.264
+        clients) discarded because the client could not keep up.
+    """
+    __slots__ = (
+        'address', 'kind', 'sent', 'dropped', 'queue', 'limit', 'event',
+        'closed', 'resync')
+
+    def __init__(self, address, kind, limit):
+        self.address = address
+        self.kind = kind
+        self.sent = 0
+        self.dropped = 0
+        self.queue = deque()
+        self.limit = limit
+        self.event = asyncio.Event()
+        self.closed = False
+        self.resync = False
+
+    def __repr__(self):
+        return '<StreamingClient %s %r sent=%d dropped=%d>' % (
+            self.kind, self.address, self.sent, self.dropped)
+
+    def put(self, data):
+        """
+        Append *data* to the queue, discarding the oldest item if the queue is
+        full (latest-frame-wins).
+        """
+        if len(self.queue) >= self.limit:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(data)
+        self.event.set()
+
+    def close(self):
+        """
+        Mark the client as closed, and wake its handler so it terminates.
+        """
+        self.closed = True
+        self.event.set()
+
+
+class _LoopWriter(object):
+    """
+    A minimal file-like object which forwards writes from any thread to
+    *callback* in the event loop *loop*. This is attached as a sink to an
+    :class:`~picamera.h264.H264TeeIO`.
+    """
+    __slots__ = ('_loop', '_callback')
+
+    def __init__(self, loop, callback):
+        self._loop = loop
+        self._callback = callback
+
+    def write(self, b):
+        self._loop.call_soon_threadsafe(self._callback, b)
+        return len(b)
+
+    def flush(self):
+        pass
+
+
+class StreamingServer(object):
+    """
+    An :mod:`asyncio` based HTTP server which streams live camera output to
+    many clients.
+
+    The *mjpeg* parameter is an optional :class:`~picamera.PiCameraMJPEGIO`
+    instance which an MJPEG recording is being written to; its frames are
+    served as a ``multipart/x-mixed-replace`` stream (suitable for an ``<img>``
+    tag in a web browser) on *mjpeg_path*. The *h264* parameter is an optional
+    :class:`~picamera.h264.H264TeeIO` instance which an H.264 recording is
+    being written to; its data is served as a raw H.264 stream on *h264_path*.
+    For example::
+
+        import asyncio
+        import picamera
+        from picamera.h264 import H264TeeIO
+        from picamera.server import StreamingServer
+
+        with picamera.PiCamera() as camera:
+            mjpeg = picamera.PiCameraMJPEGIO(camera, splitter_port=1)
+            h264 = H264TeeIO()
+            camera.start_recording(mjpeg, format='mjpeg', splitter_port=1)
+            camera.start_recording(h264, format='h264', splitter_port=2)
+            server = StreamingServer(mjpeg=mjpeg, h264=h264)
+            asyncio.get_event_loop().run_until_complete(
+                server.serve_forever(port=8000))
+
+    All clients are served by a single thread running the event loop. Each
+    client has a bounded queue; MJPEG clients queue up to *mjpeg_queue* frames
+    and when a client falls behind the oldest queued frame is discarded so the
+    client always receives the latest frames. H.264 clients queue up to
+    *h264_queue* encoder buffers; a client which overflows its queue has it
+    cleared and resumes at the next IDR frame (preceded by the cached SPS and
+    PPS headers) so its decoder can recover. H.264 clients joining mid-stream
+    are primed by :class:`~picamera.h264.H264TeeIO` so they can begin decoding
+    immediately.
+
+    Pending data for a client is sent with a single
+    :meth:`~asyncio.StreamWriter.writelines` call (which the transport can
+    turn into a single vectored send) rather than one write per frame or
+    buffer.
+
+    .. note::
+
+        This module requires Python 3.5 or later and is not imported by the
+        main :mod:`picamera` namespace; import :mod:`picamera.server`
+        explicitly.
+
+    .. versionadded:: 1.14
+    """
+    def __init__(
+            self, mjpeg=None, h264=None, mjpeg_queue=2, h264_queue=256,
+            mjpeg_path='/stream.mjpg', h264_path='/stream.h264',
+            boundary='FRAME'):
+        if mjpeg is None and h264 is None:
+            raise PiCameraValueError('You must specify mjpeg, or h264, or both')
+        if mjpeg_queue < 1 or h264_queue < 1:
+            raise PiCameraValueError('Queue sizes must be positive integers')
+        self._mjpeg = mjpeg
+        self._h264 = h264
+        self._mjpeg_queue = mjpeg_queue
+        self._h264_queue = h264_queue
+        self._mjpeg_path = mjpeg_path
+        self._h264_path = h264_path
+        self._boundary = boundary.encode('ascii')
+        self._loop = None
+        self._server = None
+        self._dispatcher = None
+        self._closed = None
+        self._clients = set()
+
+    @property
+    def clients(self):
+        """
+        A tuple of the :class:`StreamingClient` instances currently connected.
+        """
+        return tuple(self._clients)
+
+    @property
+    def sockets(self):
+        """
+        The listening sockets of the server (useful for determining the port
+        when the server was started with port ``0``).
+        """
+        return self._server.sockets if self._server is not None else ()
+
+    async def start(self, host=None, port=8000):
+        """
+        Start listening for connections on *host* and *port*. Returns once the
+        server is listening.
+        """
+        self._loop = asyncio.get_event_loop()
+        self._closed = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        if self._mjpeg is not None:
+            self._dispatcher = asyncio.ensure_future(self._dispatch_mjpeg())
+
+    async def serve_forever(self, host=None, port=8000):
+        """
+        Start the server on *host* and *port* and serve clients until
+        :meth:`close` is called.
+        """
+        await self.start(host, port)
+        await self._closed.wait()
+
+    def close(self):
+        """
+        Stop listening for connections and disconnect all clients.
+        """
+        if self._server is not None:
+            self._server.close()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for client in self._clients:
+            client.close()
+        if self._closed is not None:
+            self._closed.set()
+
+    async def _dispatch_mjpeg(self):
+        seq = self._mjpeg.seq
+        while True:
+            seq, frame = await self._loop.run_in_executor(
+                None, self._mjpeg.wait_frame, seq, 0.5)
+            if frame is None:
+                if self._mjpeg.closed:
+                    break
+            else:
+                for client in self._clients:
+                    if client.kind == 'mjpeg':
+                        client.put(frame)
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 10)
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 10)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            request = request.decode('latin-1').split()
+            path = request[1].split('?', 1)[0] if len(request) > 1 else ''
+            if not request or request[0] != 'GET':
+                self._send_error(writer, 405, 'Method Not Allowed')
+            elif self._mjpeg is not None and path == self._mjpeg_path:
+                await self._serve_mjpeg(writer)
+            elif self._h264 is not None and path == self._h264_path:
+                await self._serve_h264(writer)
+            else:
+                self._send_error(writer, 404, 'Not Found')
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    def _send_error(self, writer, code, reason):
+        writer.write(
+            b'HTTP/1.0 %d %s\r\n'
+            b'Content-Length: 0\r\n'
+            b'Connection: close\r\n'
+            b'\r\n' % (code, reason.encode('ascii')))
+
+    def _send_headers(self, writer, content_type):
+        writer.write(
+            b'HTTP/1.0 200 OK\r\n'
+            b'Age: 0\r\n'
+            b'Cache-Control: no-cache, private\r\n'
+            b'Pragma: no-cache\r\n'
+            b'Connection: close\r\n'
+            b'Content-Type: %s\r\n'
+            b'\r\n' % content_type.encode('ascii'))
+
+    async def _serve(self, writer, client, render):
+        self._clients.add(client)
+        try:
+            while not client.closed:
+                await client.event.wait()
+                client.event.clear()
+                parts = []
+                while client.queue:
+                    parts.extend(render(client.queue.popleft()))
+                if parts:
+                    writer.writelines(parts)
+                    await writer.drain()
+        finally:
+            self._clients.discard(client)
+
+    async def _serve_mjpeg(self, writer):
+        client = StreamingClient(
+            writer.get_extra_info('peername'), 'mjpeg', self._mjpeg_queue)
+        boundary = self._boundary
+        def render(frame):
+            client.sent += len(frame)
+            return (
+                b'--%s\r\n'
+                b'Content-Type: image/jpeg\r\n'
+                b'Content-Length: %d\r\n'
+                b'\r\n' % (boundary, len(frame)),
+                frame,
+                b'\r\n',
+                )
+        self._send_headers(
+            writer, 'multipart/x-mixed-replace; boundary=%s' %
+            boundary.decode('ascii'))
+        if self._mjpeg.frame is not None:
+            client.put(self._mjpeg.frame)
+        await self._serve(writer, client, render)
+
+    async def _serve_h264(self, writer):
+        client = StreamingClient(
+            writer.get_extra_info('peername'), 'h264', self._h264_queue)
+        h264 = self._h264
+        # The last few bytes written, enough to hold a start code and NAL
+        # header split across writes
+        tail = b''
+        def feed(b):
+            nonlocal tail
+            if len(client.queue) >= client.limit:
+                # The client has fallen behind; discard its queue and restart
+                # it from the next IDR frame so its decoder can recover
+                client.dropped += len(client.queue)
+                client.queue.clear()
+                client.resync = True
+            if client.resync:
+                # Everything in tail was dropped, so a start code which began
+                # there can be sent along with the rest of the IDR frame
+                data = tail + bytes(b)
+                tail = data[-4:]
+                for offset, nal_type in nal_offsets(data):
+                    if nal_type == H264NALType.idr:
+                        b = b''.join(
+                            (h264.sps or b'', h264.pps or b'', data[offset:]))
+                        client.resync = False
+                        break
+                else:
+                    client.dropped += 1
+                    return
+            else:
+                tail = (tail + bytes(b[-4:]))[-4:]
+            client.queue.append(b)
+            client.event.set()
+        def render(b):
+            client.sent += len(b)
+            return (b,)
+        self._send_headers(writer, 'video/h264')
+        sink = h264.add_sink(_LoopWriter(self._loop, feed))
+        try:
+            await self._serve(writer, client, render)
+        finally:
+            try:
+                h264.remove_sink(sink)
+            except PiCameraValueError:
+                # The tee was closed (removing all its sinks) before the
+                # client disconnected
+                pass
@@ -39,7 +39,8 @@ str = type('')
 
 
 import io
-from threading import RLock
+from time import time
+from threading import RLock, Condition, Thread
 from collections import deque
 from operator import attrgetter
 from weakref import ref
@@ -831,3 +832,526 @@ class PiCameraCircularIO(CircularIO):
         finally:
             if opened:
                 output.close()
+
+
+class TeeSink(object):
+    """
+    A single destination attached to a :class:`TeeIO` stream.
+
+    Instances of this class are returned by :meth:`TeeIO.add_sink`; users
+    should not normally need to construct them directly. The *output* parameter
+    is the filename or file-like object that data will be written to.
+
+    If *queue_size* is ``0`` (the default), writes are passed straight through
+    to *output* in the thread that called :meth:`TeeIO.write`. This is required
+    for outputs like :class:`PiCameraCircularIO` which query the camera for
+    frame meta-data as they are written to, but means a slow *output* will
+    delay every other sink attached to the tee.
+
+    If *queue_size* is greater than ``0``, writes are queued (up to
+    *queue_size* writes) and a background thread copies them to *output*. The
+    *drop* parameter determines what happens when the queue is full:
+
+    * ``'oldest'`` – the oldest queued write is discarded to make room for the
+      new one (the default)
+
+    * ``'newest'`` – the new write is discarded
+
+    * ``'block'`` – the caller waits for room in the queue (note that this
+      permits a stalled sink to delay the other sinks of the tee)
+
+    If writing to *output* raises an exception, the exception is stored in
+    :attr:`error` and all subsequent writes to the sink are discarded; other
+    sinks attached to the same tee are unaffected.
+
+    .. versionadded:: 1.14
+    """
+    def __init__(self, output, queue_size=0, drop='oldest'):
+        if queue_size < 0:
+            raise PiCameraValueError('queue_size must be zero or positive')
+        if drop not in ('oldest', 'newest', 'block'):
+            raise PiCameraValueError('Invalid drop policy: %s' % drop)
+        if isinstance(output, bytes):
+            output = output.decode('utf-8')
+        self._opened = isinstance(output, str)
+        if self._opened:
+            output = io.open(output, 'wb')
+        self._output = output
+        self._queue_size = queue_size
+        self._drop = drop
+        self._queue = deque()
+        self._pending = 0
+        self._cond = Condition()
+        self._closed = False
+        self._error = None
+        self._written = 0
+        self._dropped = 0
+        self._thread = None
+        if queue_size:
+            self._thread = Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    @property
+    def output(self):
+        """
+        The file-like object that the sink writes to.
+        """
+        return self._output
+
+    @property
+    def queue_size(self):
+        """
+        The maximum number of writes that will be queued for the sink, or ``0``
+        if writes are passed straight through.
+        """
+        return self._queue_size
+
+    @property
+    def drop(self):
+        """
+        The policy applied when the sink's queue is full.
+        """
+        return self._drop
+
+    @property
+    def error(self):
+        """
+        The exception raised by the sink's output, or ``None`` if no error
+        has occurred.
+        """
+        return self._error
+
+    @property
+    def written(self):
+        """
+        The number of bytes successfully written to the sink's output.
+        """
+        return self._written
+
+    @property
+    def dropped(self):
+        """
+        The number of writes discarded by the sink, either because of the
+        *drop* policy or because the output previously failed.
+        """
+        return self._dropped
+
+    @property
+    def closed(self):
+        """
+        Returns ``True`` if the sink has been closed.
+        """
+        return self._closed
+
+    def _write_output(self, b):
+        try:
+            self._output.write(b)
+        except Exception as e:
+            self._error = e
+        else:
+            self._written += len(b)
+
+    def _flush_output(self):
+        try:
+            self._output.flush()
+        except AttributeError:
+            pass
+        except Exception as e:
+            self._error = e
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                b = self._queue.popleft()
+                self._cond.notify_all()
+            if b is None:
+                if self._error is None:
+                    self._flush_output()
+            elif self._error is not None:
+                self._dropped += 1
+            else:
+                self._write_output(b)
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def write(self, b):
+        """
+        Write *b* to the sink's output, or queue it for writing if the sink
+        has a queue.
+        """
+        if self._closed or self._error is not None:
+            self._dropped += 1
+        elif not self._queue_size:
+            self._write_output(b)
+        else:
+            if not isinstance(b, bytes):
+                b = bytes(b)
+            with self._cond:
+                if len(self._queue) >= self._queue_size:
+                    if self._drop == 'newest':
+                        self._dropped += 1
+                        return
+                    elif self._drop == 'oldest':
+                        self._queue.popleft()
+                        self._pending -= 1
+                        self._dropped += 1
+                    else:
+                        while (
+                                len(self._queue) >= self._queue_size and
+                                not self._closed and self._error is None):
+                            self._cond.wait()
+                        if self._closed:
+                            self._dropped += 1
+                            return
+                self._queue.append(b)
+                self._pending += 1
+                self._cond.notify_all()
+
+    def flush(self):
+        """
+        Flush the sink's output. If the sink has a queue, the flush is queued
+        behind any pending writes and this method returns immediately; use
+        :meth:`drain` to wait for queued writes to complete.
+        """
+        if self._closed or self._error is not None:
+            pass
+        elif not self._queue_size:
+            self._flush_output()
+        else:
+            with self._cond:
+                self._queue.append(None)
+                self._pending += 1
+                self._cond.notify_all()
+
+    def drain(self, timeout=None):
+        """
+        Wait up to *timeout* seconds (or indefinitely if *timeout* is ``None``)
+        for all queued writes to be written to the sink's output. Returns
+        ``True`` if the queue was emptied, and ``False`` otherwise.
+        """
+        if timeout is not None:
+            deadline = time() + timeout
+        with self._cond:
+            while self._pending and self._thread is not None:
+                if timeout is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return not self._pending
+
+    def close(self):
+        """
+        Close the sink. Any queued writes are written to the output before this
+        method returns. If the sink opened its output (because a filename was
+        specified), the output is closed too.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._opened:
+            self._output.close()
+        elif self._error is None:
+            self._flush_output()
+
+
+class TeeIO(io.IOBase):
+    """
+    A write-only stream which duplicates everything written to it to several
+    independent outputs (or "sinks").
+
+    This permits a single encoder (and thus a single splitter port) to feed,
+    for example, a file on disk, a :class:`PiCameraCircularIO` and a network
+    socket simultaneously, instead of encoding the same video several times.
+    For example::
+
+        import picamera
+
+        with picamera.PiCamera() as camera:
+            ring = picamera.PiCameraCircularIO(camera, seconds=20)
+            tee = picamera.TeeIO([ring, 'recording.h264'])
+            camera.start_recording(tee, format='h264')
+            viewer = tee.add_sink(sock.makefile('wb'), queue_size=30)
+            camera.wait_recording(60)
+            tee.remove_sink(viewer)
+            camera.stop_recording()
+            tee.close()
+
+    The *outputs* parameter is an optional iterable of filenames or file-like
+    objects which are attached as sinks on construction, using the
+    *queue_size* and *drop* parameters given (see :class:`TeeSink` for a
+    description of these). Further sinks can be attached or detached at any
+    time with :meth:`add_sink` and :meth:`remove_sink`, including while
+    recording is in progress.
+
+    Each sink has its own buffering and drop policy; an exception raised by one
+    sink's output is recorded against that sink (see :attr:`TeeSink.error`)
+    and does not prevent the others from receiving data.
+
+    .. versionadded:: 1.14
+    """
+    def __init__(self, outputs=(), queue_size=0, drop='oldest'):
+        super(TeeIO, self).__init__()
+        self._lock = RLock()
+        self._sinks = ()
+        for output in outputs:
+            self.add_sink(output, queue_size, drop)
+
+    @property
+    def sinks(self):
+        """
+        A tuple of the :class:`TeeSink` instances currently attached.
+        """
+        return self._sinks
+
+    def add_sink(self, output, queue_size=0, drop='oldest'):
+        """
+        Attach *output* to the tee and return the resulting :class:`TeeSink`.
+        The *queue_size* and *drop* parameters are described in
+        :class:`TeeSink`.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        sink = TeeSink(output, queue_size, drop)
+        with self._lock:
+            self._sinks += (sink,)
+        return sink
+
+    def remove_sink(self, sink):
+        """
+        Detach *sink* (which may be a :class:`TeeSink` or the output it was
+        created with) from the tee, and close it. Raises
+        :exc:`PiCameraValueError` if *sink* is not attached.
+        """
+        with self._lock:
+            for item in self._sinks:
+                if item is sink or item.output is sink:
+                    self._sinks = tuple(s for s in self._sinks if s is not item)
+                    break
+            else:
+                raise PiCameraValueError('%r is not attached to the tee' % sink)
+        item.close()
+
+    def writable(self):
+        """
+        Returns ``True``, indicating that the stream supports :meth:`write`.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        return True
+
+    def write(self, b):
+        """
+        Write *b* to all attached sinks, and return the number of bytes
+        written (always the length of *b*).
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        # Sinks are replaced (never mutated) by add_sink and remove_sink so
+        # the tuple can be iterated without holding the lock
+        for sink in self._sinks:
+            sink.write(b)
+        return len(b)
+
+    def flush(self):
+        """
+        Flush all attached sinks (see :meth:`TeeSink.flush`).
+        """
+        super(TeeIO, self).flush()
+        for sink in self._sinks:
+            sink.flush()
+
+    def close(self):
+        """
+        Close the stream and all attached sinks.
+        """
+        if not self.closed:
+            with self._lock:
+                sinks, self._sinks = self._sinks, ()
+            for sink in sinks:
+                sink.close()
+        super(TeeIO, self).close()
+
+
+class PiCameraMJPEGIO(io.IOBase):
+    """
+    A write-only stream which assembles an MJPEG recording into whole frames,
+    and publishes the latest complete frame to any number of consumers.
+
+    This is intended for serving live MJPEG streams (e.g. to web browsers)
+    where each client should receive the most recent frame available, and
+    slow clients should simply skip frames rather than fall behind or delay
+    other clients. For example::
+
+        import picamera
+
+        with picamera.PiCamera() as camera:
+            output = picamera.PiCameraMJPEGIO(camera)
+            camera.start_recording(output, format='mjpeg')
+            seq = 0
+            while True:
+                seq, frame = output.wait_frame(seq)
+                client.write(frame)
+
+    The *camera* parameter specifies the :class:`PiCamera` instance that will
+    be recording to the stream, and *splitter_port* the port the recording was
+    started on. Frame boundaries are determined from the frame meta-data the
+    camera's encoder derives from each buffer (specifically the end-of-frame
+    flag that the encoder sets on the last buffer of a frame). If *camera* is
+    ``None``, frame boundaries are instead detected by each write ending with
+    a JPEG end-of-image marker; this is less reliable but permits the class
+    to be used with other sources of MJPEG data.
+
+    Frames which arrive in a single write (the common case) are published
+    without copying. Frames split over several writes are assembled in a
+    buffer which is re-used for every frame (and only grows when a frame
+    exceeds its capacity), then copied once into the published frame.
+
+    Each published frame is given an incrementing sequence number. Consumers
+    call :meth:`wait_frame` with the last sequence number they received and
+    are returned the next available frame; the difference between sequence
+    numbers indicates how many frames the consumer skipped.
+
+    .. versionadded:: 1.14
+    """
+    def __init__(self, camera=None, splitter_port=1):
+        super(PiCameraMJPEGIO, self).__init__()
+        if camera is not None:
+            try:
+                camera._encoders
+            except AttributeError:
+                raise PiCameraValueError(
+                    'camera must be a valid PiCamera object')
+        self.camera = camera
+        self.splitter_port = splitter_port
+        self._cond = Condition()
+        self._buf = bytearray()
+        self._len = 0
+        self._seq = 0
+        self._frame = None
+        self._frame_info = None
+
+    def _get_frame(self):
+        """
+        Return frame meta-data from the latest write, or ``None`` if the
+        stream is not associated with a camera.
+        """
+        if self.camera is None:
+            return None
+        return self.camera._encoders[self.splitter_port].frame
+
+    def _append(self, b):
+        size = self._len + len(b)
+        capacity = len(self._buf)
+        if size > capacity:
+            self._buf.extend(bytearray(max(size - capacity, capacity)))
+        self._buf[self._len:size] = b
+        self._len = size
+
+    def writable(self):
+        """
+        Returns ``True``, indicating that the stream supports :meth:`write`.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        return True
+
+    def write(self, b):
+        """
+        Append *b* to the frame under construction, publishing the frame if
+        *b* completes it. Returns the number of bytes written.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on a closed stream')
+        info = self._get_frame()
+        if info is None:
+            complete = b[-2:] == b'\xff\xd9'
+        else:
+            complete = info.complete
+        if not complete:
+            self._append(b)
+        else:
+            if self._len:
+                self._append(b)
+                frame = bytes(memoryview(self._buf)[:self._len])
+                self._len = 0
+            else:
+                frame = bytes(b)
+            with self._cond:
+                self._seq += 1
+                self._frame = frame
+                self._frame_info = info
+                self._cond.notify_all()
+        return len(b)
+
+    @property
+    def seq(self):
+        """
+        The sequence number of the latest complete frame (``0`` if no frames
+        have been published yet).
+        """
+        return self._seq
+
+    @property
+    def frame(self):
+        """
+        The :class:`bytes` of the latest complete frame, or ``None`` if no
+        frames have been published yet.
+        """
+        return self._frame
+
+    @property
+    def frame_info(self):
+        """
+        The :class:`PiVideoFrame` meta-data of the latest complete frame, or
+        ``None`` if no frames have been published yet or the stream is not
+        associated with a camera.
+        """
+        return self._frame_info
+
+    def wait_frame(self, seq=0, timeout=None):
+        """
+        Wait for a frame with a sequence number greater than *seq* and return
+        a tuple of ``(seq, frame)`` where *seq* is the sequence number of the
+        frame, and *frame* is its :class:`bytes`.
+
+        If *timeout* is specified it gives the maximum number of seconds to
+        wait. If *timeout* elapses, or the stream is closed, before a new frame
+        is available the tuple ``(seq, None)`` is returned, where *seq* is the
+        value passed in.
+        """
+        if timeout is not None:
+            deadline = time() + timeout
+        with self._cond:
+            while self._seq <= seq and not self.closed:
+                if timeout is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            if self._seq <= seq:
+                return seq, None
+            return self._seq, self._frame
+
+    def close(self):
+        """
+        Close the stream, waking any consumers blocked in :meth:`wait_frame`.
+        """
+        super(PiCameraMJPEGIO, self).close()
+        with self._cond:
+            self._cond.notify_all()
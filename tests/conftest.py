@@ -38,6 +38,7 @@ from __future__ import (
 str = type('')
 
 import picamera
+import picamera.mmalsim
 import pytest
 import tempfile
 import shutil
@@ -99,3 +100,17 @@ def tempdir(request):
     request.addfinalizer(fin)
     return dirname
 
+
+# The simulator fixtures replace libmmal with picamera.mmalsim for the duration
+# of a test; these can run on machines without a camera module
+@pytest.fixture()
+def sim(request):
+    result = picamera.mmalsim.install(speed=4)
+    request.addfinalizer(picamera.mmalsim.uninstall)
+    return result
+
+@pytest.fixture()
+def sim_camera(request, sim):
+    camera = picamera.PiCamera(resolution=(640, 480))
+    request.addfinalizer(camera.close)
+    return camera
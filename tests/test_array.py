@@ -37,13 +37,22 @@ from __future__ import (
 # Make Py2's str equivalent to Py3's
 str = type('')
 
+import time
+import random
+import threading
+
 import numpy as np
 import picamera
 import picamera.array
 import picamera.bcm_host as bcm_host
 import picamera.mmal as mmal
+import picamera.mmalobj as mo
 import pytest
 import mock
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
 
 
 @pytest.fixture()
@@ -280,6 +289,53 @@ def test_motion_analysis2(camera, mode):
         camera.stop_recording()
         assert stream.write_called
 
+def test_motion_ring1(camera, mode):
+    resolution, framerate = mode
+    if resolution == (2592, 1944):
+        pytest.xfail('Cannot encode video at max resolution')
+    width = ((resolution[0] + 15) // 16) + 1
+    height = (resolution[1] + 15) // 16
+    ring = picamera.array.PiMotionRing(camera, frames=5)
+    camera.start_recording('/dev/null', 'h264', motion_vectors=True)
+    try:
+        camera.add_motion_subscriber(ring)
+        seq, frame, a = ring.wait(timeout=5)
+        assert seq > 0
+        assert a.shape == (height, width)
+        assert frame.frame_type in (
+            picamera.PiVideoFrameType.frame,
+            picamera.PiVideoFrameType.key_frame)
+        camera.remove_motion_subscriber(ring)
+    finally:
+        camera.stop_recording()
+
+def test_motion_ring2(fake_cam):
+    def motion_buffer(value):
+        buf = mock.MagicMock()
+        buf.length = 8
+        buf.offset = 0
+        buf.__enter__.return_value = bytearray(
+            [value, value, value, 0] * 2)
+        return buf
+    ring = picamera.array.PiMotionRing(fake_cam, frames=2)
+    assert len(ring) == 0
+    assert ring.wait(timeout=0) == (0, None, None)
+    frames, a = ring.snapshot()
+    assert frames == [] and a.shape == (0, 1, 2)
+    for i in range(1, 4):
+        ring(i, motion_buffer(i))
+    assert len(ring) == 2
+    seq, frame, a = ring.wait()
+    assert (seq, frame) == (3, 3)
+    assert (a['x'] == 3).all() and (a['sad'] == 3).all()
+    frames, a = ring.snapshot()
+    assert frames == [2, 3]
+    assert (a['y'][0] == 2).all() and (a['y'][1] == 3).all()
+    buf = motion_buffer(0)
+    buf.length = 4
+    with pytest.raises(picamera.PiCameraValueError):
+        ring(4, buf)
+
 def test_overlay_array1(camera, mode):
     resolution, framerate = mode
     # Draw a cross overlay
@@ -368,3 +424,108 @@ def test_array_no_analyze(camera):
 def test_analysis_writable(camera):
     stream = picamera.array.PiRGBAnalysis(camera)
     assert stream.writable()
+
+class InvertTransform(picamera.array.PiArrayTransform):
+    __slots__ = ()
+
+    def transform(self, source, target):
+        with source as source_array, target as target_array:
+            # Vary the time taken so that parallel transforms finish out of
+            # order
+            time.sleep(random.random() * 0.01)
+            np.subtract(0xff, source_array, out=target_array)
+
+def run_transform(transform):
+    frames = []
+    def callback(port, buf):
+        frames.append((buf.pts, buf.data))
+    with mo.MMALCamera() as camera:
+        camera.outputs[0].format = mmal.MMAL_ENCODING_RGB24
+        camera.outputs[0].framesize = (64, 48)
+        camera.outputs[0].commit()
+        try:
+            transform.connect(camera.outputs[0])
+            transform.outputs[0].commit()
+            transform.outputs[0].buffer_count = 4
+            transform.outputs[0].enable(callback)
+            transform.connection.enable()
+            transform.enable()
+            camera.enable()
+            time.sleep(0.3)
+            transform.disable()
+            stats = transform.stats
+            transform.connection.disable()
+            transform.outputs[0].disable()
+        finally:
+            transform.close()
+    assert stats.frames >= len(frames) > 5
+    assert 0 < stats.load <= 1
+    timestamps = [pts for pts, data in frames]
+    assert timestamps == sorted(timestamps)
+    # The simulated camera's frames are never entirely white
+    assert all(data != b'\x00' * len(data) for pts, data in frames)
+
+def test_array_transform(sim):
+    run_transform(InvertTransform(formats='rgb'))
+
+@pytest.mark.skipif(ThreadPoolExecutor is None, reason='no concurrent.futures')
+def test_array_transform_executor(sim):
+    executor = ThreadPoolExecutor(3)
+    try:
+        transform = InvertTransform(formats='rgb', executor=executor, depth=3)
+        assert transform.inputs[0].buffer_count == 2
+        transform.inputs[0].format = mmal.MMAL_ENCODING_RGB24
+        transform.inputs[0].commit()
+        assert transform.inputs[0].buffer_count == 4
+        run_transform(transform)
+    finally:
+        executor.shutdown()
+
+@pytest.mark.skipif(ThreadPoolExecutor is None, reason='no concurrent.futures')
+def test_array_transform_flush_error(sim):
+    started = threading.Event()
+    release = threading.Event()
+    class FailingTransform(picamera.array.PiArrayTransform):
+        __slots__ = ()
+
+        def transform(self, source, target):
+            if not started.is_set():
+                started.set()
+                release.wait()
+                raise ValueError('transform failed')
+
+        def _flush(self):
+            # Fail only once disable() is waiting for the frames in flight
+            release.set()
+            super(FailingTransform, self)._flush()
+
+    executor = ThreadPoolExecutor(2)
+    try:
+        transform = FailingTransform(formats='rgb', executor=executor, depth=50)
+        with mo.MMALCamera() as camera:
+            camera.outputs[0].format = mmal.MMAL_ENCODING_RGB24
+            camera.outputs[0].framesize = (64, 48)
+            camera.outputs[0].commit()
+            try:
+                transform.connect(camera.outputs[0])
+                transform.outputs[0].commit()
+                transform.outputs[0].enable(lambda port, buf: False)
+                transform.connection.enable()
+                transform.enable()
+                camera.enable()
+                assert started.wait(10)
+                transform.connection.disable()
+                with pytest.raises(ValueError):
+                    transform.disable()
+                # The error is reported once, not by the next disable()
+                transform.disable()
+                transform.outputs[0].disable()
+            finally:
+                transform.close()
+    finally:
+        release.set()
+        executor.shutdown()
+
+def test_array_transform_bad_depth(sim):
+    with pytest.raises(picamera.PiCameraValueError):
+        picamera.array.PiArrayTransform(depth=0)
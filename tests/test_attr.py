@@ -39,6 +39,7 @@ str = type('')
 
 import picamera
 from picamera.color import Color
+import mock
 import pytest
 import time
 from fractions import Fraction
@@ -525,6 +526,34 @@ def test_framerate_range(camera, previewing):
     finally:
         camera.framerate = save_framerate
 
+def test_configure(camera, previewing):
+    save_resolution = camera.resolution
+    save_framerate = camera.framerate
+    try:
+        with mock.patch.object(
+                picamera.PiCamera, '_configure_camera', autospec=True,
+                side_effect=picamera.PiCamera._configure_camera) as configure:
+            camera.configure(
+                resolution=(640, 480), framerate=15, clock_mode='raw',
+                framerate_delta=1)
+            assert configure.call_count == 1
+            assert camera.resolution == (640, 480)
+            assert camera.framerate == 15
+            assert camera.clock_mode == 'raw'
+            assert camera.framerate_delta == 1
+            with pytest.raises(picamera.PiCameraError):
+                camera.configure(resolution=(320, 240), framerate=200)
+            with pytest.raises(picamera.PiCameraError):
+                camera.configure(framerate=30, framerate_range=(1, 30))
+            with pytest.raises(picamera.PiCameraError):
+                camera.configure(revision='foo')
+            assert configure.call_count == 1
+            assert camera.resolution == (640, 480)
+    finally:
+        camera.configure(
+            resolution=save_resolution, framerate=save_framerate,
+            clock_mode='reset')
+
 def test_resolution(camera, previewing):
     save_resolution = camera.resolution
     try:
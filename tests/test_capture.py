@@ -266,3 +266,22 @@ def test_capture_continuous_repeat(camera):
         stream.seek(0)
         stream.truncate()
     assert images[0] != images[1]
+
+def test_capture_repeat_pooled(camera, mode, format_options, use_video_port):
+    format, options = format_options
+    resolution, framerate = mode
+    expected_failures(resolution, format, use_video_port)
+    if 'resize' in options:
+        resolution = options['resize']
+    for i in range(3):
+        stream = io.BytesIO()
+        camera.capture(stream, format, use_video_port=use_video_port, **options)
+        assert len(camera._encoder_pool) == 1
+        stream.seek(0)
+        verify_image(stream, format, resolution)
+    # Recording on the same port must evict the idle encoder
+    if use_video_port:
+        camera.start_recording(io.BytesIO(), format='h264', splitter_port=0)
+        assert len(camera._encoder_pool) == 0
+        camera.wait_recording(0.5, splitter_port=0)
+        camera.stop_recording(splitter_port=0)
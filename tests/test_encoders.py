@@ -0,0 +1,456 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import io
+import datetime
+import threading
+import ctypes as ct
+
+import mock
+import pytest
+from picamera import mmal, mmalobj as mo, encoders
+from picamera.exc import PiCameraValueError
+from picamera.encoders import (
+    MMALBufferAlphaStrip,
+    PiBitrateController,
+    PiEncoderPool,
+    PiFrameBufferRing,
+    PiOutputRotation,
+    PiRawFrameAssembler,
+    _ExifCache,
+    )
+
+
+def exif_data(param):
+    return ct.string_at(param, param[0].size)[
+        mmal.MMAL_PARAMETER_EXIF_T.data.offset:].rstrip(b'\x00')
+
+def test_exif_cache_timestamps():
+    cache = _ExifCache()
+    now = datetime.datetime(2017, 1, 2, 3, 4, 5)
+    params = cache.params({}, now)
+    assert [exif_data(p) for p in params] == [
+        b'EXIF.DateTimeDigitized=2017:01:02 03:04:05',
+        b'EXIF.DateTimeOriginal=2017:01:02 03:04:05',
+        b'IFD0.DateTime=2017:01:02 03:04:05',
+        ]
+    params = cache.params({'IFD0.DateTime': 'foo'}, now)
+    assert exif_data(params[2]) == b'IFD0.DateTime=foo'
+
+def test_exif_cache_reuse():
+    cache = _ExifCache()
+    now = datetime.datetime.now()
+    tags = {'IFD0.Make': 'Foo', 'IFD0.Model': 'Bar'}
+    params1 = cache.params(tags, now)
+    params2 = cache.params(tags, now)
+    # Timestamp tags are always rebuilt; static tags are re-used
+    assert all(p1 is not p2 for p1, p2 in zip(params1[:3], params2[:3]))
+    assert all(p1 is p2 for p1, p2 in zip(params1[3:], params2[3:]))
+    tags['IFD0.Make'] = 'Baz'
+    params3 = cache.params(tags, now)
+    assert sorted(exif_data(p) for p in params3[3:]) == [
+        b'IFD0.Make=Baz', b'IFD0.Model=Bar']
+    del tags['IFD0.Model']
+    assert len(cache.params(tags, now)) == 4
+
+def test_exif_cache_binary():
+    cache = _ExifCache()
+    param = cache.compile('EXIF.UserComment', b'foo\x00bar')
+    mp = ct.cast(param, ct.POINTER(mmal.MMAL_PARAMETER_EXIF_T))[0]
+    assert mp.hdr.id == mmal.MMAL_PARAMETER_EXIF
+    assert mp.keylen == len(b'EXIF.UserComment')
+    assert mp.valuelen == len(b'foo\x00bar')
+
+def test_output_rotation_order(tmpdir):
+    names = [str(tmpdir.join('image%02d.jpg' % i)) for i in range(20)]
+    rotation = PiOutputRotation(names)
+    written = []
+    try:
+        while True:
+            stream, opened = rotation.next()
+            assert opened
+            stream.write(b'foo')
+            written.append(stream.name)
+            rotation.retire(stream, opened)
+    except StopIteration:
+        pass
+    rotation.close()
+    assert rotation.exception is None
+    assert written == names
+    for name in names:
+        with io.open(name, 'rb') as f:
+            assert f.read() == b'foo'
+
+def test_output_rotation_close_unused():
+    streams = [mock.Mock() for i in range(4)]
+    rotation = PiOutputRotation(streams)
+    stream, opened = rotation.next()
+    assert stream is streams[0]
+    assert not opened
+    rotation.retire(stream, opened)
+    rotation.close()
+    streams[0].flush.assert_called_once_with()
+    # Only up to depth (2) outputs are opened ahead of time
+    assert not streams[3].flush.called
+
+def test_output_rotation_errors(tmpdir):
+    with pytest.raises(IOError):
+        PiOutputRotation([str(tmpdir.join('missing', 'foo.jpg'))])
+    rotation = PiOutputRotation([
+        str(tmpdir.join('foo.jpg')),
+        str(tmpdir.join('missing', 'foo.jpg')),
+        ])
+    stream, opened = rotation.next()
+    with pytest.raises(IOError):
+        rotation.next()
+    rotation.retire(stream, opened)
+    rotation.close()
+    stream = mock.Mock()
+    stream.flush.side_effect = IOError('boom')
+    rotation = PiOutputRotation([stream])
+    rotation.retire(*rotation.next())
+    with pytest.raises(StopIteration):
+        rotation.next()
+    rotation.close()
+    assert isinstance(rotation.exception, IOError)
+
+def mmal_buffer(data, offset=0, flags=0):
+    mem = ct.create_string_buffer(bytes(data), len(data))
+    buf = mmal.MMAL_BUFFER_HEADER_T()
+    buf.data = ct.cast(mem, ct.POINTER(ct.c_uint8))
+    buf.alloc_size = len(data)
+    buf.offset = offset
+    buf.length = len(data) - offset
+    buf.flags = flags
+    # Keep the memory alive as long as the buffer header
+    buf._mem = mem
+    return ct.pointer(buf)
+
+@pytest.fixture(params=(False, True))
+def alpha_strip(request, sim, monkeypatch):
+    if request.param:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(encoders, 'np', None)
+    return request.param
+
+def test_alpha_strip(alpha_strip):
+    ring = PiFrameBufferRing()
+    buf = MMALBufferAlphaStrip(mmal_buffer(b'RGBaRGBbxyzc'), ring)
+    assert buf.length == 9
+    assert buf.data == b'RGBRGBxyz'
+    buf = MMALBufferAlphaStrip(mmal_buffer(b'....RGBaxyzb', offset=4), ring)
+    assert buf.data == b'RGBxyz'
+    buf = MMALBufferAlphaStrip(mmal_buffer(b''), ring)
+    assert buf.length == 0
+
+def test_alpha_strip_recycled(alpha_strip):
+    ring = PiFrameBufferRing(2)
+    frames = [
+        MMALBufferAlphaStrip(
+            mmal_buffer(bytearray([i, i, i, 255] * 4)), ring).data
+        for i in range(3)]
+    # Stripped frames are written into the ring's buffers in turn
+    assert frames[0] is frames[2]
+    assert frames[1:] == [bytearray([i] * 12) for i in (1, 2)]
+
+def test_frame_buffer_ring():
+    with pytest.raises(PiCameraValueError):
+        PiFrameBufferRing(0)
+    ring = PiFrameBufferRing(2)
+    first = ring.take(4)
+    second = ring.take(4)
+    assert first is not second
+    assert len(first) == 4
+    assert ring.take(4) is first
+    view = memoryview(second)
+    # A buffer of the wrong size is replaced, not resized, so views of the
+    # old one remain valid
+    third = ring.take(6)
+    assert third is not second
+    assert len(third) == 6
+    assert len(view) == 4
+
+def raw_buffer(data, flags=0):
+    return mo.MMALBuffer(mmal_buffer(data, flags=flags))
+
+def test_raw_frame_assembler_single(sim):
+    assembler = PiRawFrameAssembler(6)
+    buf = raw_buffer(b'abcdef', mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END)
+    assert assembler.feed(buf) is buf
+
+def test_raw_frame_assembler_split(sim):
+    assembler = PiRawFrameAssembler(6)
+    assert assembler.feed(raw_buffer(b'abc')) is None
+    assert assembler.feed(raw_buffer(b'de')) is None
+    frame = assembler.feed(
+        raw_buffer(b'f', mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END))
+    assert frame.length == 6
+    assert frame.data == b'abcdef'
+    # Frames larger than expected grow the assembly buffer
+    assert assembler.feed(raw_buffer(b'ghijk')) is None
+    frame = assembler.feed(
+        raw_buffer(b'lmn', mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END))
+    assert frame.data == b'ghijklmn'
+    assert assembler.frame_size == 8
+    assert assembler.feed(raw_buffer(b'op')) is None
+    assembler.reset()
+    frame = assembler.feed(raw_buffer(b'qr', mmal.MMAL_BUFFER_HEADER_FLAG_EOS))
+    assert frame.data == b'qr'
+    # Short frames are trimmed to their length
+    assert assembler.feed(raw_buffer(b'st')) is None
+    frame = assembler.feed(
+        raw_buffer(b'u', mmal.MMAL_BUFFER_HEADER_FLAG_EOS))
+    assert frame.data == b'stu'
+
+def test_raw_frame_assembler_recycled(sim):
+    assembler = PiRawFrameAssembler(4, count=2)
+    frames = []
+    for value in (b'a', b'b', b'c'):
+        assert assembler.feed(raw_buffer(value * 2)) is None
+        frames.append(assembler.feed(
+            raw_buffer(value * 2, mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END)).data)
+    # Frames are assembled in the ring's buffers in turn, so an output
+    # keeping a frame sees it overwritten count frames later
+    assert frames[0] is frames[2]
+    assert frames[1:] == [b'bbbb', b'cccc']
+
+def test_raw_frame_assembler_alpha_strip(alpha_strip):
+    assembler = PiRawFrameAssembler(6)
+    ring = PiFrameBufferRing()
+    assert assembler.feed(
+        MMALBufferAlphaStrip(mmal_buffer(b'RGBa'), ring)) is None
+    frame = assembler.feed(MMALBufferAlphaStrip(
+        mmal_buffer(b'xyzb', flags=mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END),
+        ring))
+    assert frame.data == b'RGBxyz'
+
+def pooled_encoder():
+    encoder = mock.Mock()
+    encoder.encoder = mock.MagicMock()
+    encoder.resizer = None
+    return encoder
+
+def test_encoder_pool_acquire_release():
+    pool = PiEncoderPool(2)
+    ports = [object(), object(), object()]
+    keys = [
+        PiEncoderPool.make_key(None, port, 'jpeg', None, {'quality': 85})
+        for port in ports]
+    encoders = [pooled_encoder() for port in ports]
+    assert pool.acquire(keys[0]) is None
+    pool.release(keys[0], encoders[0])
+    encoders[0].encoder.connection.disable.assert_called_once_with()
+    assert len(pool) == 1
+    assert pool.acquire(keys[0]) is encoders[0]
+    encoders[0].encoder.connection.enable.assert_called_once_with()
+    assert len(pool) == 0
+    # An encoder is only ever acquired once
+    assert pool.acquire(keys[0]) is None
+    # Exceeding maxsize closes the least recently released encoder
+    for key, encoder in zip(keys, encoders):
+        pool.release(key, encoder)
+    assert len(pool) == 2
+    encoders[0].close.assert_called_once_with()
+    assert not encoders[1].close.called
+    assert pool.acquire(keys[0]) is None
+    assert pool.acquire(keys[2]) is encoders[2]
+    # A second encoder on the same port replaces the idle one
+    other = pooled_encoder()
+    pool.release(keys[1][:3] + (('quality', 50),), other)
+    encoders[1].close.assert_called_once_with()
+    pool.evict(ports[1])
+    other.close.assert_called_once_with()
+    assert len(pool) == 0
+
+def test_encoder_pool_prepare():
+    pool = PiEncoderPool(2)
+    key = PiEncoderPool.make_key(None, object(), 'jpeg', None, {})
+    encoder = pooled_encoder()
+    port = encoder.encoder.outputs[0]
+    policy = port.pool_policy
+    pool.prepare(key, encoder)
+    policy._replace.assert_called_once_with(retain=True)
+    assert port.pool_policy is policy._replace.return_value
+    # Encoders which won't be pooled keep their policy
+    encoder = pooled_encoder()
+    pool.prepare(None, encoder)
+    PiEncoderPool(0).prepare(key, encoder)
+    assert not encoder.encoder.outputs[0].pool_policy._replace.called
+
+def test_encoder_pool_disabled():
+    pool = PiEncoderPool(0)
+    encoder = pooled_encoder()
+    key = PiEncoderPool.make_key(None, object(), 'jpeg', None, {})
+    pool.release(key, encoder)
+    encoder.close.assert_called_once_with()
+    assert len(pool) == 0
+    # Unhashable options can't be pooled
+    assert PiEncoderPool.make_key(None, object(), 'jpeg', None, {'x': []}) is None
+    encoder = pooled_encoder()
+    PiEncoderPool(2).release(None, encoder)
+    encoder.close.assert_called_once_with()
+    with pytest.raises(PiCameraValueError):
+        PiEncoderPool(-1)
+
+def simulated_encoder(bitrate):
+    encoder = mock.Mock()
+    encoder.outputs_lock = threading.Lock()
+    encoder.output_port.params = {
+        mmal.MMAL_PARAMETER_VIDEO_ENCODE_MAX_QUANT: 0}
+    encoder.frame.video_size = 0
+    encoder._bitrate = bitrate
+    encoder._controller = None
+    encoder.exception = None
+    return encoder
+
+def test_bitrate_controller_bandwidth():
+    encoder = simulated_encoder(4000000)
+    bandwidth = mock.Mock(return_value=2000000)
+    controller = PiBitrateController(
+        encoder, 500000, 4000000, bandwidth=bandwidth)
+    assert controller.update(0) == 1800000
+    assert encoder.output_port.params == {
+        mmal.MMAL_PARAMETER_VIDEO_ENCODE_MAX_QUANT: 0,
+        mmal.MMAL_PARAMETER_VIDEO_BIT_RATE: 1800000}
+    bandwidth.return_value = 100000
+    assert controller.update(1) == 500000
+    bandwidth.return_value = 10000000
+    assert controller.update(2) == 4000000
+
+def test_bitrate_controller_backlog():
+    encoder = simulated_encoder(4000000)
+    backlog = mock.Mock(return_value=100000)
+    controller = PiBitrateController(
+        encoder, 1000000, 4000000, backlog=backlog, quality=(10, 14))
+    encoder.frame.video_size = 500000
+    assert controller.update(0) == 3000000
+    assert encoder.output_port.params[
+        mmal.MMAL_PARAMETER_VIDEO_ENCODE_MIN_QUANT] == 10
+    backlog.return_value = 200000
+    assert controller.update(1) == 2250000
+    assert controller.update(2) == 1687500
+    assert controller.update(3) == 1265625
+    assert controller.update(4) == 1000000
+    assert controller.quantization == 10
+    # Once the bitrate is at its minimum, the quantization is raised
+    assert controller.update(5) == 1000000
+    assert controller.quantization == 12
+    assert controller.update(6) == 1000000
+    assert controller.quantization == 14
+    assert controller.update(7) == 1000000
+    assert controller.quantization == 14
+    # Recovery lowers the quantization before raising the bitrate, and only
+    # while the encoder is making use of its bitrate
+    backlog.return_value = 0
+    encoder.frame.video_size += 1000000 // 8
+    assert controller.update(8) == 1000000
+    assert controller.quantization == 12
+    encoder.frame.video_size += 1000000 // 8
+    assert controller.update(9) == 1000000
+    assert controller.quantization == 10
+    assert controller.update(10) == 1000000
+    encoder.frame.video_size += 1000000 // 8
+    assert controller.update(11) == 1200000
+
+def test_bitrate_controller_max_quant():
+    # Recording started with quality=12 fixes the maximum quantization
+    encoder = simulated_encoder(1000000)
+    params = encoder.output_port.params
+    params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_MAX_QUANT] = 12
+    backlog = mock.Mock(return_value=100000)
+    controller = PiBitrateController(
+        encoder, 1000000, 4000000, backlog=backlog, quality=(10, 40))
+    for now in range(5):
+        backlog.return_value += 100000
+        assert controller.update(now) == 1000000
+        assert params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_MIN_QUANT] <= 12
+    assert controller.quantization == 12
+    # A best quantization above the maximum is clamped too, and doesn't
+    # prevent the bitrate recovering
+    encoder = simulated_encoder(1000000)
+    params = encoder.output_port.params
+    params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_MAX_QUANT] = 12
+    backlog = mock.Mock(return_value=0)
+    controller = PiBitrateController(
+        encoder, 1000000, 4000000, backlog=backlog, quality=(20, 40))
+    assert controller.update(0) == 1200000
+    assert controller.quantization == 12
+
+def test_bitrate_controller_thread():
+    encoder = simulated_encoder(4000000)
+    backlog = mock.Mock(side_effect=IOError('boom'))
+    controller = PiBitrateController(
+        encoder, 1000000, 4000000, backlog=backlog, interval=0.01)
+    encoder._controller = controller
+    controller.start()
+    controller._thread.join(1)
+    assert not controller._thread.is_alive()
+    assert isinstance(encoder.exception, IOError)
+    encoder.event.set.assert_called_once_with()
+    controller.stop()
+    assert encoder._controller is None
+
+def test_bitrate_controller_thread_after_callback_error():
+    # An exception the encoder's callback already recorded is not replaced
+    # by the controller's
+    encoder = simulated_encoder(4000000)
+    error = ValueError('callback failed')
+    encoder.exception = error
+    backlog = mock.Mock(side_effect=IOError('boom'))
+    controller = PiBitrateController(
+        encoder, 1000000, 4000000, backlog=backlog, interval=0.01)
+    encoder._controller = controller
+    controller.start()
+    controller._thread.join(1)
+    assert not controller._thread.is_alive()
+    assert encoder.exception is error
+    encoder.event.set.assert_called_once_with()
+    controller.stop()
+
+def test_bitrate_controller_bad_args():
+    encoder = simulated_encoder(4000000)
+    with pytest.raises(PiCameraValueError):
+        PiBitrateController(encoder, 0, 4000000)
+    with pytest.raises(PiCameraValueError):
+        PiBitrateController(encoder, 5000000, 4000000)
+    with pytest.raises(PiCameraValueError):
+        PiBitrateController(encoder, 1000000, 4000000, quality=(20, 10))
+    with pytest.raises(PiCameraValueError):
+        PiBitrateController(encoder, 1000000, 4000000, interval=0)
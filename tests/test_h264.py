@@ -0,0 +1,230 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import io
+
+from picamera.h264 import (
+    H264NALType,
+    H264NALUnit,
+    H264SPS,
+    H264Parser,
+    H264TeeIO,
+    nal_offsets,
+    parse_sps,
+    split_nal_units,
+    unescape_rbsp,
+    )
+
+
+SPS = b'\x00\x00\x00\x01\x27\x64\x00\x28\xac\x2b'
+PPS = b'\x00\x00\x00\x01\x28\xee\x02\x5c'
+IDR = b'\x00\x00\x00\x01\x25\x88\x80\x10\x00'
+P1 = b'\x00\x00\x00\x01\x21\x9a\x01\x02'
+P2 = b'\x00\x00\x00\x01\x21\x9a\x03\x04'
+
+
+def test_nal_unit_from_bytes():
+    assert H264NALUnit.from_bytes(SPS) == (H264NALType.sps, 1, SPS)
+    assert H264NALUnit.from_bytes(IDR) == (H264NALType.idr, 1, IDR)
+    assert H264NALUnit.from_bytes(b'\x00\x00\x01\x06\x05') == (
+        H264NALType.sei, 0, b'\x00\x00\x01\x06\x05')
+
+def test_nal_offsets():
+    data = SPS + PPS + b'\x00\x00\x01\x25\x01'
+    assert list(nal_offsets(data)) == [
+        (0, H264NALType.sps),
+        (len(SPS), H264NALType.pps),
+        (len(SPS + PPS), H264NALType.idr),
+        ]
+    assert list(nal_offsets(b'\x00\x00\x01')) == []
+
+def test_parser_whole_units():
+    parser = H264Parser()
+    assert parser.feed(SPS + PPS) == [H264NALUnit.from_bytes(SPS)]
+    assert parser.feed(IDR) == [H264NALUnit.from_bytes(PPS)]
+    assert parser.flush() == [H264NALUnit.from_bytes(IDR)]
+    assert parser.flush() == []
+
+def test_parser_split_units():
+    data = b'garbage' + SPS + PPS + IDR + P1
+    for size in (1, 2, 3, 5, 7):
+        parser = H264Parser()
+        units = []
+        for i in range(0, len(data), size):
+            units.extend(parser.feed(data[i:i + size]))
+        units.extend(parser.flush())
+        assert [unit.data for unit in units] == [SPS, PPS, IDR, P1]
+
+def test_parser_scan():
+    data = b'garbage' + SPS + PPS + IDR + P1
+    expected = [
+        (offset + 7, nal_type)
+        for offset, nal_type in nal_offsets(SPS + PPS + IDR + P1)]
+    for size in (1, 2, 3, 5, 7):
+        parser = H264Parser()
+        found = []
+        for i in range(0, len(data), size):
+            found.extend(
+                (i + offset, nal_type)
+                for offset, nal_type in parser.scan(data[i:i + size]))
+        assert found == expected
+
+def test_tee_split_writes():
+    data = SPS + PPS + IDR + P1 + SPS + PPS + IDR + P2
+    for size in (1, 2, 3, 5, 7):
+        tee = H264TeeIO()
+        for i in range(0, len(data), size):
+            tee.write(data[i:i + size])
+        assert tee.sps == SPS
+        assert tee.pps == PPS
+        late = io.BytesIO()
+        tee.add_sink(late)
+        assert late.getvalue() == SPS + PPS + IDR + P2
+
+def test_tee_primes_new_sinks():
+    tee = H264TeeIO()
+    early = io.BytesIO()
+    tee.add_sink(early)
+    tee.write(SPS + PPS)
+    tee.write(IDR)
+    tee.write(P1)
+    assert tee.sps == SPS
+    assert tee.pps == PPS
+    late = io.BytesIO()
+    tee.add_sink(late)
+    assert late.getvalue() == SPS + PPS + IDR + P1
+    tee.write(P2)
+    assert early.getvalue() == SPS + PPS + IDR + P1 + P2
+    assert late.getvalue() == SPS + PPS + IDR + P1 + P2
+
+def test_tee_new_gop():
+    tee = H264TeeIO()
+    for chunk in (SPS + PPS, IDR, P1, SPS + PPS + IDR, P2):
+        tee.write(chunk)
+    late = io.BytesIO()
+    tee.add_sink(late)
+    assert late.getvalue() == SPS + PPS + IDR + P2
+
+def test_tee_waits_for_idr():
+    tee = H264TeeIO()
+    tee.write(P1)
+    waiting = io.BytesIO()
+    tee.add_sink(waiting)
+    tee.write(SPS + PPS)
+    tee.write(P2)
+    assert waiting.getvalue() == b''
+    tee.write(IDR)
+    tee.write(P1)
+    assert waiting.getvalue() == SPS + PPS + IDR + P1
+    tee.remove_sink(waiting)
+    tee.write(P2)
+    assert waiting.getvalue() == SPS + PPS + IDR + P1
+
+
+class BitWriter(object):
+    def __init__(self):
+        self.bits = []
+
+    def u(self, bits, value):
+        self.bits.extend((value >> (bits - i - 1)) & 1 for i in range(bits))
+
+    def ue(self, value):
+        value += 1
+        bits = value.bit_length()
+        self.u(bits - 1, 0)
+        self.u(bits, value)
+
+    def getvalue(self):
+        bits = self.bits + [1] # rbsp_stop_one_bit
+        bits += [0] * (-len(bits) % 8)
+        return bytes(bytearray(
+            int(''.join(str(b) for b in bits[i:i + 8]), 2)
+            for i in range(0, len(bits), 8)))
+
+
+def make_sps(width, height, profile=66):
+    w = BitWriter()
+    w.u(8, profile)
+    w.u(8, 0xc0)
+    w.u(8, 40)
+    w.ue(0)             # seq_parameter_set_id
+    if profile == 100:
+        w.ue(1)         # chroma_format_idc
+        w.ue(0)         # bit_depth_luma_minus8
+        w.ue(0)         # bit_depth_chroma_minus8
+        w.u(1, 0)       # qpprime_y_zero_transform_bypass_flag
+        w.u(1, 0)       # seq_scaling_matrix_present_flag
+    w.ue(4)             # log2_max_frame_num_minus4
+    w.ue(2)             # pic_order_cnt_type
+    w.ue(1)             # max_num_ref_frames
+    w.u(1, 0)           # gaps_in_frame_num_value_allowed_flag
+    mb_width = (width + 15) // 16
+    mb_height = (height + 15) // 16
+    w.ue(mb_width - 1)
+    w.ue(mb_height - 1)
+    w.u(1, 1)           # frame_mbs_only_flag
+    w.u(1, 1)           # direct_8x8_inference_flag
+    crop_right = mb_width * 16 - width
+    crop_bottom = mb_height * 16 - height
+    if crop_right or crop_bottom:
+        w.u(1, 1)
+        w.ue(0)
+        w.ue(crop_right // 2)
+        w.ue(0)
+        w.ue(crop_bottom // 2)
+    else:
+        w.u(1, 0)
+    w.u(1, 0)           # vui_parameters_present_flag
+    return b'\x00\x00\x00\x01' + bytes(bytearray([0x67])) + w.getvalue()
+
+
+def test_parse_sps():
+    info = parse_sps(make_sps(640, 480))
+    assert info == H264SPS(66, 0xc0, 40, 1, 8, 8, 640, 480)
+    info = parse_sps(make_sps(1920, 1080, profile=100))
+    assert info == H264SPS(100, 0xc0, 40, 1, 8, 8, 1920, 1080)
+    assert parse_sps(make_sps(1280, 720)[4:]).width == 1280
+
+def test_unescape_rbsp():
+    assert unescape_rbsp(b'\x01\x00\x00\x03\x01\x00\x00\x03') == (
+        b'\x01\x00\x00\x01\x00\x00')
+
+def test_split_nal_units():
+    assert [unit.data for unit in split_nal_units(SPS + PPS + IDR)] == [
+        SPS, PPS, IDR]
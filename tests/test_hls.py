@@ -0,0 +1,207 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import os
+import struct
+
+import mock
+import pytest
+from picamera.exc import PiCameraValueError, PiCameraWarning
+from picamera.frames import PiVideoFrame, PiVideoFrameType
+from picamera.hls import PiCameraHLSIO, init_segment, media_segment
+from test_h264 import make_sps
+
+
+PPS = b'\x00\x00\x00\x01\x68\xee\x3c\x80'
+
+
+def parse_boxes(data):
+    boxes = []
+    while data:
+        size, box_type = struct.unpack('>L4s', data[:8])
+        boxes.append((box_type, data[8:size]))
+        data = data[size:]
+    return boxes
+
+def find_box(data, *path):
+    for box_type in path:
+        data = dict(parse_boxes(data))[box_type]
+    return data
+
+def idr(n):
+    return b'\x00\x00\x00\x01\x65\x88' + struct.pack('>H', n) * 10
+
+def pframe(n):
+    return b'\x00\x00\x00\x01\x41\x9a' + struct.pack('>H', n) * 4
+
+@pytest.fixture()
+def camera():
+    camera = mock.Mock()
+    camera._encoders = {1: mock.Mock()}
+    return camera
+
+def record(camera, output, chunks):
+    encoder = camera._encoders[1]
+    for index, (data, timestamp) in enumerate(chunks):
+        encoder.frame = PiVideoFrame(
+            index, PiVideoFrameType.frame, len(data), 0, 0, timestamp, True)
+        output.write(data)
+
+
+def test_init_segment():
+    sps = make_sps(1280, 720, profile=100)
+    data = init_segment(sps, PPS)
+    assert [box_type for box_type, payload in parse_boxes(data)] == [
+        b'ftyp', b'moov']
+    stsd = find_box(data, b'moov', b'trak', b'mdia', b'minf', b'stbl', b'stsd')
+    avc1 = dict(parse_boxes(stsd[8:]))[b'avc1']
+    assert struct.unpack('>HH', avc1[24:28]) == (1280, 720)
+    avcc = dict(parse_boxes(avc1[78:]))[b'avcC']
+    assert avcc[:4] == b'\x01' + sps[5:8]
+    assert avcc[8:8 + len(sps) - 4] == sps[4:]
+    tkhd = find_box(data, b'moov', b'trak', b'tkhd')
+    assert struct.unpack('>LL', tkhd[-8:]) == (1280 << 16, 720 << 16)
+
+def test_media_segment():
+    samples = [
+        (b'\x00\x00\x00\x02ab', 3000, True),
+        (b'\x00\x00\x00\x01c', 3000, False),
+        ]
+    data = media_segment(7, 90000, samples)
+    boxes = parse_boxes(data)
+    assert [box_type for box_type, payload in boxes] == [b'moof', b'mdat']
+    assert boxes[1][1] == b'\x00\x00\x00\x02ab\x00\x00\x00\x01c'
+    assert find_box(data, b'moof', b'mfhd') == struct.pack('>LL', 0, 7)
+    tfdt = find_box(data, b'moof', b'traf', b'tfdt')
+    assert tfdt == struct.pack('>LQ', 1 << 24, 90000)
+    trun = find_box(data, b'moof', b'traf', b'trun')
+    flags, count, offset = struct.unpack('>LLl', trun[:12])
+    assert count == 2
+    assert offset == len(boxes[0][1]) + 16
+    assert struct.unpack('>6L', trun[12:]) == (
+        3000, 6, 0x02000000, 3000, 5, 0x01010000)
+
+def test_hls_init(camera, tmpdir):
+    with pytest.raises(PiCameraValueError):
+        PiCameraHLSIO(object(), str(tmpdir))
+    with pytest.raises(PiCameraValueError):
+        PiCameraHLSIO(camera, str(tmpdir), segment_seconds=0)
+    output = PiCameraHLSIO(camera, str(tmpdir))
+    assert output.writable()
+    output.close()
+    assert os.listdir(str(tmpdir)) == []
+
+def test_hls_segments(camera, tmpdir):
+    path = str(tmpdir)
+    output = PiCameraHLSIO(camera, path, segment_seconds=1, playlist_size=2)
+    sps = make_sps(640, 480)
+    # A P-frame before the first IDR frame is discarded
+    chunks = [(pframe(999), 0), (sps + PPS, 0)]
+    for i in range(90):
+        chunks.append((idr(i) if i % 30 == 0 else pframe(i), i * 33334))
+    record(camera, output, chunks)
+    output.close()
+    assert sorted(os.listdir(path)) == [
+        'init.mp4', 'playlist.m3u8', 'segment00002.m4s', 'segment00003.m4s']
+    with open(os.path.join(path, 'playlist.m3u8')) as f:
+        playlist = f.read().splitlines()
+    assert playlist == [
+        '#EXTM3U',
+        '#EXT-X-VERSION:7',
+        '#EXT-X-TARGETDURATION:1',
+        '#EXT-X-MEDIA-SEQUENCE:2',
+        '#EXT-X-INDEPENDENT-SEGMENTS',
+        '#EXT-X-MAP:URI="init.mp4"',
+        '#EXTINF:1.000,',
+        'segment00002.m4s',
+        '#EXTINF:1.000,',
+        'segment00003.m4s',
+        '#EXT-X-ENDLIST',
+        ]
+    with open(os.path.join(path, 'segment00002.m4s'), 'rb') as f:
+        data = f.read()
+    moof, mdat = parse_boxes(data)
+    tfdt = find_box(data, b'moof', b'traf', b'tfdt')
+    assert struct.unpack('>Q', tfdt[4:]) == (30 * 33334 * 9 // 100,)
+    trun = find_box(data, b'moof', b'traf', b'trun')
+    count, offset = struct.unpack('>Ll', trun[4:12])
+    assert count == 30
+    assert data[offset:offset + 4] == struct.pack('>L', len(idr(30)) - 4)
+    assert data[offset + 4:offset + len(idr(30))] == idr(30)[4:]
+    entries = [
+        struct.unpack('>LLL', trun[12 + i * 12:24 + i * 12])
+        for i in range(count)]
+    assert entries[0][2] == 0x02000000
+    assert all(flags == 0x01010000 for duration, size, flags in entries[1:])
+    assert sum(size for duration, size, flags in entries) == len(mdat[1])
+    assert all(3000 <= duration <= 3001 for duration, size, flags in entries)
+
+def test_hls_target_duration(camera, tmpdir):
+    path = str(tmpdir)
+    output = PiCameraHLSIO(camera, path, segment_seconds=1)
+    # The mock encoder ignores key-frame requests, so segments run to the
+    # next scheduled IDR frame 2 seconds later
+    chunks = [(make_sps(640, 480) + PPS, 0)]
+    for i in range(120):
+        chunks.append((idr(i) if i % 60 == 0 else pframe(i), i * 33334))
+    with pytest.warns(PiCameraWarning):
+        record(camera, output, chunks)
+        output.close()
+    camera.request_key_frame.assert_called_with(1)
+    assert camera.request_key_frame.call_count == 2
+    with open(os.path.join(path, 'playlist.m3u8')) as f:
+        playlist = f.read().splitlines()
+    assert '#EXT-X-TARGETDURATION:1' in playlist
+    assert playlist.count('#EXTINF:2.000,') == 2
+
+def test_hls_sps_change(camera, tmpdir):
+    output = PiCameraHLSIO(camera, str(tmpdir))
+    chunks = [(make_sps(640, 480) + PPS, 0), (idr(0), 0), (pframe(1), 33334)]
+    record(camera, output, chunks)
+    with pytest.warns(PiCameraWarning):
+        record(camera, output, [(make_sps(1280, 720) + PPS, 66668)])
+    output.close()
+
+def test_hls_write_error(camera, tmpdir):
+    output = PiCameraHLSIO(camera, str(tmpdir.join('missing')))
+    chunks = [(make_sps(640, 480) + PPS, 0), (idr(0), 0), (pframe(1), 33334)]
+    record(camera, output, chunks)
+    with pytest.raises(IOError):
+        output.close()
+    assert output.closed
@@ -0,0 +1,131 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import sys
+import ctypes as ct
+import ctypes.util
+import subprocess
+
+import pytest
+from picamera.lazy import LazyLibrary, LazyFunction
+
+
+def test_lazy_missing_library():
+    namespace = {}
+    lib = LazyLibrary('libpicamera-does-not-exist.so', namespace)
+    func = namespace['func'] = lib.func
+    func.argtypes = [ct.c_int]
+    func.restype = None
+    assert isinstance(func, LazyFunction)
+    assert func.argtypes == [ct.c_int]
+    assert func.restype is None
+    with pytest.raises(OSError):
+        func(1)
+    assert namespace['func'] is func
+    with pytest.raises(AttributeError):
+        lib._private
+
+@pytest.mark.skipif(not ctypes.util.find_library('c'), reason='no libc')
+def test_lazy_bind():
+    namespace = {}
+    lib = LazyLibrary(ctypes.util.find_library('c'), namespace)
+    labs = namespace['labs'] = lib.labs
+    labs.argtypes = [ct.c_long]
+    labs.restype = ct.c_long
+    assert labs(-5) == 5
+    assert namespace['labs'] is not labs
+    assert namespace['labs'].restype is ct.c_long
+    assert namespace['labs'](-6) == 6
+    assert labs(-7) == 7
+    with pytest.raises(AttributeError):
+        lib.picamera_no_such_function()
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires PEP 562')
+def test_lazy_package_import():
+    script = (
+        'import sys, picamera; '
+        'assert "picamera.camera" not in sys.modules; '
+        'picamera.TeeIO; '
+        'assert "picamera.streams" in sys.modules; '
+        'assert "picamera.camera" not in sys.modules; '
+        'assert "TeeIO" in dir(picamera)'
+        )
+    subprocess.check_call([sys.executable, '-c', script])
+
+def test_lazy_package_submodules():
+    # Submodules are available as attributes after a plain "import picamera"
+    # as they were when the package imported them up front
+    script = (
+        'import sys, picamera; '
+        'assert picamera.mmalobj is sys.modules["picamera.mmalobj"]; '
+        'assert picamera.encoders.PiEncoder is picamera.PiEncoder; '
+        'assert picamera.exc.PiCameraError is picamera.PiCameraError; '
+        'assert not hasattr(picamera, "no_such_module"); '
+        'assert "PiCamera" in picamera.__all__; '
+        'assert "mmalobj" not in picamera.__all__'
+        )
+    subprocess.check_call([sys.executable, '-c', script])
+
+def test_lazy_package_array():
+    pytest.importorskip('numpy')
+    script = (
+        'import picamera; '
+        'assert picamera.array.PiRGBArray'
+        )
+    subprocess.check_call([sys.executable, '-c', script])
+
+@pytest.mark.skipif(not ctypes.util.find_library('c'), reason='no libc')
+def test_lazy_use():
+    class FakeLibc(object):
+        def labs(self, value):
+            return 42
+    namespace = {}
+    lib = LazyLibrary(ctypes.util.find_library('c'), namespace)
+    labs = namespace['labs'] = lib.labs
+    labs.argtypes = [ct.c_long]
+    labs.restype = ct.c_long
+    assert labs(-5) == 5
+    assert namespace['labs'] is not labs
+    lib.use(FakeLibc())
+    assert namespace['labs'] is labs
+    assert labs(-5) == 42
+    assert labs.restype is ct.c_long
+    lib.use(None)
+    assert labs(-5) == 5
+    assert namespace['labs'].restype is ct.c_long
@@ -0,0 +1,735 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import io
+import time
+import ctypes as ct
+import threading
+import warnings
+from collections import OrderedDict
+
+import pytest
+from picamera import mmal, mmalsim, mmalobj as mo, encoders
+from picamera.exc import (
+    PiCameraValueError,
+    PiCameraAlphaStripping,
+    PiCameraWarning,
+    )
+from picamera.h264 import parse_sps, nal_offsets
+
+
+def wait_for(condition, timeout=10):
+    # Poll for condition rather than sleeping for a fixed time; timing is
+    # unreliable on loaded machines
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def returns(func, timeout=10):
+    # Run func in a thread, returning True if it completes within timeout
+    thread = threading.Thread(target=func)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_sim_install():
+    sim = mmalsim.install()
+    try:
+        assert mmalsim.installed() is sim
+        assert mmal._lib._dll is sim
+    finally:
+        mmalsim.uninstall()
+    assert mmalsim.installed() is None
+    assert mmal._lib._dll is not sim
+
+def test_sim_camera_info(sim):
+    with mo.MMALCameraInfo() as info:
+        mp = info.control.params[mmal.MMAL_PARAMETER_CAMERA_INFO]
+        assert mp.num_cameras == 1
+        assert mp.cameras[0].max_width == 2592
+        assert mp.cameras[0].max_height == 1944
+
+def test_sim_unknown_component(sim):
+    with pytest.raises(mo.PiCameraMMALError):
+        mo.MMALVideoDecoder()
+
+def test_sim_port_callback(sim):
+    frames = []
+    done = threading.Event()
+    def callback(port, buf):
+        frames.append((buf.length, buf.pts, buf.data[:1]))
+        if len(frames) == 3:
+            done.set()
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (64, 48)
+        port.commit()
+        assert port.buffer_size == 64 * 48 * 3 // 2
+        port.enable(callback)
+        camera.enable()
+        assert done.wait(5)
+        port.disable()
+    assert all(length == 64 * 48 * 3 // 2 for length, pts, data in frames)
+    assert frames[0][1] < frames[1][1] < frames[2][1]
+    assert frames[0][2] != frames[1][2]
+
+def test_sim_drops_frames(sim):
+    held = []
+    def callback(port, buf):
+        buf.acquire()
+        held.append(buf)
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (32, 32)
+        port.commit()
+        port.enable(callback)
+        camera.enable()
+        time.sleep(0.2)
+        stats = {s.name: s for s in sim.stats()}
+        assert stats['vc.ril.camera:out:0'].frames == port.buffer_count
+        assert stats['vc.ril.camera:out:0'].dropped > 0
+        for buf in held:
+            buf.release()
+        port.disable()
+
+def test_sim_buffer_reuse(sim):
+    seen = []
+    done = threading.Event()
+    def callback(port, buf):
+        seen.append(buf)
+        if len(seen) == 10:
+            done.set()
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (32, 32)
+        port.commit()
+        port.buffer_count = 2
+        port.enable(callback)
+        pool = port._pool
+        camera.enable()
+        assert done.wait(5)
+        port.disable()
+    assert len(set(id(buf) for buf in seen)) == 2
+    assert set(seen) <= set(pool._buffers.values())
+
+def test_sim_send_free_buffers(sim):
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (32, 32)
+        port.commit()
+        port.buffer_count = 3
+        port.enable(lambda port, buf: None)
+        try:
+            assert len(port._pool.queue) == 0
+            assert port._pool.send_free_buffers() == 0
+        finally:
+            port.disable()
+        pool = mo.MMALPortPool(port)
+        try:
+            assert len(pool.queue) == 3
+            with pytest.raises(mo.PiCameraPortDisabled):
+                pool.send_free_buffers()
+            assert len(pool.queue) == 3
+        finally:
+            pool.close()
+
+def test_sim_callback_connection(sim):
+    seen = []
+    def callback(connection, buf):
+        seen.append(buf.length)
+        return buf
+    with mo.MMALCamera() as camera, mo.MMALResizer() as resizer:
+        camera.outputs[0].framesize = (64, 48)
+        camera.outputs[0].commit()
+        resizer.inputs[0].connect(camera.outputs[0], callback=callback)
+        resizer.outputs[0].copy_from(resizer.inputs[0])
+        resizer.outputs[0].framesize = (32, 32)
+        resizer.outputs[0].commit()
+        output = []
+        resizer.outputs[0].enable(lambda port, buf: output.append(buf.length))
+        resizer.connection.enable()
+        camera.enable()
+        time.sleep(0.2)
+        resizer.connection.disable()
+        resizer.outputs[0].disable()
+    assert seen and all(length == 64 * 48 * 3 // 2 for length in seen)
+    assert output and all(length == 32 * 32 * 3 // 2 for length in output)
+
+def test_sim_capture_jpeg(sim_camera):
+    stream = io.BytesIO()
+    sim_camera.capture(stream, 'jpeg')
+    assert stream.getvalue().startswith(b'\xff\xd8')
+    assert stream.getvalue().endswith(b'\xff\xd9')
+
+def test_sim_capture_pooled(sim_camera):
+    class BrokenIO(io.BytesIO):
+        def write(self, b):
+            raise IOError('disk full')
+    pool = sim_camera._encoder_pool
+    sim_camera.capture(io.BytesIO(), 'jpeg')
+    assert len(pool) == 1
+    # The idle encoder is re-used, and closed (not returned to the pool) when
+    # the capture fails
+    with pytest.raises(IOError):
+        sim_camera.capture(BrokenIO(), 'jpeg')
+    assert len(pool) == 0
+    stream = io.BytesIO()
+    sim_camera.capture(stream, 'jpeg')
+    assert stream.getvalue().startswith(b'\xff\xd8')
+    assert len(pool) == 1
+
+def test_sim_capture_pooled_buffers(sim_camera, monkeypatch):
+    created = []
+    init = mo.MMALPortPool.__init__
+    def counting_init(self, port):
+        created.append(port.name)
+        init(self, port)
+    monkeypatch.setattr(mo.MMALPortPool, '__init__', counting_init)
+    for i in range(3):
+        stream = io.BytesIO()
+        sim_camera.capture(stream, 'jpeg')
+        assert stream.getvalue().startswith(b'\xff\xd8')
+    # The pooled encoder's output buffers are retained from the first capture
+    assert created.count('vc.ril.image_encode:out:0') == 1
+
+@pytest.mark.parametrize('use_video_port', (False, True))
+def test_sim_capture_raw(sim_camera, use_video_port):
+    stream = io.BytesIO()
+    sim_camera.capture(stream, 'rgb', use_video_port=use_video_port)
+    assert len(stream.getvalue()) == 640 * 480 * 3
+
+def test_sim_capture_alpha_strip(sim_camera, monkeypatch):
+    pytest.importorskip('numpy')
+    stream = io.BytesIO()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', PiCameraAlphaStripping)
+        sim_camera.capture(stream, 'rgb', resize=(320, 240))
+    assert len(stream.getvalue()) == 320 * 240 * 3
+    # Without numpy, stripping is slower and still warns (a different size
+    # avoids re-using the pooled encoder)
+    monkeypatch.setattr(encoders, 'np', None)
+    stream = io.BytesIO()
+    with pytest.warns(PiCameraAlphaStripping):
+        sim_camera.capture(stream, 'rgb', resize=(256, 192))
+    assert len(stream.getvalue()) == 256 * 192 * 3
+
+def test_sim_record_raw_split(sim_camera, monkeypatch):
+    class FrameList(object):
+        def __init__(self):
+            self.frames = []
+        def write(self, b):
+            # Each write is a whole, assembled frame; it's copied as the
+            # assembly buffers are recycled
+            assert isinstance(b, (bytes, bytearray))
+            self.frames.append(bytes(b))
+            return len(b)
+    frame_size = 640 * 480 * 3 // 2
+    apply_policy = mo.MMALPort._apply_pool_policy
+    def small_buffers(port):
+        # Force each YUV frame to be delivered in three buffers
+        apply_policy(port)
+        if port.format == mmal.MMAL_ENCODING_I420:
+            port._port[0].buffer_size = frame_size // 3
+    monkeypatch.setattr(mo.MMALPort, '_apply_pool_policy', small_buffers)
+    first, second = FrameList(), FrameList()
+    sim_camera.start_recording(first, 'yuv')
+    encoder = sim_camera._encoders[1]
+    sim_camera.wait_recording(0.1)
+    sim_camera.split_recording(second)
+    sim_camera.wait_recording(0.1)
+    sim_camera.stop_recording()
+    assert encoder._assembler._length == 0
+    for output in (first, second):
+        assert output.frames
+        for frame in output.frames:
+            assert len(frame) == frame_size
+            assert frame.count(frame[:1]) == frame_size
+    values = [frame[0] for frame in first.frames + second.frames]
+    assert values == sorted(set(values))
+
+def test_sim_record_h264(sim_camera):
+    sim_camera.resolution = (1920, 1080)
+    stream = io.BytesIO()
+    motion = io.BytesIO()
+    sim_camera.start_recording(
+        stream, 'h264', profile='main', level='4.1', motion_output=motion)
+    sim_camera.wait_recording(0.2)
+    sim_camera.request_key_frame()
+    sim_camera.wait_recording(0.2)
+    sim_camera.stop_recording()
+    data = stream.getvalue()
+    offsets = list(nal_offsets(data))
+    assert offsets[0] == (0, 7)
+    sps = parse_sps(data[:offsets[1][0]])
+    assert (sps.profile, sps.level) == (77, 41)
+    assert (sps.width, sps.height) == (1920, 1080)
+    types = [nal_type for offset, nal_type in offsets]
+    assert types[1:3] == [8, 5]
+    assert types.count(5) >= 2
+    assert len(motion.getvalue()) % (121 * 68 * 4) == 0
+
+def test_sim_schedule_manual_split(sim_camera):
+    first, second, unused = io.BytesIO(), io.BytesIO(), io.BytesIO()
+    segments = []
+    sim_camera.start_recording(first, 'h264', intra_period=5)
+    schedule = sim_camera.schedule_split_recording(
+        [unused], size=1 << 30,
+        callback=lambda output, first, last: segments.append(output))
+    sim_camera.wait_recording(0.1)
+    sim_camera.split_recording(second)
+    sim_camera.wait_recording(0.1)
+    sim_camera.stop_recording()
+    # The segment ended by split_recording is attributed to the original
+    # output, and the final segment to the output split_recording switched to
+    assert segments == [first, second]
+    assert second.getvalue().startswith(b'\x00\x00\x00\x01\x27')
+    assert unused.getvalue() == b''
+    assert schedule.error is None
+
+def test_sim_schedule_error(sim_camera):
+    def outputs():
+        yield io.BytesIO()
+        raise IOError('no more outputs')
+    sim_camera.start_recording(io.BytesIO(), 'h264', intra_period=5)
+    sim_camera.schedule_split_recording(outputs(), size=1)
+    # The failure to open the third output in the background thread must stop
+    # the encoder, and be reported by stop_recording
+    encoder = sim_camera._encoders[1]
+    assert encoder.event.wait(10)
+    assert isinstance(encoder.exception, IOError)
+    with pytest.raises(IOError):
+        sim_camera.stop_recording()
+
+def test_sim_adapt_bitrate_quality(sim_camera):
+    backlog = [0]
+    def growing_backlog():
+        backlog[0] += 100000
+        return backlog[0]
+    sim_camera.start_recording(
+        io.BytesIO(), 'h264', bitrate=2000000, quality=20)
+    params = sim_camera._encoders[1].output_port.params
+    controller = sim_camera.adapt_recording_bitrate(
+        min_bitrate=1000000, backlog=growing_backlog, quality=(10, 40),
+        interval=60)
+    try:
+        for now in range(10):
+            controller.update(now)
+            # The minimum quantization never passes the maximum fixed by
+            # quality=20
+            assert params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_MIN_QUANT] <= 20
+        assert controller.bitrate == 1000000
+        assert controller.quantization == 20
+        assert params[mmal.MMAL_PARAMETER_VIDEO_ENCODE_MAX_QUANT] == 20
+    finally:
+        sim_camera.stop_recording()
+
+def test_sim_motion_subscriber_error(sim_camera):
+    def broken(frame, buf):
+        raise PiCameraValueError('wrong size')
+    received = threading.Event()
+    stream = io.BytesIO()
+    sim_camera.start_recording(stream, 'h264', motion_vectors=True)
+    sim_camera.add_motion_subscriber(broken)
+    sim_camera.add_motion_subscriber(lambda frame, buf: received.set())
+    # The failing subscriber neither starves the other subscriber, nor ends
+    # the recording
+    with pytest.warns(PiCameraWarning):
+        assert received.wait(10)
+    sim_camera.wait_recording(0)
+    sim_camera.remove_motion_subscriber(broken)
+    sim_camera.stop_recording()
+    assert stream.getvalue()
+
+def test_sim_configure_rollback(sim_camera):
+    sim_camera.iso = 100
+    with pytest.raises(PiCameraValueError):
+        sim_camera.configure(isp_blocks={'foo'})
+    # A failure setting a property outside the reconfiguration restores the
+    # camera's configuration, and the properties already set
+    settings = [
+        ('resolution', (320, 240)), ('iso', 800), ('brightness', 200)]
+    with pytest.raises(PiCameraValueError):
+        sim_camera.configure(**OrderedDict(settings))
+    assert sim_camera.resolution == (640, 480)
+    assert sim_camera.iso == 100
+    sim_camera.configure(resolution=(320, 240), iso=800)
+    assert sim_camera.resolution == (320, 240)
+    assert sim_camera.iso == 800
+
+def test_sim_overlay(sim_camera):
+    sim_camera.start_preview()
+    overlay = sim_camera.add_overlay(bytes(640 * 480 * 3), size=(640, 480))
+    for i in range(3):
+        overlay.update(bytes(640 * 480 * 3))
+    sim_camera.remove_overlay(overlay)
+    sim_camera.stop_preview()
+
+def test_sim_params(sim):
+    with mo.MMALCamera() as camera:
+        params = camera.control.params
+        params[mmal.MMAL_PARAMETER_ISO] = 400
+        params[mmal.MMAL_PARAMETER_EXPOSURE_COMP] = -6
+        params[mmal.MMAL_PARAMETER_VIDEO_STABILISATION] = True
+        params[mmal.MMAL_PARAMETER_SATURATION] = 0.5
+        assert params.get_many([
+            mmal.MMAL_PARAMETER_ISO,
+            mmal.MMAL_PARAMETER_EXPOSURE_COMP,
+            mmal.MMAL_PARAMETER_VIDEO_STABILISATION,
+            mmal.MMAL_PARAMETER_SATURATION,
+            mmal.MMAL_PARAMETER_ISO,
+            ]) == [400, -6, True, 0.5, 400]
+        settings, time = params.get_many([
+            mmal.MMAL_PARAMETER_CAMERA_SETTINGS,
+            mmal.MMAL_PARAMETER_SYSTEM_TIME,
+            ])
+        assert settings.analog_gain.den > 0
+        assert time > 0
+        with pytest.raises(KeyError):
+            params.get_many([-1])
+
+def test_sim_queue_wait(sim):
+    queue = mo.MMALQueue.create()
+    try:
+        stop = []
+        stopped = lambda: bool(stop)
+        assert queue.wait(stopped, timeout=0.01) is None
+        def waker():
+            time.sleep(0.05)
+            stop.append(True)
+            queue.wake()
+        thread = threading.Thread(target=waker)
+        thread.start()
+        # With no timeout, wait only returns if wake is noticed
+        result = []
+        assert returns(lambda: result.append(queue.wait(stopped)))
+        assert result == [None]
+        thread.join()
+    finally:
+        queue.close()
+
+def test_sim_python_pipeline(sim):
+    data = bytes(bytearray(range(256))) * 36
+    output = io.BytesIO()
+    source = mo.MMALPythonSource(io.BytesIO(data))
+    target = mo.MMALPythonTarget(output)
+    try:
+        source.outputs[0].format = mmal.MMAL_ENCODING_I420
+        source.outputs[0].framesize = (64, 48)
+        source.outputs[0].commit()
+        assert source.outputs[0].buffer_size == 64 * 48 * 3 // 2
+        target.connect(source)
+        target.connection.enable()
+        target.enable()
+        source.enable()
+        assert source.wait(5)
+        assert target.wait(5)
+        source.disable()
+        target.disable()
+        target.connection.disable()
+    finally:
+        target.close()
+        source.close()
+    assert output.getvalue() == data
+
+def run_source(input, framesize=(64, 48)):
+    output = io.BytesIO()
+    source = mo.MMALPythonSource(input)
+    target = mo.MMALPythonTarget(output)
+    try:
+        source.outputs[0].format = mmal.MMAL_ENCODING_I420
+        source.outputs[0].framesize = framesize
+        source.outputs[0].commit()
+        target.connect(source)
+        target.connection.enable()
+        target.enable()
+        source.enable()
+        assert source.wait(5)
+        assert target.wait(5)
+        source.disable()
+        target.disable()
+        target.connection.disable()
+    finally:
+        target.close()
+        source.close()
+    return output.getvalue()
+
+def test_sim_python_source_file(sim, tmpdir):
+    # Two and a bit frames, read from part way into the file
+    data = bytes(bytearray(range(256))) * 60
+    filename = str(tmpdir.join('frames.yuv'))
+    with io.open(filename, 'wb') as f:
+        f.write(b'header' + data)
+    with io.open(filename, 'rb') as f:
+        f.seek(6)
+        assert run_source(f) == data
+        assert f.tell() == len(data) + 6
+    assert run_source(filename) == b'header' + data
+
+def test_sim_python_source_read(sim):
+    class ReadOnly(object):
+        def __init__(self, data):
+            self._stream = io.BytesIO(data)
+        def read(self, n=-1):
+            return self._stream.read(n)
+    data = bytes(bytearray(range(256))) * 60
+    assert run_source(ReadOnly(data)) == data
+
+def test_sim_python_transfer(sim):
+    output = io.BytesIO()
+    with mo.MMALCamera() as camera:
+        camera.outputs[0].framesize = (64, 48)
+        camera.outputs[0].commit()
+        target = mo.MMALPythonTarget(
+            output, done=mmal.MMAL_BUFFER_HEADER_FLAG_FRAME_END)
+        try:
+            target.connect(camera.outputs[0])
+            target.connection.enable()
+            target.enable()
+            camera.enable()
+            assert target.wait(5)
+            # The workers block without a timeout, so disabling only returns
+            # if it wakes them
+            assert returns(target.connection.disable)
+            assert returns(target.disable)
+        finally:
+            target.close()
+    assert len(output.getvalue()) == 64 * 48 * 3 // 2
+
+def test_sim_python_component_disable(sim):
+    component = mo.MMALPythonComponent()
+    try:
+        component.enable()
+        assert returns(component.disable)
+    finally:
+        component.close()
+
+def test_sim_python_zero_copy(sim):
+    frames = []
+    class Recorder(mo.MMALPythonComponent):
+        __slots__ = ()
+        def _handle_frame(self, port, buf):
+            frames.append(ct.addressof(buf._buf[0].data.contents))
+            time.sleep(0.01)
+            return False
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.framesize = (64, 48)
+        port.commit()
+        recorder = Recorder(outputs=0)
+        try:
+            recorder.connect(port, zero_copy=True)
+            assert recorder.connection.zero_copy
+            recorder.connection.enable()
+            buffer_count = port.buffer_count
+            payloads = {
+                ct.addressof(buf._buf[0].data.contents)
+                for buf in port.pool._buffers.values()
+                }
+            recorder.enable()
+            camera.enable()
+            assert wait_for(lambda: len(frames) > buffer_count)
+            recorder.disable()
+            recorder.connection.disable()
+        finally:
+            recorder.close()
+    # Each frame holds one of the camera's buffers while it's processed, but
+    # they're recycled to the camera as they're released
+    assert len(frames) > buffer_count
+    assert set(frames) <= payloads
+
+def test_sim_profile_pipeline(sim):
+    handled = []
+    class Slow(mo.MMALPythonComponent):
+        __slots__ = ()
+        def _handle_frame(self, port, buf):
+            time.sleep(0.05)
+            handled.append(buf)
+            return False
+    with mo.MMALCamera() as camera, mo.MMALSplitter() as splitter:
+        camera.outputs[0].framesize = (64, 48)
+        camera.outputs[0].commit()
+        splitter.connect(camera.outputs[0])
+        slow = Slow(outputs=0)
+        try:
+            slow.connect(splitter.outputs[0])
+            splitter.connection.enable()
+            slow.connection.enable()
+            slow.enable()
+            with mo.MMALPipelineProfiler(slow.inputs[0]) as profiler:
+                assert slow.connection._counter is not None
+                camera.enable()
+                # Once the component's backlogged, restart the sample so it
+                # covers only the saturated interval
+                assert wait_for(lambda: len(handled) >= 2)
+                profiler.sample()
+                count = len(handled)
+                assert wait_for(lambda: len(handled) >= count + 5)
+                stages = profiler.sample()
+                text = profiler.text(stages)
+                dot = profiler.dot(stages)
+            assert slow.connection._counter is None
+            slow.disable()
+            slow.connection.disable()
+            splitter.connection.disable()
+        finally:
+            slow.close()
+    assert [stage.kind for stage in stages] == [
+        'component', 'connection', 'component', 'connection', 'component']
+    assert [stage.name for stage in stages[::2]] == [
+        'vc.ril.camera', 'vc.ril.video_splitter', 'py.component']
+    tunnel, transfer, component = stages[1], stages[3], stages[4]
+    assert tunnel.buffers > 0
+    assert transfer.buffers > 0
+    assert transfer.bytes == transfer.buffers * 64 * 48 * 3 // 2
+    assert component.load > 0.5
+    assert component.status == 'saturated'
+    assert 'saturated' in text
+    assert dot.startswith('digraph pipeline {')
+    assert 'color=red' in dot
+
+def test_sim_profile_callback(sim):
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.framesize = (64, 48)
+        port.commit()
+        handled = []
+        port.enable(lambda port, buf: handled.append(buf))
+        with mo.MMALPipelineProfiler(port) as profiler:
+            camera.enable()
+            assert wait_for(lambda: len(handled) > 2)
+            stages = profiler.sample()
+        port.disable()
+    assert [stage.kind for stage in stages] == ['component', 'callback']
+    assert stages[1].name == port.name
+    assert stages[1].buffers > 0
+    assert stages[1].bandwidth > 0
+    assert stages[1].status == 'ok'
+
+def test_sim_pool_policy(sim):
+    with pytest.raises(PiCameraValueError):
+        mo.MMALPoolPolicy(count=0)
+    with pytest.raises(PiCameraValueError):
+        mo.MMALPoolPolicy(size=-1)
+    with pytest.raises(PiCameraValueError):
+        mo.MMALPoolPolicy(headroom=-1)
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (64, 48)
+        port.commit()
+        count, size = port.buffer_count, port.buffer_size
+        assert port.pool_policy == mo.MMALPoolPolicy()
+        with pytest.raises(PiCameraValueError):
+            port.pool_policy = (1, 2, 3, False)
+        port.pool_policy = mo.MMALPoolPolicy(size=size * 2, headroom=2)
+        for i in range(2):
+            # Re-enabling the port mustn't add the headroom again
+            port.enable(lambda port, buf: False)
+            assert len(port.pool) == count + 2
+            assert port.pool[0].size == size * 2
+            port.disable()
+        port.pool_policy = mo.MMALPoolPolicy(count=5)
+        port.enable(lambda port, buf: False)
+        assert len(port.pool) == 5
+        assert port.pool[0].size == size
+        port.disable()
+
+def test_sim_pool_retain(sim):
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (64, 48)
+        port.commit()
+        port.pool_policy = mo.MMALPoolPolicy(retain=True)
+        port.enable(lambda port, buf: False)
+        pool = port.pool
+        port.disable()
+        assert port.pool is None
+        port.enable(lambda port, buf: False)
+        assert port.pool is pool
+        port.disable()
+        # A different buffer size can't re-use the pool
+        port.framesize = (128, 96)
+        port.commit()
+        port.enable(lambda port, buf: False)
+        assert port.pool is not pool
+        pool = port.pool
+        port.disable()
+        port.pool_policy = None
+        assert pool._pool is None
+
+def test_sim_pool_mjpeg(sim):
+    with mo.MMALCamera() as camera, mo.MMALVideoEncoder() as encoder:
+        camera.outputs[1].framesize = (64, 48)
+        camera.outputs[1].commit()
+        encoder.connect(camera.outputs[1])
+        port = encoder.outputs[0]
+        port.format = mmal.MMAL_ENCODING_MJPEG
+        port.commit()
+        # MJPEG buffers are sized from the recommended size, with a floor of
+        # 512KB, regardless of the port's buffer size
+        size = max(512 * 1024, port._port[0].buffer_size_recommended)
+        port.buffer_size = 1024 * 1024
+        port.enable(lambda port, buf: False)
+        assert port.pool[0].size == size
+        port.disable()
+
+def test_sim_pool_exhausted(sim):
+    with mo.MMALCamera() as camera:
+        port = camera.outputs[0]
+        port.format = mmal.MMAL_ENCODING_I420
+        port.framesize = (64, 48)
+        port.commit()
+        port.pool_policy = mo.MMALPoolPolicy(count=1, retain=True)
+        port.enable(lambda port, buf: time.sleep(0.01))
+        pool = port.pool
+        camera.enable()
+        assert wait_for(lambda: pool.exhausted > 0)
+        port.disable()
+    # Closing the component releases the retained pool
+    assert pool._pool is None
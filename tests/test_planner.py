@@ -0,0 +1,169 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import io
+from fractions import Fraction
+
+import mock
+import pytest
+from picamera.exc import PiCameraValueError
+from picamera.mmalobj import PiResolution
+from picamera.planner import PiRecordingPlan
+from picamera.streams import TeeIO
+
+
+@pytest.fixture()
+def fake_cam(request):
+    cam = mock.Mock()
+    cam.resolution = PiResolution(1920, 1080)
+    cam.framerate = Fraction(30, 1)
+    cam._encoders = {}
+    cam._get_video_format.side_effect = lambda output, format: (
+        format or output.rsplit('.', 1)[1])
+    return cam
+
+
+def test_plan_ports(fake_cam):
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output='a.h264'),
+        dict(output='b.mjpeg', resize=(640, 480)),
+        dict(output='c.yuv', resize='320x240'),
+        ])
+    assert [r.splitter_port for r in plan.recordings] == [1, 2, 3]
+    assert [r.format for r in plan.recordings] == ['h264', 'mjpeg', 'yuv']
+    assert plan.recordings[0].resize is None
+    assert plan.recordings[2].resize == (320, 240)
+    fake_cam._encoders = {1: None, 2: None}
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output='a.h264', splitter_port=3),
+        dict(output='b.h264', resize='VGA'),
+        ])
+    assert [r.splitter_port for r in plan.recordings] == [3, 0]
+
+def test_plan_share(fake_cam):
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output='a.h264', resize='1080p', bitrate=1000000),
+        dict(output='b.h264', bitrate=1000000),
+        dict(output='c.h264', bitrate=2000000),
+        dict(output='d.h264', motion_output='d.data'),
+        dict(output='e.h264', motion_output='d.data'),
+        ])
+    assert len(plan.recordings) == 4
+    assert plan.recordings[0].outputs == ('a.h264', 'b.h264')
+    assert plan.recordings[0].options == {'bitrate': 1000000}
+    assert plan.recordings[1].outputs == ('c.h264',)
+
+def test_plan_load(fake_cam):
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output='a.h264'),
+        dict(output='b.mjpeg', resize=(640, 480)),
+        dict(output='c.yuv', resize=(320, 240)),
+        ])
+    load = plan.load
+    assert load['h264'] == pytest.approx(120 * 68 * 30 / 245760)
+    assert load['mjpeg'] == pytest.approx(40 * 30 * 30 / 296460)
+    assert load['resizer'] == pytest.approx(
+        (40 * 30 + 20 * 15) * 30 / 489600)
+    assert not plan.overloaded
+    assert 'Port 2: mjpeg 640x480 (resized)' in plan.report()
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output='a.h264'),
+        dict(output='b.h264', resize=(1280, 720)),
+        ])
+    assert plan.overloaded
+    fake_cam.framerate = 0
+    fake_cam.framerate_range.high = Fraction(15, 1)
+    plan = PiRecordingPlan(fake_cam, [dict(output='a.h264')])
+    assert plan.load['h264'] == pytest.approx(120 * 68 * 15 / 245760)
+    # MJPEG can keep up with the full resolution mode
+    fake_cam.resolution = PiResolution(2592, 1944)
+    plan = PiRecordingPlan(fake_cam, [dict(output='a.mjpeg')])
+    assert plan.load['mjpeg'] == pytest.approx(1.0)
+    assert not plan.overloaded
+
+def test_plan_invalid(fake_cam):
+    with pytest.raises(PiCameraValueError):
+        PiRecordingPlan(fake_cam, [])
+    with pytest.raises(PiCameraValueError):
+        PiRecordingPlan(fake_cam, [dict(format='h264')])
+    with pytest.raises(PiCameraValueError):
+        PiRecordingPlan(fake_cam, [
+            dict(output='%d.h264' % i, resize=(64 * i, 64 * i))
+            for i in range(1, 6)
+            ])
+    with pytest.raises(PiCameraValueError):
+        PiRecordingPlan(fake_cam, [
+            dict(output='a.h264', splitter_port=2),
+            dict(output='b.yuv', splitter_port=2),
+            ])
+    fake_cam._encoders = {2: None}
+    with pytest.raises(PiCameraValueError):
+        PiRecordingPlan(fake_cam, [dict(output='a.h264', splitter_port=2)])
+
+def test_plan_start_stop(fake_cam):
+    a = io.BytesIO()
+    b = io.BytesIO()
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output=a, format='h264'),
+        dict(output=b, format='h264'),
+        dict(output='c.yuv', resize=(320, 240)),
+        ])
+    with plan:
+        plan.wait(10)
+    calls = fake_cam.start_recording.call_args_list
+    assert len(calls) == 2
+    tee = calls[0][0][0]
+    assert isinstance(tee, TeeIO)
+    assert [sink.output for sink in tee.sinks] == []
+    assert tee.closed
+    assert calls[1] == mock.call('c.yuv', 'yuv', (320, 240), 2)
+    assert fake_cam.wait_recording.call_args_list == [
+        mock.call(10, 1), mock.call(0, 2)]
+    assert fake_cam.stop_recording.call_args_list == [
+        mock.call(2), mock.call(1)]
+
+def test_plan_start_failure(fake_cam):
+    fake_cam.start_recording.side_effect = [None, PiCameraValueError('foo')]
+    plan = PiRecordingPlan(fake_cam, [
+        dict(output='a.h264'),
+        dict(output='b.h264', resize=(640, 480)),
+        ])
+    with pytest.raises(PiCameraValueError):
+        plan.start()
+    assert fake_cam.stop_recording.call_args_list == [mock.call(1)]
@@ -182,6 +182,30 @@ def test_record_sequence_to_stream(camera, mode):
         verify_video(stream, 'h264', resolution)
 
 
+def test_schedule_split_recording(camera, mode):
+    resolution, framerate = mode
+    expected_failures(resolution, 'h264', {})
+    streams = [tempfile.SpooledTemporaryFile() for i in range(3)]
+    segments = []
+    def callback(output, first_frame, last_frame):
+        segments.append((output, first_frame, last_frame))
+    camera.start_recording(streams[0], format='h264', intra_period=15)
+    try:
+        camera.schedule_split_recording(
+            streams[1:], seconds=1, callback=callback)
+        camera.wait_recording(5)
+    finally:
+        camera.stop_recording()
+    assert [output for output, first, last in segments] == streams
+    for (output, first, last), (_, next_first, _) in zip(
+            segments, segments[1:]):
+        assert first.index <= last.index < next_first.index
+        assert next_first.frame_type == picamera.PiVideoFrameType.sps_header
+    for stream in streams:
+        stream.seek(0)
+        verify_video(stream, 'h264', resolution)
+
+
 def test_circular_record(camera, mode):
     resolution, framerate = mode
     expected_failures(resolution, 'h264', {})
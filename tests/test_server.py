@@ -0,0 +1,193 @@
+# vim: set et sw=4 sts=4 fileencoding=utf-8:
+#
+# Python camera library for the Rasperry-Pi camera module
+# Copyright (c) 2013-2017 Dave Jones <dave@waveform.org.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (
+    unicode_literals,
+    print_function,
+    division,
+    absolute_import,
+    )
+
+# Make Py2's str equivalent to Py3's
+str = type('')
+
+import sys
+import socket
+import threading
+
+import pytest
+if sys.version_info < (3, 5):
+    pytest.skip('picamera.server requires Python 3.5+', allow_module_level=True)
+
+import asyncio
+from picamera.exc import PiCameraValueError
+from picamera.streams import PiCameraMJPEGIO
+from picamera.h264 import H264TeeIO
+from picamera.server import StreamingServer, StreamingClient
+
+
+SPS = b'\x00\x00\x00\x01\x27\x64\x00\x28\xac\x2b'
+PPS = b'\x00\x00\x00\x01\x28\xee\x02\x5c'
+IDR = b'\x00\x00\x00\x01\x25\x88\x80\x10\x00'
+P1 = b'\x00\x00\x00\x01\x21\x9a\x01\x02'
+P2 = b'\x00\x00\x00\x01\x21\x9a\x03\x04'
+
+
+@pytest.fixture()
+def serve():
+    servers = []
+    def start(**kwargs):
+        loop = asyncio.new_event_loop()
+        server = StreamingServer(**kwargs)
+        ready = threading.Event()
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(server.start('127.0.0.1', 0))
+            ready.set()
+            loop.run_forever()
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        assert ready.wait(5)
+        servers.append((loop, server, thread))
+        return server.sockets[0].getsockname()[1]
+    yield start
+    for loop, server, thread in servers:
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+def get(port, path):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+    sock.sendall(b'GET ' + path + b' HTTP/1.0\r\nHost: localhost\r\n\r\n')
+    f = sock.makefile('rb')
+    status = f.readline()
+    headers = {}
+    for line in iter(f.readline, b'\r\n'):
+        key, value = line.decode('ascii').split(':', 1)
+        headers[key.strip().lower()] = value.strip()
+    return sock, f, status, headers
+
+def read_part(f):
+    assert f.readline() == b'--FRAME\r\n'
+    headers = {}
+    for line in iter(f.readline, b'\r\n'):
+        key, value = line.decode('ascii').split(':', 1)
+        headers[key.strip().lower()] = value.strip()
+    assert headers['content-type'] == 'image/jpeg'
+    data = f.read(int(headers['content-length']))
+    assert f.read(2) == b'\r\n'
+    return data
+
+
+def test_server_init():
+    with pytest.raises(PiCameraValueError):
+        StreamingServer()
+    with pytest.raises(PiCameraValueError):
+        StreamingServer(mjpeg=PiCameraMJPEGIO(), mjpeg_queue=0)
+
+def test_client_latest_frame_wins():
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        client = StreamingClient(('127.0.0.1', 1), 'mjpeg', 2)
+        for frame in (b'a', b'b', b'c'):
+            client.put(frame)
+        assert list(client.queue) == [b'b', b'c']
+        assert client.dropped == 1
+        assert client.event.is_set()
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+def test_server_not_found(serve):
+    port = serve(mjpeg=PiCameraMJPEGIO())
+    sock, f, status, headers = get(port, b'/foo')
+    with sock, f:
+        assert status.startswith(b'HTTP/1.0 404')
+    sock, f, status, headers = get(port, b'/stream.h264')
+    with sock, f:
+        assert status.startswith(b'HTTP/1.0 404')
+
+def test_server_mjpeg(serve):
+    mjpeg = PiCameraMJPEGIO()
+    mjpeg.write(b'\xff\xd8first\xff\xd9')
+    port = serve(mjpeg=mjpeg)
+    sock, f, status, headers = get(port, b'/stream.mjpg')
+    with sock, f:
+        assert status.startswith(b'HTTP/1.0 200')
+        assert headers['content-type'] == (
+            'multipart/x-mixed-replace; boundary=FRAME')
+        assert read_part(f) == b'\xff\xd8first\xff\xd9'
+        mjpeg.write(b'\xff\xd8second\xff\xd9')
+        assert read_part(f) == b'\xff\xd8second\xff\xd9'
+
+def test_server_h264(serve):
+    h264 = H264TeeIO()
+    for chunk in (SPS + PPS, IDR, P1):
+        h264.write(chunk)
+    port = serve(h264=h264)
+    sock, f, status, headers = get(port, b'/stream.h264')
+    with sock, f:
+        assert status.startswith(b'HTTP/1.0 200')
+        assert headers['content-type'] == 'video/h264'
+        prime = SPS + PPS + IDR + P1
+        assert f.read(len(prime)) == prime
+        h264.write(P2)
+        assert f.read(len(P2)) == P2
+        assert len(h264.sinks) == 1
+
+def test_server_h264_resync(serve):
+    h264 = H264TeeIO()
+    for chunk in (SPS + PPS, IDR, P1):
+        h264.write(chunk)
+    port = serve(h264=h264, h264_queue=2)
+    sock, f, status, headers = get(port, b'/stream.h264')
+    with sock, f:
+        assert status.startswith(b'HTTP/1.0 200')
+        prime = SPS + PPS + IDR + P1
+        assert f.read(len(prime)) == prime
+        # Without reading from the socket, write far more than the socket
+        # buffers can hold so the client's queue overflows
+        filler = P2 + bytes(1024 * 1024)
+        for i in range(32):
+            h264.write(filler)
+        # Split the next IDR frame's start code across two writes; the client
+        # must restart from it, preceded by the SPS and PPS
+        h264.write(filler + IDR[:3])
+        h264.write(IDR[3:])
+        h264.write(P1)
+        expected = SPS + PPS + IDR + P1
+        received = bytearray()
+        while not received.endswith(expected):
+            chunk = f.read1(65536)
+            assert chunk
+            received += chunk
+        assert len(received) < 32 * len(filler)
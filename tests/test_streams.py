@@ -38,6 +38,8 @@ from __future__ import (
 str = type('')
 
 import io
+import time
+import threading
 import mock
 try:
     from itertools import accumulate
@@ -52,7 +54,13 @@ except ImportError:
 
 import pytest
 from picamera.encoders import PiVideoFrame, PiVideoFrameType
-from picamera.streams import CircularIO, PiCameraCircularIO
+from picamera.exc import PiCameraValueError
+from picamera.streams import (
+    CircularIO,
+    PiCameraCircularIO,
+    PiCameraMJPEGIO,
+    TeeIO,
+    )
 
 
 def test_init():
@@ -349,3 +357,133 @@ def test_camera_stream_copy_frames():
     assert output.getvalue() == b''
     stream.copy_to(output, frames=10)
     assert output.getvalue() == b'hkkffkkff'
+
+def test_tee_init():
+    out1 = io.BytesIO()
+    out2 = io.BytesIO()
+    tee = TeeIO([out1, out2])
+    assert tee.writable()
+    assert not tee.readable()
+    assert [sink.output for sink in tee.sinks] == [out1, out2]
+    with pytest.raises(PiCameraValueError):
+        tee.add_sink(io.BytesIO(), queue_size=-1)
+    with pytest.raises(PiCameraValueError):
+        tee.add_sink(io.BytesIO(), drop='foo')
+    tee.close()
+    assert tee.closed
+    assert not tee.sinks
+    with pytest.raises(ValueError):
+        tee.write(b'foo')
+
+def test_tee_write():
+    out1 = io.BytesIO()
+    out2 = io.BytesIO()
+    tee = TeeIO([out1])
+    sink = tee.add_sink(out2, queue_size=10)
+    assert tee.write(b'abc') == 3
+    assert tee.write(b'def') == 3
+    assert sink.drain(1)
+    assert out1.getvalue() == b'abcdef'
+    assert out2.getvalue() == b'abcdef'
+    assert sink.written == 6
+    assert sink.dropped == 0
+
+def test_tee_add_remove():
+    out1 = io.BytesIO()
+    out2 = mock.Mock()
+    tee = TeeIO([out1])
+    tee.write(b'abc')
+    sink = tee.add_sink(out2)
+    tee.write(b'def')
+    tee.remove_sink(out2)
+    assert sink.closed
+    tee.write(b'ghi')
+    assert out1.getvalue() == b'abcdefghi'
+    assert out2.write.mock_calls == [mock.call(b'def')]
+    out2.flush.assert_called_once_with()
+    with pytest.raises(PiCameraValueError):
+        tee.remove_sink(sink)
+
+def test_tee_sink_error():
+    out1 = mock.Mock()
+    out1.write.side_effect = IOError('broken pipe')
+    out2 = io.BytesIO()
+    tee = TeeIO([out1, out2])
+    tee.write(b'abc')
+    tee.write(b'def')
+    assert isinstance(tee.sinks[0].error, IOError)
+    assert tee.sinks[0].dropped == 1
+    assert out1.write.call_count == 1
+    assert out2.getvalue() == b'abcdef'
+
+def test_tee_drop_policy():
+    stalled = threading.Event()
+    for drop, expected in (('oldest', b'aaaccc'), ('newest', b'aaabbb')):
+        stalled.clear()
+        out = mock.Mock()
+        out.write.side_effect = lambda b: stalled.wait(1)
+        tee = TeeIO()
+        sink = tee.add_sink(out, queue_size=1, drop=drop)
+        tee.write(b'aaa')
+        # Wait for the sink's thread to pick up the first write and stall
+        while sink._queue:
+            time.sleep(0.01)
+        tee.write(b'bbb')
+        tee.write(b'ccc')
+        stalled.set()
+        assert sink.drain(1)
+        assert b''.join(c[1][0] for c in out.write.mock_calls) == expected
+        assert sink.dropped == 1
+        tee.close()
+
+def test_mjpeg_frames():
+    camera = mock.Mock()
+    encoder = mock.Mock()
+    camera._encoders = {1: encoder}
+    stream = PiCameraMJPEGIO(camera)
+    assert stream.writable()
+    assert stream.wait_frame(0, timeout=0) == (0, None)
+    encoder.frame = PiVideoFrame(0, PiVideoFrameType.frame, 3, 3, 3, 0, True)
+    stream.write(b'abc')
+    assert stream.wait_frame(0) == (1, b'abc')
+    assert stream.frame_info == encoder.frame
+    encoder.frame = PiVideoFrame(1, PiVideoFrameType.frame, 3, 6, 6, 1, False)
+    stream.write(b'def')
+    assert stream.wait_frame(1, timeout=0) == (1, None)
+    encoder.frame = PiVideoFrame(1, PiVideoFrameType.frame, 6, 9, 9, 1, True)
+    stream.write(b'ghi')
+    assert stream.wait_frame(1) == (2, b'defghi')
+    # The assembly buffer is re-used for subsequent frames
+    buf = stream._buf
+    encoder.frame = PiVideoFrame(2, PiVideoFrameType.frame, 2, 11, 11, 2, False)
+    stream.write(b'jk')
+    encoder.frame = PiVideoFrame(2, PiVideoFrameType.frame, 3, 12, 12, 2, True)
+    stream.write(b'l')
+    assert stream._buf is buf
+    assert stream.wait_frame(1) == (3, b'jkl')
+    stream.close()
+    assert stream.wait_frame(3) == (3, None)
+
+def test_mjpeg_no_camera():
+    stream = PiCameraMJPEGIO()
+    stream.write(b'\xff\xd8abc')
+    stream.write(b'def\xff\xd9')
+    assert stream.seq == 1
+    assert stream.frame == b'\xff\xd8abcdef\xff\xd9'
+    assert stream.frame_info is None
+    with pytest.raises(PiCameraValueError):
+        PiCameraMJPEGIO(object())
+
+def test_mjpeg_slow_consumer():
+    stream = PiCameraMJPEGIO()
+    result = []
+    def consumer():
+        result.append(stream.wait_frame(0, timeout=1))
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    stream.write(b'\xff\xd8a\xff\xd9')
+    thread.join()
+    stream.write(b'\xff\xd8b\xff\xd9')
+    stream.write(b'\xff\xd8c\xff\xd9')
+    assert result == [(1, b'\xff\xd8a\xff\xd9')]
+    assert stream.wait_frame(1) == (3, b'\xff\xd8c\xff\xd9')